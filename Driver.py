@@ -1,6 +1,9 @@
 import serial
 import struct
-from enum import IntEnum
+import time
+from dataclasses import dataclass, field
+from enum import IntEnum, IntFlag
+from typing import Container, Dict, Iterable, Optional, Tuple
 
 
 class STSRegisters(IntEnum):
@@ -72,14 +75,176 @@ class Instruction:
     WRITE = 0x03
     REGWRITE = 0x04
     ACTION = 0x05
+    SYNCREAD = 0x82
     SYNCWRITE = 0x83
     RESET = 0x06
 
 
+class ServoError(IntFlag):
+    """Bits of the error byte of a reply (and of the STATUS register)."""
+    VOLTAGE = 0x01
+    SENSOR = 0x02
+    TEMPERATURE = 0x04
+    CURRENT = 0x08
+    OVERLOAD = 0x20
+
+
+BROADCAST_ID = 0xFE
+
+# Contiguous feedback block 0x38-0x46: position, speed, load, voltage, temperature, status, moving, current
+STATUS_BLOCK_START = STSRegisters.CURRENT_POSITION
+STATUS_BLOCK_LENGTH = STSRegisters.CURRENT_CURRENT + 2 - STSRegisters.CURRENT_POSITION
+
+
+def _sign_magnitude(value, sign_bit):
+    """Decode the STS sign-magnitude encoding used for speed and load."""
+    magnitude = value & ((1 << sign_bit) - 1)
+    return -magnitude if value & (1 << sign_bit) else magnitude
+
+
+@dataclass
+class ServoStatus:
+    position: int
+    speed: int
+    load: int
+    voltage: int
+    temperature: int
+    status: int
+    moving: int
+    current: int
+    error: int = 0  # Error byte of the reply that carried this block
+    timestamp: float = field(default_factory=time.monotonic)
+
+    _BLOCK = struct.Struct('<HHHBBxBB2xH')
+
+    @classmethod
+    def from_block(cls, data, error=0) -> "ServoStatus":
+        """Decode the 0x38-0x46 feedback block of a servo."""
+        position, speed, load, voltage, temperature, status, moving, current = cls._BLOCK.unpack(bytes(data))
+        return cls(position, _sign_magnitude(speed, 15), _sign_magnitude(load, 10),
+                   voltage, temperature, status, moving, current, error)
+
+    @property
+    def age(self) -> float:
+        """Seconds since this snapshot was read from the bus."""
+        return time.monotonic() - self.timestamp
+
+
+MAX_PARAMETERS = 253  # the length byte counts parameters + 2 and must fit in one byte
+_U16 = struct.Struct('<H')
+_POSITION_PAYLOAD = struct.Struct('<HH')
+
+
+class PacketCodec:
+    """Encode instruction packets and decode status packets using preallocated buffers.
+
+    Decoded bytes are accumulated in a fixed receive buffer; the decoder
+    re-synchronises on the 0xFF 0xFF header and skips garbage or frames with
+    a bad checksum instead of giving up on the first bad byte.
+    """
+    HEADER = b'\xff\xff'
+    _PREFIX = struct.Struct('<BBBBB')  # 0xFF 0xFF id length instruction/error
+
+    def __init__(self, rx_capacity=4096):
+        self._tx = bytearray(6 + MAX_PARAMETERS)
+        self._tx_view = memoryview(self._tx)
+        self._rx = bytearray(rx_capacity)
+        self._rx_view = memoryview(self._rx)
+        self._start = 0
+        self._end = 0
+        self.checksum_errors = 0
+        self.discarded_bytes = 0
+
+    @staticmethod
+    def checksum(data) -> int:
+        return (~sum(data)) & 0xFF
+
+    def encode(self, servo_id, instruction, parameters) -> memoryview:
+        """Encode a packet into the transmit buffer and return a view of it (valid until the next encode)."""
+        count = len(parameters)
+        if count > MAX_PARAMETERS:
+            raise ValueError(f"Too many parameters for one packet: {count}")
+        self._PREFIX.pack_into(self._tx, 0, 0xFF, 0xFF, servo_id, count + 2, instruction)
+        self._tx[5:5 + count] = parameters
+        self._tx[5 + count] = self.checksum(self._tx_view[2:5 + count])
+        return self._tx_view[:6 + count]
+
+    @property
+    def buffered(self) -> int:
+        return self._end - self._start
+
+    def clear(self):
+        self._start = self._end = 0
+
+    def feed(self, data) -> None:
+        """Append received bytes to the receive buffer, dropping the oldest bytes on overflow."""
+        count = len(data)
+        capacity = len(self._rx)
+        if count >= capacity:
+            self.discarded_bytes += self.buffered + count - capacity
+            self._rx_view[:] = memoryview(data)[count - capacity:]
+            self._start, self._end = 0, capacity
+            return
+        if self._end + count > capacity:
+            overflow = max(self.buffered + count - capacity, 0)
+            self._skip(overflow)
+            pending = self.buffered
+            self._rx_view[:pending] = self._rx_view[self._start:self._end]
+            self._start, self._end = 0, pending
+        self._rx_view[self._end:self._end + count] = data
+        self._end += count
+
+    def _skip(self, count):
+        self.discarded_bytes += count
+        self._start += count
+
+    def bytes_needed(self, expected_frame_length=6) -> int:
+        """How many more bytes to read to complete the frame at the front of the buffer."""
+        available = self.buffered
+        if available >= 4 and self._rx[self._start] == 0xFF and self._rx[self._start + 1] == 0xFF:
+            expected_frame_length = self._rx[self._start + 3] + 4
+        return max(expected_frame_length - available, 1)
+
+    def decode(self):
+        """Return (servo_id, error, params) for the next valid frame in the buffer, or None if incomplete."""
+        rx = self._rx
+        while self.buffered >= 6:
+            header = rx.find(self.HEADER, self._start, self._end)
+            if header < 0:
+                # Keep a trailing 0xFF, it may be the first half of the next header
+                self._skip(self.buffered - 1 if rx[self._end - 1] == 0xFF else self.buffered)
+                return None
+            if header > self._start:
+                self._skip(header - self._start)
+                continue
+            length = rx[self._start + 3]
+            if length < 2 or rx[self._start + 2] == 0xFF:
+                self._skip(1)
+                continue
+            total = length + 4
+            if self.buffered < total:
+                return None
+            start = self._start
+            if rx[start + total - 1] != self.checksum(self._rx_view[start + 2:start + total - 1]):
+                self.checksum_errors += 1
+                self._skip(1)
+                continue
+            servo_id, error = rx[start + 2], rx[start + 4]
+            params = bytes(self._rx_view[start + 5:start + total - 1])
+            self._start += total
+            if self._start == self._end:
+                self._start = self._end = 0
+            return servo_id, error, params
+        return None
+
+
 class STSServoDriver:
-    def __init__(self, port, baudrate=1000000, timeout=1):
-        self.serial = serial.Serial(port, baudrate, timeout=timeout)
+    def __init__(self, port, baudrate=1000000, timeout=1, serial_instance=None):
+        self.serial = serial_instance if serial_instance is not None else serial.Serial(port, baudrate, timeout=timeout)
         self.dir_pin = None  # Placeholder if a GPIO pin is used to control direction
+        self.codec = PacketCodec()
+        self.log_errors = True  # Print failed replies (disabled while probing for servos)
+        self.last_errors: Dict[int, int] = {}  # Error byte of the most recent reply, per servo
 
     @staticmethod
     def calculate_checksum(packet):
@@ -87,78 +252,179 @@ class STSServoDriver:
         return (~sum(packet)) & 0xFF
 
     def send_packet(self, servo_id, instruction, parameters):
-        """Send a packet to the servo."""
-        packet = [0xFF, 0xFF, servo_id, len(parameters) + 2, instruction] + parameters
-        packet.append(self.calculate_checksum(packet[2:]))
-        self.serial.write(bytearray(packet))
-
-    def receive_packet(self):
-        """Receive a packet from the servo."""
-        try:
-            response = self.serial.read(2)  # Header
-            if response != b'\xFF\xFF':
-                raise ValueError("Invalid header")
-
-            # Read the rest of the packet
-            servo_id = self.serial.read(1)[0]
-            length = self.serial.read(1)[0]
-            error = self.serial.read(1)[0]
-            params = self.serial.read(length - 2)
-            checksum = self.serial.read(1)[0]
+        """Send a packet to the servo, dropping late replies to earlier, timed-out requests first."""
+        self.codec.clear()
+        reset_input_buffer = getattr(self.serial, "reset_input_buffer", None)
+        if reset_input_buffer is not None:
+            reset_input_buffer()
+        self.serial.write(self.codec.encode(servo_id, instruction, parameters))
 
-            # Validate checksum
-            if checksum != self.calculate_checksum([servo_id, length, error] + list(params)):
-                raise ValueError("Checksum error")
+    def receive_packet(self, param_length=None, expected_ids: Container[int] = None):
+        """Receive a packet from the servo.
 
-            return servo_id, error, params
+        When the number of parameter bytes in the reply is known the whole frame
+        is requested from the port in a single read. Frames from servos other than
+        expected_ids (when given) are discarded.
+        """
+        codec = self.codec
+        expected = 6 + (param_length or 0)
+        try:
+            while True:
+                response = codec.decode()
+                while response is None:
+                    data = self.serial.read(codec.bytes_needed(expected))
+                    if not data:
+                        raise TimeoutError("no reply")
+                    codec.feed(data)
+                    response = codec.decode()
+                if expected_ids is None or response[0] in expected_ids:
+                    break
+            self.last_errors[response[0]] = response[1]
+            return response
         except Exception as e:
-            print(f"Error reading packet: {e}")
+            if self.log_errors:
+                print(f"Error reading packet: {e}")
             return None
 
     def ping(self, servo_id):
         """Ping a servo to see if it responds."""
         self.send_packet(servo_id, Instruction.PING, [])
-        response = self.receive_packet()
+        response = self.receive_packet(0, (servo_id,))
         return response is not None
 
     def read_register(self, servo_id, register, length=1):
-        """Read one or more bytes from a servo's register."""
+        """Read one or more bytes from a servo's register.
+
+        The data is returned even when the reply carries error bits (overheating,
+        overload, ...); they are kept in last_errors.
+        """
         self.send_packet(servo_id, Instruction.READ, [register, length])
-        response = self.receive_packet()
+        response = self.receive_packet(length, (servo_id,))
         if response:
             _, error, params = response
-            return params if error == 0 else None
+            return params
         return None
 
     def write_register(self, servo_id, register, values):
         """Write one or more bytes to a servo's register."""
-        self.send_packet(servo_id, Instruction.WRITE, [register] + values)
-        response = self.receive_packet()
+        self.send_packet(servo_id, Instruction.WRITE, [register] + list(values))
+        response = self.receive_packet(0, (servo_id,))
         return response is not None
 
+    def reg_write(self, servo_id, register, values):
+        """Stage a register write; the servo applies it on the next ACTION."""
+        self.send_packet(servo_id, Instruction.REGWRITE, [register] + list(values))
+        if servo_id == BROADCAST_ID:
+            return True
+        return self.receive_packet(0, (servo_id,)) is not None
+
+    def action(self, servo_id=BROADCAST_ID):
+        """Apply the staged REG WRITE of one servo, or of every servo on the bus (broadcast, no reply)."""
+        self.send_packet(servo_id, Instruction.ACTION, [])
+        if servo_id == BROADCAST_ID:
+            return True
+        return self.receive_packet(0, (servo_id,)) is not None
+
+    def sync_write(self, register, data: Dict[int, bytes]):
+        """Write the same register range on several servos with a single packet (no reply)."""
+        if not data:
+            return
+        values = list(data.values())
+        length = len(values[0])
+        if any(len(value) != length for value in values):
+            raise ValueError("sync_write requires the same number of bytes for every servo")
+        parameters = [register, length]
+        for servo_id, value in data.items():
+            parameters.append(servo_id)
+            parameters.extend(value)
+        self.send_packet(BROADCAST_ID, Instruction.SYNCWRITE, parameters)
+
+    def sync_read_with_errors(self, servo_ids: Iterable[int], register, length=1,
+                              timeout: float = None) -> Dict[int, Tuple[int, bytes]]:
+        """Read the same register range from several servos in one bus transaction.
+
+        Servos answer one after another in the order given; servos that do not
+        answer are missing from the returned dict of (error byte, data). A timeout
+        (seconds) overrides the port's read timeout for this transaction.
+        """
+        servo_ids = list(servo_ids)
+        previous_timeout = self.serial.timeout
+        if timeout is not None:
+            self.serial.timeout = timeout
+        try:
+            self.send_packet(BROADCAST_ID, Instruction.SYNCREAD, [register, length] + servo_ids)
+            result = {}
+            pending = set(servo_ids)
+            for _ in servo_ids:
+                response = self.receive_packet(length, pending)
+                if response is None:
+                    break
+                servo_id, error, params = response
+                pending.discard(servo_id)
+                if len(params) == length:
+                    result[servo_id] = (error, bytes(params))
+            return result
+        finally:
+            if timeout is not None:
+                self.serial.timeout = previous_timeout
+
+    def sync_read(self, servo_ids: Iterable[int], register, length=1) -> Dict[int, bytes]:
+        """Like sync_read_with_errors, without the error bytes (they are kept in last_errors)."""
+        return {servo_id: data for servo_id, (_, data) in self.sync_read_with_errors(servo_ids, register, length).items()}
+
+    @staticmethod
+    def position_payload(position, speed=0x0FFF) -> bytes:
+        """Bytes written at TARGET_POSITION to command a move."""
+        return _POSITION_PAYLOAD.pack(position, speed)
+
     def set_target_position(self, servo_id, position, speed=0x0FFF):
         """Set the target position of the servo."""
-        position_bytes = list(struct.pack('<H', position))
-        speed_bytes = list(struct.pack('<H', speed))
-        self.write_register(servo_id, STSRegisters.TARGET_POSITION, position_bytes + speed_bytes)
+        self.write_register(servo_id, STSRegisters.TARGET_POSITION, list(self.position_payload(position, speed)))
+
+    def sync_set_target_positions(self, positions: Dict[int, int], speed=0x0FFF):
+        """Set the target positions of several servos with one packet so they start together."""
+        self.sync_write(STSRegisters.TARGET_POSITION,
+                        {servo_id: self.position_payload(position, speed) for servo_id, position in positions.items()})
+
+    def stage_target_positions(self, positions: Dict[int, int], speed=0x0FFF) -> Dict[int, bool]:
+        """Preload target positions with REG WRITE; they start together on the next action()."""
+        return {servo_id: self.reg_write(servo_id, STSRegisters.TARGET_POSITION, self.position_payload(position, speed))
+                for servo_id, position in positions.items()}
+
+    def sync_get_current_positions(self, servo_ids: Iterable[int]) -> Dict[int, int]:
+        """Get the current positions of several servos in one bus transaction."""
+        response = self.sync_read(servo_ids, STSRegisters.CURRENT_POSITION, 2)
+        return {servo_id: _U16.unpack(data)[0] for servo_id, data in response.items()}
+
+    def read_status(self, servo_id) -> Optional[ServoStatus]:
+        """Read position, speed, load, voltage, temperature and current with one block read."""
+        response = self.read_register(servo_id, STATUS_BLOCK_START, STATUS_BLOCK_LENGTH)
+        if response and len(response) == STATUS_BLOCK_LENGTH:
+            return ServoStatus.from_block(response, self.last_errors.get(servo_id, 0))
+        return None
+
+    def sync_read_status(self, servo_ids: Iterable[int], timeout: float = None) -> Dict[int, ServoStatus]:
+        """Read the feedback block of several servos in one bus transaction."""
+        response = self.sync_read_with_errors(servo_ids, STATUS_BLOCK_START, STATUS_BLOCK_LENGTH, timeout)
+        return {servo_id: ServoStatus.from_block(data, error) for servo_id, (error, data) in response.items()}
 
     def get_current_position(self, servo_id):
         """Get the current position of the servo."""
         response = self.read_register(servo_id, STSRegisters.CURRENT_POSITION, 2)
         if response:
-            return struct.unpack('<H', bytes(response))[0]
+            return _U16.unpack(response)[0]
         return None
     
     def get_target_position(self, servo_id):
         """Get the target position of the servo."""
         response = self.read_register(servo_id, STSRegisters.TARGET_POSITION, 2)
         if response:
-            return struct.unpack('<H', bytes(response))[0]
+            return _U16.unpack(response)[0]
         return None
 
     def get_current_torque(self, servo_id):
         """Get the current torque/current of the servo."""
         response = self.read_register(servo_id, STSRegisters.CURRENT_CURRENT, 2)
         if response:
-            return struct.unpack('<H', bytes(response))[0]
+            return _U16.unpack(response)[0]
         return None
\ No newline at end of file
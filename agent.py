@@ -1,44 +1,79 @@
-import cv2
-import base64
-from openai import OpenAI
+import time
+from typing import List, Literal, Optional
+from concurrent.futures import ThreadPoolExecutor, wait
+from threading import Thread, Event, Condition
 from tts import AudioGenerator
 from robot import Robot
 from pydantic import BaseModel
+from camera import CameraCapture
+from preprocess import EncodedFrame, FramePreprocessor, PreprocessConfig
+from timing import StageTimings
+from response_cache import ResponseCache, frame_signature
+from backends import CORRECT, PLAN, InferenceBackend, OpenAIBackend
+
+
+SUPERSEDE_DEFAULT = 10.0     # Seconds before a call counts as late, until inference latency has been measured
+SUPERSEDE_FACTOR = 3.0       # Late: this many times the p95 inference latency
+SUPERSEDE_FLOOR = 1.0        # ... but never less than this many seconds
+SUPERSEDE_MIN_SAMPLES = 3
 
 
 class Movement(BaseModel):
     servoID: int
     change: int
 
+class Check(BaseModel):
+    servoID: int
+    outcome: Literal["reached", "blocked"]  # blocked: stopped short of the target, e.g. the gripper closed on an object
+
+class Step(BaseModel):
+    moves: List[Movement]  # Executed together as one coordinated move
+    check: Check | None    # Verified after the step; a failed check ends the plan and the model is asked again
+
 class Response(BaseModel):
     analysis: str
     done: bool
     movement: Movement | None
+    plan: List[Step]       # Sequence executed locally before the next model call (movement is used when empty)
 
 
 
 class Agent:
-    def __init__(self, use_bot: bool = True):
+    def __init__(self, use_bot: bool = True, camera_source=0, preprocess: PreprocessConfig = None,
+                 client=None, cache_responses: bool = True, backend: InferenceBackend = None, speak: bool = False):
         self.audio_generator = AudioGenerator()
-        self.client = OpenAI()
+        self.speak = speak  # Read the analysis aloud (queued in the background, never blocks the loop)
+        # Model behind the loop: OpenAI by default (client: e.g. a stub with the OpenAI client interface),
+        # or any backend from backends.py such as a replay stub or a router to a fast local model
+        self.backend = backend or OpenAIBackend(client=client)
         self.window_name = "Camera Feed"
         self.use_bot = use_bot
+        # Kept open for the agent's lifetime; camera_source may also be a video/image file or directory
+        self.camera = CameraCapture(camera_source)
+        self.timings = StageTimings()  # Per-stage wall-clock time of the perceive-act loop
+        # ROI crop, token budget and JPEG quality of the frames sent to the model
+        self.preprocessor = FramePreprocessor(preprocess)
+        # Reuses the last response while the scene and the commanded positions are unchanged
+        self.response_cache = ResponseCache() if cache_responses else None
+        self.last_call_cached = False
+        self.last_frame_id = 0
+        self.superseded_calls = 0
+        self.model_calls = 0
+        self._cancel = Event()
         if self.use_bot:
             self.robot = Robot()
 
+    def prepare_frame(self, frame) -> EncodedFrame:
+        """Crop, downscale and JPEG-encode a frame for a vision request (cached per frame)"""
+        return self.preprocessor.process(frame)
+
     def encode_frame(self, frame):
         """Convert cv2 frame to base64 string"""
-        _, buffer = cv2.imencode('.jpg', frame)
-        return base64.b64encode(buffer).decode('utf-8')
-
-    def get_camera_frame(self):
-        """Get a single frame from the camera"""
-        cap = cv2.VideoCapture(0)
-        ret, frame = cap.read()
-        cap.release()
-        
-        if not ret:
-            raise RuntimeError("Failed to grab frame from camera")
+        return self.prepare_frame(frame).base64
+
+    def get_camera_frame(self, newer_than: int = 0):
+        """Get the latest frame from the camera (a copy, the capture ring reuses its buffers)"""
+        frame, self.last_frame_id, _ = self.camera.latest(newer_than=newer_than, copy=True)
         
         print(f"Frame size: {frame.shape[1]}x{frame.shape[0]}")
         
@@ -46,74 +81,254 @@ class Agent:
 
     def analyze_frame(self, frame):
         """Get GPT-4V analysis of frame"""
-        base64_frame = self.encode_frame(frame)
-        
-        response = self.client.beta.chat.completions.create(
-            # model="gpt-4o-mini",
-            model="gpt-4o",
-            messages=[{
-                "role": "user", 
-                "content": [{
-                    "type": "text",
-                    "text": "Describe the contents of the image in detail."
-                },
-                {
-                    "type": "image_url",
-                    "image_url": {
-                        "url": f"data:image/jpeg;base64,{base64_frame}",
-                        "detail": "high"
-                    }
-                }]
-            }],
-            max_tokens=300
-        )
-        
-        return response.choices[0].message.content
-
-    def analyze_with_prompt(self, frame, command: str):
-        """Send frame to GPT-4V with custom prompt"""
-        response = self.client.beta.chat.completions.parse(
-            model="gpt-4o",
-            messages=[{
-                "role": "user",
-                "content": [{
-                    "type": "text",
-                    "text": command
-                },
-                {
-                    "type": "image_url", 
-                    "image_url": {
-                        "url": f"data:image/jpeg;base64,{self.encode_frame(frame)}",
-                        "detail": "high"
-                    }
-                }]
-            }],
-            response_format=Response,
-            temperature=0.7,
-            max_tokens=300,
-            timeout=30
-        )
-        parsed_response = response.choices[0].message.parsed
+        encoded = self.prepare_frame(frame)
+        print(f"Sending {encoded.describe()}")
+
+        return self.backend.describe("Describe the contents of the image in detail.", encoded, max_tokens=300)
+
+    def _scene_context(self):
+        """Commanded servo positions: a cached response only applies if the arm was not moved since"""
+        if not self.use_bot:
+            return None
+        return tuple(servo.target_position for servo in self.robot.servos)
+
+    def analyze_with_prompt(self, frame, command: str, encoded: EncodedFrame = None, phase: str = PLAN,
+                            use_cache: bool = True):
+        """Send frame to the model with custom prompt (encoded: the frame already converted by prepare_frame)
+
+        phase tells a routing backend whether this is a planning call or a corrective step.
+
+        If the response cache holds a response for the same command, the same commanded
+        positions and a similar frame, that response is returned without a model call
+        (unless use_cache is False). Responses without a movement or plan are not cached.
+        """
+        self.last_call_cached = False
+        if self.response_cache is not None:
+            context = self._scene_context()
+            signature = frame_signature(frame)
+            cached = self.response_cache.get(command, frame, context, signature) if use_cache else None
+            if cached is not None:
+                self.last_call_cached = True
+                print("Scene unchanged, reusing previous response")
+                return cached
+        if encoded is None:
+            encoded = self.prepare_frame(frame)
+        print(f"Sending {encoded.describe()}")
+        start = time.perf_counter()
+        parsed_response = self.backend.generate(command, encoded, Response, phase)
+        self.model_calls += 1
+        # A response that neither acts nor finishes leaves the scene and the commanded positions as they
+        # were, so a cached copy would be replayed on every frame until it expires: ask again instead
+        if self.response_cache is not None and (parsed_response.done or self.plan_steps(parsed_response)):
+            self.response_cache.put(command, frame, parsed_response, context, tokens=self.backend.last_tokens,
+                                    seconds=time.perf_counter() - start, signature=signature)
         print(parsed_response)
         return parsed_response
 
-    def run(self, command: str):
+    @staticmethod
+    def plan_steps(response: Response) -> List[Step]:
+        """The response's plan, or its single movement as a one-step plan"""
+        if response.plan:
+            return list(response.plan)
+        if response.movement:
+            return [Step(moves=[response.movement], check=None)]
+        return []
+
+    @staticmethod
+    def with_feedback(command: str, feedback: Optional[str]) -> str:
+        return command if not feedback else f"{command}\n\nRESULT OF THE PREVIOUS PLAN:\n{feedback}"
 
+    def _check(self, check: Check, tolerance: int) -> Optional[str]:
+        """None if the expected outcome was observed, otherwise a description of what happened"""
+        servo = self.robot.servos.get_servo_by_id(check.servoID)
+        servo.refresh()
+        if servo.status is None:
+            return f"servo {check.servoID} did not reply"
+        position, target = servo.status.position, servo.target_position
+        reached = abs(position - target) <= tolerance
+        if check.outcome == "reached" and reached:
+            return None
+        if check.outcome == "blocked" and not reached and not servo.status.moving:
+            return None
+        return f"servo {check.servoID} expected {check.outcome}, but is at {position} with target {target}"
+
+    def execute_plan(self, steps: List[Step], step_duration: float = 0.5, settle_timeout: float = 2.0,
+                     tolerance: int = 20) -> str:
+        """Execute plan steps as coordinated multi-joint moves, stopping at the first failed check
+
+        Returns:
+            Feedback for the next model call describing how far the plan got
+        """
+        for index, step in enumerate(steps, 1):
+            offsets = {}
+            for move in step.moves:
+                offsets[move.servoID] = offsets.get(move.servoID, 0) + move.change
+            try:
+                current = self.robot._read_joints(list(offsets), max_age=0)
+                self.robot.move_joints({servo_id: current[servo_id] + offset for servo_id, offset in offsets.items()},
+                                       step_duration)
+            except Exception as e:
+                print(f"Error moving robot: {e}")
+                return f"Step {index}/{len(steps)} failed: {e}"
+            with self.timings.measure("settle"):
+                self._wait_until_settled(settle_timeout)
+            if step.check is not None:
+                failure = self._check(step.check, tolerance)
+                if failure is not None:
+                    return f"Executed {index - 1}/{len(steps)} steps; check after step {index} failed: {failure}"
+        return f"Executed all {len(steps)} steps."
+
+    def run(self, command: str, step_duration: float = 0.5):
+        """Perceive-act loop: each model call returns a plan that is executed before the next call"""
         done = False
+        frame_id = 0
+        response = None
+        feedback = None
+        calls_before = self.model_calls
         while not done:
             """Get single frame analysis with custom prompt"""
-            frame = self.get_camera_frame()
-            response = self.analyze_with_prompt(frame, command)
+            # After a cached response, wait for a new frame instead of re-checking the same one
+            frame = self.get_camera_frame(newer_than=frame_id if self.last_call_cached else 0)
+            frame_id = self.last_frame_id
+            # The first call plans; later calls are corrective steps (a RouterBackend may send them to a faster model)
+            response = self.analyze_with_prompt(frame, self.with_feedback(command, feedback),
+                                                phase=CORRECT if response else PLAN)
             print("\nGPT-4V Analysis:")
             print(response)
-            # self.audio_generator.say(response.analysis)
-            if self.use_bot:
-                if response.movement:
-                    try:
-                        self.robot.move_relative(response.movement.servoID, response.movement.change)
-                    except Exception as e:
-                        print(f"Error moving robot: {e}")
+            if self.speak:
+                self.audio_generator.say(response.analysis)
+            steps = self.plan_steps(response)
+            if self.use_bot and steps:
+                feedback = self.execute_plan(steps, step_duration)
+                print(feedback)
             done = response.done
+        print(f"Task finished after {self.model_calls - calls_before} model calls")
+        return response
+
+    def cancel(self):
+        """Stop a running pipelined loop; its outstanding model call is abandoned"""
+        self._cancel.set()
+
+    def _wait_until_settled(self, timeout: float) -> None:
+        """Poll the servos until none reports MOVING_STATUS (or timeout)"""
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            self.robot.servos.refresh(max_age=0)
+            if not any(servo.status and servo.status.moving for servo in self.robot.servos):
+                return
+            time.sleep(0.01)
+
+    def _actuate(self, steps: List[Step], settle_timeout: float):
+        """Execute a plan (each step waits for the arm to settle); returns the time it settled and the plan feedback"""
+        with self.timings.measure("actuation"):
+            feedback = self.execute_plan(steps, settle_timeout=settle_timeout)
+        return time.time(), feedback
+
+    def _infer(self, frame, command: str, encoded: EncodedFrame, phase: str, use_cache: bool = True):
+        with self.timings.measure("inference"):
+            return self.analyze_with_prompt(frame, command, encoded, phase, use_cache)
+
+    def supersede_limit(self) -> float:
+        """Seconds after which a model call counts as late: a multiple of the measured p95 inference latency"""
+        summary = self.timings.summary().get("inference")
+        if summary is None or summary["count"] < SUPERSEDE_MIN_SAMPLES:
+            return SUPERSEDE_DEFAULT
+        return max(SUPERSEDE_FLOOR, SUPERSEDE_FACTOR * summary["p95_ms"] / 1000)
+
+    def run_pipelined(self, command: str, settle_timeout: float = 2.0, supersede_after: float = None):
+        """Asynchronous perceive-act loop
+
+        Frames are captured and encoded continuously on a background thread, so capture and
+        encoding of the next frame overlap the execution of the current movement. A model call
+        starts on the first frame captured after the arm has settled. Once a call runs longer
+        than supersede_after seconds (default: supersede_limit(), from the measured inference
+        latency) and a newer frame exists, it is abandoned and a call on the newest frame starts
+        right away, bypassing the response cache. A request cannot be withdrawn, so the abandoned
+        call keeps running to completion; there is at most one, so at most two calls run at once.
+        Stage timings are kept in self.timings.
+        """
+        self._cancel.clear()
+        latest = {}
+        frame_ready = Condition()
+        stop = Event()
+
+        def capture_and_encode():
+            frame_id = 0
+            while not stop.is_set():
+                try:
+                    with self.timings.measure("capture"):
+                        # Copied: the frame is kept through inference, longer than its ring slot lives
+                        frame, frame_id, captured_at = self.camera.latest(1.0, frame_id, copy=True)
+                except RuntimeError:
+                    continue
+                with self.timings.measure("encode"):
+                    encoded = self.prepare_frame(frame)
+                with frame_ready:
+                    latest.update(frame=frame, captured_at=captured_at, encoded=encoded)
+                    frame_ready.notify_all()
+
+        def next_frame(after: float):
+            with frame_ready:
+                while not frame_ready.wait_for(lambda: latest.get("captured_at", 0) > after, 0.5):
+                    if self._cancel.is_set():
+                        return None
+                return dict(latest)
+
+        def newest_frame(after: float):
+            with frame_ready:
+                return dict(latest) if latest.get("captured_at", 0) > after else None
+
+        encoder = Thread(target=capture_and_encode, name="agent-encoder", daemon=True)
+        encoder.start()
+        # One worker for the live call, one for a call abandoned while it still runs
+        inference_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="agent-inference")
+        settled_at = time.time()
+        response = None
+        abandoned = None
+        prompt = command
+        try:
+            while not self._cancel.is_set():
+                loop_start = time.perf_counter()
+                snapshot = next_frame(settled_at)
+                if snapshot is None:
+                    break
+                limit = self.supersede_limit() if supersede_after is None else supersede_after
+                phase = CORRECT if response else PLAN
+                call = inference_pool.submit(self._infer, snapshot["frame"], prompt, snapshot["encoded"], phase)
+                late_at = time.perf_counter() + limit
+                superseded = False
+                while not call.done() and not self._cancel.is_set():
+                    wait([call], timeout=0.1)
+                    if call.done() or superseded or time.perf_counter() < late_at or \
+                            (abandoned is not None and not abandoned.done()):
+                        continue
+                    newer = newest_frame(snapshot["captured_at"])
+                    if newer is None:
+                        continue
+                    # The call is late and about a frame that is old by now: leave it running and ask
+                    # about the newest frame at once (a cached answer would be the one we gave up on)
+                    self.superseded_calls += 1
+                    superseded = True
+                    abandoned, snapshot = call, newer
+                    call = inference_pool.submit(self._infer, snapshot["frame"], prompt, snapshot["encoded"], phase,
+                                                 False)
+                if self._cancel.is_set():
+                    break
+                response = call.result()
+                print("\nGPT-4V Analysis:")
+                print(response)
+                steps = self.plan_steps(response)
+                if self.use_bot and steps:
+                    # Frames keep being captured and encoded on the encoder thread while the arm moves
+                    settled_at, feedback = self._actuate(steps, settle_timeout)
+                    prompt = self.with_feedback(command, feedback)
+                self.timings.record("loop", time.perf_counter() - loop_start)
+                if response.done:
+                    break
+        finally:
+            stop.set()
+            inference_pool.shutdown(wait=False, cancel_futures=True)
+            encoder.join()
         return response
 
 
@@ -149,11 +364,13 @@ The agent operates in a continuous loop until the task is complete:
 
 1. Takes a picture from the camera
 2. Sends the image to GPT-4V along with the command and bot description
-3. GPT-4V analyzes the image and suggests a small movement (e.g. +-50 ticks)
-4. The robot executes that movement
-5. Loop repeats from step 1 until GPT-4V sets done=True
+3. GPT-4V analyzes the image and returns a plan: a short sequence of steps (e.g. up to 10)
+4. The robot executes the steps one by one; the moves within a step run together as one coordinated motion
+5. Loop repeats from step 1 after the last step, or earlier when a step's check fails, until GPT-4V sets done=True
 
-This allows GPT-4V to make small, iterative adjustments while getting visual feedback after each movement.
+Put the whole sequence you expect to need into plan instead of a single movement. Add a check to a step when the rest of the plan depends on its outcome:
+outcome "reached" = the servo arrived at its target, "blocked" = it stopped short of it (e.g. the gripper closed on an object).
+The result of the previous plan is appended to the prompt, so you can correct the plan with visual feedback.
 
 CURRENT COMMAND:
 Close the gripper. Use stepamounts of +-50 ticks. Set Done to True when gripper is closed.
@@ -0,0 +1,239 @@
+"""
+Asyncio variant of STSServoDriver.
+
+Same register API as Driver.STSServoDriver, but every call is a coroutine built on
+non-blocking serial I/O with a per-request deadline in milliseconds, so a missing servo
+costs a few ms instead of stalling the caller for the 1 s serial timeout. Several tasks
+(supervisor, telemetry logger, motion planner) can share one event loop; transactions are
+serialised by an asyncio.Lock.
+
+On POSIX the port's file descriptor is watched with loop.add_reader, so it works with real
+adapters as well as pty-based fake buses; serial-like objects without a file descriptor
+are polled.
+
+    python async_driver.py /dev/ttyUSB0
+"""
+
+import asyncio
+import sys
+from typing import Dict, Iterable, Optional, Tuple
+
+import serial
+
+from Driver import (PacketCodec, STSServoDriver, ServoStatus, Instruction, STSRegisters, BROADCAST_ID,
+                    STATUS_BLOCK_START, STATUS_BLOCK_LENGTH, _U16)
+
+POLL_INTERVAL = 0.0005  # Seconds between polls for serial-like objects without a file descriptor
+
+
+class AsyncSTSServoDriver:
+    def __init__(self, port=None, baudrate=1000000, deadline_ms=20, serial_instance=None):
+        self.serial = serial_instance if serial_instance is not None else serial.Serial(port, baudrate, timeout=0)
+        self.deadline_ms = deadline_ms
+        self.codec = PacketCodec()
+        self.timeouts = 0
+        self.last_errors: Dict[int, int] = {}  # Error byte of the most recent reply, per servo
+        self._lock = asyncio.Lock()
+        self._data_ready = asyncio.Event()
+        self._loop = None
+        self._fd = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def _attach(self):
+        """Start watching the port on the running loop (done lazily on the first transaction)"""
+        if self._loop is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        try:
+            fd = self.serial.fileno()
+        except (AttributeError, OSError, ValueError):
+            fd = None
+        if fd is not None:
+            try:
+                self._loop.add_reader(fd, self._on_readable)
+                self._fd = fd
+            except (NotImplementedError, ValueError):
+                self._fd = None
+
+    def close(self):
+        if self._loop is not None and self._fd is not None:
+            self._loop.remove_reader(self._fd)
+        self._fd = None
+        self._loop = None
+        self.serial.close()
+
+    def _read_available(self) -> bool:
+        waiting = self.serial.in_waiting
+        if waiting:
+            self.codec.feed(self.serial.read(waiting))
+        return bool(waiting)
+
+    def _on_readable(self):
+        if self._read_available():
+            self._data_ready.set()
+
+    async def _receive(self, deadline: float):
+        """Wait for the next valid frame until the loop time reaches deadline"""
+        while True:
+            frame = self.codec.decode()
+            if frame is not None:
+                return frame
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                self.timeouts += 1
+                return None
+            if self._fd is None:
+                if not self._read_available():
+                    await asyncio.sleep(min(POLL_INTERVAL, remaining))
+                continue
+            self._data_ready.clear()
+            try:
+                await asyncio.wait_for(self._data_ready.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    def _deadline(self, deadline_ms):
+        return self._loop.time() + (self.deadline_ms if deadline_ms is None else deadline_ms) / 1000
+
+    async def transaction(self, servo_id, instruction, parameters, replies=1, deadline_ms=None,
+                          expected_ids: Iterable[int] = None):
+        """Send one packet and collect up to `replies` status packets before the deadline
+
+        Only the first reply of each servo in expected_ids (default: the addressed servo)
+        counts; frames from other servos, such as late replies to earlier timed-out requests,
+        are dropped and the wait continues until the deadline.
+        """
+        pending = {servo_id} if expected_ids is None else set(expected_ids)
+        async with self._lock:
+            self._attach()
+            # Drop late replies to earlier, timed-out requests
+            self.codec.clear()
+            reset_input_buffer = getattr(self.serial, "reset_input_buffer", None)
+            if reset_input_buffer is not None:
+                reset_input_buffer()
+            self.serial.write(self.codec.encode(servo_id, instruction, parameters))
+            deadline = self._deadline(deadline_ms)
+            responses = []
+            while len(responses) < replies:
+                response = await self._receive(deadline)
+                if response is None:
+                    break
+                if response[0] not in pending:
+                    continue
+                pending.discard(response[0])
+                self.last_errors[response[0]] = response[1]
+                responses.append(response)
+            return responses
+
+    async def ping(self, servo_id, deadline_ms=None) -> bool:
+        """Ping a servo to see if it responds."""
+        return bool(await self.transaction(servo_id, Instruction.PING, [], deadline_ms=deadline_ms))
+
+    async def read_register(self, servo_id, register, length=1, deadline_ms=None):
+        """Read one or more bytes from a servo's register (error bits are kept in last_errors)."""
+        responses = await self.transaction(servo_id, Instruction.READ, [register, length], deadline_ms=deadline_ms)
+        if responses:
+            _, error, params = responses[0]
+            return params
+        return None
+
+    async def write_register(self, servo_id, register, values, deadline_ms=None) -> bool:
+        """Write one or more bytes to a servo's register."""
+        responses = await self.transaction(servo_id, Instruction.WRITE, [register] + list(values),
+                                           replies=0 if servo_id == BROADCAST_ID else 1, deadline_ms=deadline_ms)
+        return servo_id == BROADCAST_ID or bool(responses)
+
+    async def reg_write(self, servo_id, register, values, deadline_ms=None) -> bool:
+        """Stage a register write; the servo applies it on the next ACTION."""
+        responses = await self.transaction(servo_id, Instruction.REGWRITE, [register] + list(values),
+                                           replies=0 if servo_id == BROADCAST_ID else 1, deadline_ms=deadline_ms)
+        return servo_id == BROADCAST_ID or bool(responses)
+
+    async def action(self, servo_id=BROADCAST_ID, deadline_ms=None) -> bool:
+        """Apply the staged REG WRITE of one servo, or of every servo on the bus (broadcast, no reply)."""
+        responses = await self.transaction(servo_id, Instruction.ACTION, [],
+                                           replies=0 if servo_id == BROADCAST_ID else 1, deadline_ms=deadline_ms)
+        return servo_id == BROADCAST_ID or bool(responses)
+
+    async def sync_write(self, register, data: Dict[int, bytes]):
+        """Write the same register range on several servos with a single packet (no reply)."""
+        if not data:
+            return
+        lengths = {len(value) for value in data.values()}
+        if len(lengths) != 1:
+            raise ValueError("sync_write requires the same number of bytes for every servo")
+        parameters = [register, lengths.pop()]
+        for servo_id, value in data.items():
+            parameters.append(servo_id)
+            parameters.extend(value)
+        await self.transaction(BROADCAST_ID, Instruction.SYNCWRITE, parameters, replies=0)
+
+    async def sync_read_with_errors(self, servo_ids: Iterable[int], register, length=1,
+                                    deadline_ms=None) -> Dict[int, Tuple[int, bytes]]:
+        """Read the same register range from several servos in one bus transaction, with each error byte."""
+        servo_ids = list(servo_ids)
+        responses = await self.transaction(BROADCAST_ID, Instruction.SYNCREAD, [register, length] + servo_ids,
+                                           replies=len(servo_ids), deadline_ms=deadline_ms, expected_ids=servo_ids)
+        return {servo_id: (error, params) for servo_id, error, params in responses if len(params) == length}
+
+    async def sync_read(self, servo_ids: Iterable[int], register, length=1, deadline_ms=None) -> Dict[int, bytes]:
+        """Read the same register range from several servos in one bus transaction."""
+        response = await self.sync_read_with_errors(servo_ids, register, length, deadline_ms)
+        return {servo_id: data for servo_id, (_, data) in response.items()}
+
+    async def set_target_position(self, servo_id, position, speed=0x0FFF, deadline_ms=None):
+        """Set the target position of the servo."""
+        return await self.write_register(servo_id, STSRegisters.TARGET_POSITION,
+                                         STSServoDriver.position_payload(position, speed), deadline_ms=deadline_ms)
+
+    async def sync_set_target_positions(self, positions: Dict[int, int], speed=0x0FFF):
+        """Set the target positions of several servos with one packet so they start together."""
+        await self.sync_write(STSRegisters.TARGET_POSITION,
+                              {servo_id: STSServoDriver.position_payload(position, speed)
+                               for servo_id, position in positions.items()})
+
+    async def _read_u16(self, servo_id, register, deadline_ms):
+        response = await self.read_register(servo_id, register, 2, deadline_ms=deadline_ms)
+        return _U16.unpack(response)[0] if response else None
+
+    async def get_current_position(self, servo_id, deadline_ms=None):
+        """Get the current position of the servo."""
+        return await self._read_u16(servo_id, STSRegisters.CURRENT_POSITION, deadline_ms)
+
+    async def get_target_position(self, servo_id, deadline_ms=None):
+        """Get the target position of the servo."""
+        return await self._read_u16(servo_id, STSRegisters.TARGET_POSITION, deadline_ms)
+
+    async def get_current_torque(self, servo_id, deadline_ms=None):
+        """Get the current torque/current of the servo."""
+        return await self._read_u16(servo_id, STSRegisters.CURRENT_CURRENT, deadline_ms)
+
+    async def read_status(self, servo_id, deadline_ms=None) -> Optional[ServoStatus]:
+        """Read position, speed, load, voltage, temperature and current with one block read."""
+        response = await self.read_register(servo_id, STATUS_BLOCK_START, STATUS_BLOCK_LENGTH, deadline_ms=deadline_ms)
+        if response and len(response) == STATUS_BLOCK_LENGTH:
+            return ServoStatus.from_block(response, self.last_errors.get(servo_id, 0))
+        return None
+
+    async def sync_read_status(self, servo_ids: Iterable[int], deadline_ms=None) -> Dict[int, ServoStatus]:
+        """Read the feedback block of several servos in one bus transaction."""
+        response = await self.sync_read_with_errors(servo_ids, STATUS_BLOCK_START, STATUS_BLOCK_LENGTH,
+                                                    deadline_ms=deadline_ms)
+        return {servo_id: ServoStatus.from_block(data, error) for servo_id, (error, data) in response.items()}
+
+
+async def _main(port):
+    async with AsyncSTSServoDriver(port) as driver:
+        found = [servo_id for servo_id in range(1, 7) if await driver.ping(servo_id, deadline_ms=5)]
+        print(f"Servos responding on {port}: {found}")
+        for servo_id, status in (await driver.sync_read_status(found)).items():
+            print(servo_id, status)
+
+
+if __name__ == "__main__":
+    asyncio.run(_main(sys.argv[1] if len(sys.argv) > 1 else "/dev/ttyUSB0"))
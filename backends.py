@@ -0,0 +1,260 @@
+"""
+Inference backends for the agent: structured responses from an image and a prompt.
+
+    OpenAIBackend       - OpenAI vision model with structured outputs (the default, gpt-4o)
+    LocalModelBackend   - small vision model behind a local OpenAI-compatible server
+                          (Ollama, llama.cpp, vLLM), JSON mode parsed into the schema
+    ReplayBackend       - deterministic stub replaying canned or recorded responses, for
+                          running and benchmarking the control loop offline
+    RecordingBackend    - wraps a backend and records its responses for later replay
+    RouterBackend       - sends planning calls to one backend and corrective steps to another
+
+Every backend records the latency of each call in self.timings (see timing.py) and the
+token usage of its last call in self.last_tokens.
+"""
+
+import json
+import time
+from abc import ABC, abstractmethod
+from typing import Iterable, Optional, Type, Union
+
+from openai import OpenAI
+from pydantic import BaseModel
+
+from preprocess import EncodedFrame
+from timing import StageTimings
+
+PLAN = "plan"
+CORRECT = "correct"
+
+
+class InferenceBackend(ABC):
+    name = "backend"
+
+    def __init__(self):
+        self.timings = StageTimings()
+        self.last_tokens = 0
+
+    def generate(self, prompt: str, image: EncodedFrame, response_format: Type[BaseModel],
+                 phase: str = PLAN) -> BaseModel:
+        """Structured response for an image and a prompt
+
+        Args:
+            phase: PLAN for coarse planning, CORRECT for fine corrective steps (used for routing)
+        """
+        with self.timings.measure(self.name):
+            return self._generate(prompt, image, response_format, phase)
+
+    def describe(self, prompt: str, image: EncodedFrame, max_tokens: int = 300) -> str:
+        """Free-text answer about an image"""
+        with self.timings.measure(self.name):
+            return self._describe(prompt, image, max_tokens)
+
+    @abstractmethod
+    def _generate(self, prompt, image, response_format, phase):
+        """Backend-specific generate(); set self.last_tokens"""
+
+    @abstractmethod
+    def _describe(self, prompt, image, max_tokens):
+        """Backend-specific describe(); set self.last_tokens"""
+
+
+def _messages(prompt: str, image: EncodedFrame):
+    return [{
+        "role": "user",
+        "content": [{
+            "type": "text",
+            "text": prompt
+        },
+        {
+            "type": "image_url",
+            "image_url": {
+                "url": image.data_url,
+                "detail": image.detail
+            }
+        }]
+    }]
+
+
+def _total_tokens(response, image: EncodedFrame) -> int:
+    usage = getattr(response, "usage", None)
+    return usage.total_tokens if usage is not None else image.tokens
+
+
+class OpenAIBackend(InferenceBackend):
+    name = "openai"
+
+    def __init__(self, model: str = "gpt-4o", client=None, temperature: float = 0.7, max_tokens: int = 300,
+                 timeout: float = 30):
+        """
+        Args:
+            client: Anything with the OpenAI client's beta.chat.completions interface; OpenAI() when None
+        """
+        super().__init__()
+        self.model = model
+        self.client = client or OpenAI()
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.timeout = timeout
+
+    def _generate(self, prompt, image, response_format, phase):
+        response = self.client.beta.chat.completions.parse(
+            model=self.model,
+            messages=_messages(prompt, image),
+            response_format=response_format,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            timeout=self.timeout
+        )
+        self.last_tokens = _total_tokens(response, image)
+        return response.choices[0].message.parsed
+
+    def _describe(self, prompt, image, max_tokens):
+        response = self.client.beta.chat.completions.create(
+            model=self.model,
+            messages=_messages(prompt, image),
+            max_tokens=max_tokens
+        )
+        self.last_tokens = _total_tokens(response, image)
+        return response.choices[0].message.content
+
+
+class LocalModelBackend(InferenceBackend):
+    name = "local"
+
+    def __init__(self, model: str = "qwen2.5vl:3b", base_url: str = "http://localhost:11434/v1",
+                 temperature: float = 0.2, max_tokens: int = 300, timeout: float = 10):
+        """
+        Args:
+            model: Vision model served locally (default: a small Qwen2.5-VL on Ollama)
+            base_url: OpenAI-compatible endpoint of the local server
+        """
+        super().__init__()
+        self.model = model
+        self.client = OpenAI(base_url=base_url, api_key="local")
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.timeout = timeout
+
+    def _generate(self, prompt, image, response_format, phase):
+        # Small local models rarely support strict structured outputs: ask for JSON matching the schema
+        schema = json.dumps(response_format.model_json_schema())
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=_messages(f"{prompt}\n\nAnswer only with a JSON object matching this schema:\n{schema}", image),
+            response_format={"type": "json_object"},
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            timeout=self.timeout
+        )
+        self.last_tokens = _total_tokens(response, image)
+        return response_format.model_validate_json(response.choices[0].message.content)
+
+    def _describe(self, prompt, image, max_tokens):
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=_messages(prompt, image),
+            max_tokens=max_tokens,
+            timeout=self.timeout
+        )
+        self.last_tokens = _total_tokens(response, image)
+        return response.choices[0].message.content
+
+
+class ReplayBackend(InferenceBackend):
+    name = "replay"
+
+    def __init__(self, responses: Iterable[Union[BaseModel, dict]], delay: float = 0.0, loop: bool = False):
+        """
+        Args:
+            responses: Responses returned in order (models, or dicts validated against the requested schema)
+            delay: Simulated latency per call in seconds
+            loop: Start over at the end instead of raising
+        """
+        super().__init__()
+        self.responses = list(responses)
+        self.delay = delay
+        self.loop = loop
+        self.calls = 0
+
+    @classmethod
+    def from_jsonl(cls, path: str, **kwargs) -> "ReplayBackend":
+        """Replay responses recorded by RecordingBackend"""
+        with open(path) as f:
+            return cls([json.loads(line) for line in f if line.strip()], **kwargs)
+
+    def _next(self):
+        if self.calls >= len(self.responses) and not (self.loop and self.responses):
+            raise RuntimeError(f"Replay exhausted after {self.calls} calls")
+        response = self.responses[self.calls % len(self.responses)]
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        return response
+
+    def _generate(self, prompt, image, response_format, phase):
+        response = self._next()
+        self.last_tokens = 0
+        return response if isinstance(response, BaseModel) else response_format.model_validate(response)
+
+    def _describe(self, prompt, image, max_tokens):
+        response = self._next()
+        self.last_tokens = 0
+        return response if isinstance(response, str) else str(response)
+
+
+class RecordingBackend(InferenceBackend):
+    name = "recording"
+
+    def __init__(self, backend: InferenceBackend, path: str):
+        """Pass calls through to backend and append each structured response to a JSONL file"""
+        super().__init__()
+        self.backend = backend
+        self.path = path
+
+    def _generate(self, prompt, image, response_format, phase):
+        response = self.backend.generate(prompt, image, response_format, phase)
+        self.last_tokens = self.backend.last_tokens
+        with open(self.path, "a") as f:
+            f.write(response.model_dump_json() + "\n")
+        return response
+
+    def _describe(self, prompt, image, max_tokens):
+        text = self.backend.describe(prompt, image, max_tokens)
+        self.last_tokens = self.backend.last_tokens
+        return text
+
+
+class RouterBackend(InferenceBackend):
+    name = "router"
+
+    def __init__(self, planner: InferenceBackend, corrector: InferenceBackend, replan_every: Optional[int] = 5):
+        """
+        Args:
+            planner: Large model for planning calls
+            corrector: Fast model for corrective steps
+            replan_every: Route to the planner after this many consecutive corrective steps (None: never)
+        """
+        super().__init__()
+        self.planner = planner
+        self.corrector = corrector
+        self.replan_every = replan_every
+        self.corrections_since_plan = 0
+
+    def route(self, phase: str) -> InferenceBackend:
+        if phase == PLAN or (self.replan_every is not None and self.corrections_since_plan >= self.replan_every):
+            self.corrections_since_plan = 0
+            return self.planner
+        self.corrections_since_plan += 1
+        return self.corrector
+
+    def _generate(self, prompt, image, response_format, phase):
+        backend = self.route(phase)
+        response = backend.generate(prompt, image, response_format, phase)
+        self.last_tokens = backend.last_tokens
+        return response
+
+    def _describe(self, prompt, image, max_tokens):
+        text = self.planner.describe(prompt, image, max_tokens)
+        self.last_tokens = self.planner.last_tokens
+        return text
@@ -0,0 +1,81 @@
+"""
+Micro-benchmark for the STS packet codec in Driver.py.
+
+Runs entirely in memory against a loopback fake serial port, so no servo is needed:
+
+    python bench_codec.py [iterations]
+
+Reports packets/s for encoding, decoding and a full driver round-trip (read_register).
+"""
+
+import sys
+import time
+from Driver import PacketCodec, STSServoDriver, Instruction, STSRegisters
+
+
+class LoopbackSerial:
+    """Serial-like object that answers every instruction packet with an OK status packet."""
+
+    def __init__(self):
+        self.timeout = 0
+        self._reply_codec = PacketCodec()
+        self._pending = b''
+
+    def write(self, data):
+        data = bytes(data)
+        servo_id, instruction = data[2], data[4]
+        params = bytes(data[6]) if instruction == Instruction.READ else b''
+        self._pending += bytes(self._reply_codec.encode(servo_id, 0, params))
+        return len(data)
+
+    def read(self, size=1):
+        data, self._pending = self._pending[:size], self._pending[size:]
+        return data
+
+    def close(self):
+        pass
+
+
+def _rate(count, seconds):
+    return count / seconds if seconds > 0 else float('inf')
+
+
+def bench_encode(iterations):
+    codec = PacketCodec()
+    parameters = [STSRegisters.TARGET_POSITION, 0x00, 0x08, 0xFF, 0x0F]
+    start = time.perf_counter()
+    for _ in range(iterations):
+        codec.encode(1, Instruction.WRITE, parameters)
+    return _rate(iterations, time.perf_counter() - start)
+
+
+def bench_decode(iterations):
+    frame = bytes(PacketCodec().encode(1, 0, b'\x00\x08'))
+    codec = PacketCodec()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        codec.feed(frame)
+        codec.decode()
+    return _rate(iterations, time.perf_counter() - start)
+
+
+def bench_round_trip(iterations):
+    driver = STSServoDriver(None, serial_instance=LoopbackSerial())
+    start = time.perf_counter()
+    for _ in range(iterations):
+        driver.read_register(1, STSRegisters.CURRENT_POSITION, 2)
+    return _rate(iterations, time.perf_counter() - start)
+
+
+def run(iterations=100000):
+    return {
+        "encode": bench_encode(iterations),
+        "decode": bench_decode(iterations),
+        "round_trip": bench_round_trip(iterations),
+    }
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    for name, rate in run(iterations).items():
+        print(f"{name:>10}: {rate:12,.0f} packets/s")
@@ -0,0 +1,331 @@
+"""
+Benchmark and latency profiling of the control stack against the simulated servo bus.
+
+Measures, without hardware or network access:
+
+- driver: round-trip latency percentiles and packets/s per instruction (ping, read, write,
+  sync read/write, REG WRITE and REG WRITE + ACTION), directly and through the BusWorker thread
+- print_status: cost of rendering the status table (cached and with a refresh)
+- deformable: DeformableController step cost and achieved loop rate
+- agent: perceive-act step latency split into capture, encode, inference (ReplayBackend
+  stub with a configurable delay) and actuation
+
+Results are written as JSON together with the git commit, so hot-path regressions can be
+compared across commits:
+
+    python benchmark.py --output before.json
+    ... change something ...
+    python benchmark.py --output after.json --compare before.json
+
+By default the bus replies instantly (frozen simulator clock), so the numbers are the
+software cost of each path; --realtime adds the simulated 1 Mbps wire time and servo dynamics.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from Driver import STSRegisters, STSServoDriver
+from simulator import SimulatedSerial, make_arm_bus
+from timing import StageTimings, percentile
+
+REGRESSION_THRESHOLD = 0.10  # Relative change reported as a regression by --compare
+ABSOLUTE_FLOOR_MS = 0.05     # Smaller changes (of a latency, or of the period behind a rate) are noise
+
+
+def _frozen_clock() -> float:
+    return 0.0
+
+
+def make_driver(realtime: bool = False) -> STSServoDriver:
+    """Driver on a simulated SO-ARM100 bus; instant replies unless realtime"""
+    bus = make_arm_bus(clock=time.monotonic if realtime else _frozen_clock)
+    return STSServoDriver("sim", serial_instance=SimulatedSerial(bus))
+
+
+def make_robot(realtime: bool = False):
+    from robot import Robot
+    return Robot(make_driver(realtime), profile=None)
+
+
+def latency_summary(samples: List[float]) -> Dict[str, float]:
+    """Count, mean and percentile latencies in milliseconds"""
+    return {
+        "count": len(samples),
+        "mean_ms": sum(samples) / len(samples) * 1000 if samples else None,
+        "p50_ms": percentile(samples, 0.5) * 1000 if samples else None,
+        "p95_ms": percentile(samples, 0.95) * 1000 if samples else None,
+        "p99_ms": percentile(samples, 0.99) * 1000 if samples else None,
+        "max_ms": max(samples) * 1000 if samples else None,
+    }
+
+
+def time_calls(function: Callable[[], object], iterations: int, warmup: int = 10) -> List[float]:
+    for _ in range(warmup):
+        function()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_driver(iterations: int, realtime: bool = False) -> Dict[str, dict]:
+    """Round-trip latency per instruction; packets counts the request plus the expected replies"""
+    from bus import BusDriver, BusWorker
+
+    driver = make_driver(realtime)
+    servo_ids = [1, 2, 3, 4, 5, 6]
+    positions = {servo_id: driver.get_current_position(servo_id) for servo_id in servo_ids}
+    torque_limit = driver.read_register(1, STSRegisters.TORQUE_LIMIT, 2)
+    payload = STSServoDriver.position_payload(positions[1])
+    cases = {
+        "ping": (lambda: driver.ping(1), 2),
+        "read": (lambda: driver.read_register(1, STSRegisters.CURRENT_POSITION, 2), 2),
+        "read_status": (lambda: driver.read_status(1), 2),
+        "write": (lambda: driver.write_register(1, STSRegisters.TORQUE_LIMIT, torque_limit), 2),
+        "sync_read_status": (lambda: driver.sync_read_status(servo_ids), 1 + len(servo_ids)),
+        "sync_write": (lambda: driver.sync_set_target_positions(positions), 1),
+        "reg_write": (lambda: driver.reg_write(1, STSRegisters.TARGET_POSITION, payload), 2),
+        # A complete staged move, so ACTION always has a write to apply and no case depends on another
+        "reg_write_action": (lambda: (driver.reg_write(1, STSRegisters.TARGET_POSITION, payload), driver.action()),
+                             3),
+    }
+    results = {}
+    for name, (function, packets) in cases.items():
+        samples = time_calls(function, iterations)
+        driver.action()  # Apply any leftover REG WRITE (of the current position) before the next case
+        elapsed = sum(samples)
+        results[name] = {**latency_summary(samples), "per_s": len(samples) / elapsed,
+                         "packets_per_s": len(samples) * packets / elapsed}
+
+    # The same round trips through the prioritized bus thread used by Robot
+    worker = BusWorker(driver, name="bench-bus")
+    proxy = BusDriver(worker)
+    try:
+        worker_cases = {
+            "bus_worker_read": (lambda: proxy.read_register(1, STSRegisters.CURRENT_POSITION, 2), 2),
+            "bus_worker_sync_read_status": (lambda: proxy.sync_read_status(servo_ids), 1 + len(servo_ids)),
+        }
+        for name, (function, packets) in worker_cases.items():
+            samples = time_calls(function, iterations)
+            elapsed = sum(samples)
+            results[name] = {**latency_summary(samples), "per_s": len(samples) / elapsed,
+                             "packets_per_s": len(samples) * packets / elapsed}
+    finally:
+        worker.stop()
+    return results
+
+
+def bench_print_status(robot, iterations: int) -> Dict[str, dict]:
+    """Servos.print_status cost, rendering the cached snapshot and with a forced refresh"""
+    servos = robot.servos
+    results = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        results["cached"] = latency_summary(time_calls(lambda: servos.print_status(refresh=False), iterations))
+        servos.set_max_age(0)
+        try:
+            results["refresh"] = latency_summary(time_calls(lambda: servos.print_status(refresh=True), iterations))
+        finally:
+            servos.set_max_age(0.05)
+    return results
+
+
+def bench_deformable(robot, seconds: float, rate_hz: float, iterations: int) -> Dict[str, object]:
+    """Cost of one compliance step and the loop rate achieved at rate_hz"""
+    from deformable import DeformableController
+
+    controller = DeformableController(robot, rate_hz=rate_hz, render_hz=0)
+    step = latency_summary(time_calls(controller.control_step, iterations))
+    controller.start_monitoring()
+    time.sleep(seconds)
+    controller.stop_monitoring()
+    stats = controller.get_stats()
+    # achieved_hz is only updated once per second; fall back to the average over the run
+    if not stats["achieved_hz"]:
+        stats["achieved_hz"] = stats["cycles"] / seconds
+    return {"step": step, **stats}
+
+
+def _write_test_image(folder: str) -> str:
+    import cv2
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, (480, 640, 3), dtype=np.uint8)
+    path = os.path.join(folder, "frame.png")
+    cv2.imwrite(path, image)
+    return path
+
+
+def _replay_responses():
+    """Wiggle the wrist back and forth, never finishing"""
+    return [
+        {"analysis": "bench", "done": False, "movement": None,
+         "plan": [{"moves": [{"servoID": 2, "change": change}], "check": None}]}
+        for change in (50, -50)
+    ]
+
+
+def bench_agent(robot, steps: int, inference_delay: float, step_duration: float) -> Dict[str, dict]:
+    """Perceive-act step latency by stage, with a stubbed model and a still image as camera"""
+    from agent import Agent
+    from backends import ReplayBackend
+    from preprocess import FramePreprocessor
+
+    timings = StageTimings()
+    with tempfile.TemporaryDirectory() as folder, contextlib.redirect_stdout(io.StringIO()):
+        backend = ReplayBackend(_replay_responses(), delay=inference_delay, loop=True)
+        agent = Agent(use_bot=False, camera_source=_write_test_image(folder), backend=backend,
+                      cache_responses=False)
+        agent.use_bot, agent.robot = True, robot
+        # Every step encodes its frame, as with a live camera
+        agent.preprocessor = FramePreprocessor(agent.preprocessor.config, cache_size=0)
+        try:
+            frame_id = 0
+            for _ in range(steps):
+                step_start = time.perf_counter()
+                with timings.measure("capture"):
+                    frame = agent.get_camera_frame(newer_than=frame_id)
+                    frame_id = agent.last_frame_id
+                with timings.measure("encode"):
+                    encoded = agent.prepare_frame(frame)
+                with timings.measure("inference"):
+                    response = agent.analyze_with_prompt(frame, "bench", encoded)
+                with timings.measure("actuation"):
+                    agent.execute_plan(agent.plan_steps(response), step_duration, settle_timeout=step_duration)
+                timings.record("step", time.perf_counter() - step_start)
+        finally:
+            agent.camera.stop()
+    return timings.summary()
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(iterations: int = 500, realtime: bool = False, deformable_seconds: float = 2.0, deformable_hz: float = 100.0,
+        agent_steps: int = 10, inference_delay: float = 0.0, step_duration: float = 0.1,
+        sections: List[str] = None) -> Dict[str, object]:
+    sections = sections or ["driver", "print_status", "deformable", "agent"]
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "time": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "realtime": realtime,
+            "iterations": iterations,
+        },
+    }
+    if "driver" in sections:
+        results["driver"] = bench_driver(iterations, realtime)
+    robot = make_robot(realtime) if set(sections) & {"print_status", "deformable", "agent"} else None
+    try:
+        if "print_status" in sections:
+            results["print_status"] = bench_print_status(robot, iterations)
+        if "deformable" in sections:
+            results["deformable"] = bench_deformable(robot, deformable_seconds, deformable_hz, iterations)
+        if "agent" in sections:
+            results["agent"] = bench_agent(robot, agent_steps, inference_delay, step_duration)
+    finally:
+        if robot is not None:
+            robot.bus.stop()
+    return results
+
+
+def _flatten(results: dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(baseline: dict, current: dict, threshold: float = REGRESSION_THRESHOLD,
+            floor_ms: float = ABSOLUTE_FLOOR_MS) -> List[str]:
+    """Lines describing metrics that got worse by more than threshold (latencies up, rates down)
+
+    Changes below floor_ms are ignored, so timer noise on paths that take a few microseconds is not flagged;
+    for rates the floor applies to the change of the period (1 / rate).
+    """
+    old, new = _flatten({k: v for k, v in baseline.items() if k != "meta"}), \
+        _flatten({k: v for k, v in current.items() if k != "meta"})
+    regressions = []
+    for name in sorted(old.keys() & new.keys()):
+        before, after = old[name], new[name]
+        if not before:
+            continue
+        change = (after - before) / before
+        if name.endswith(("mean_ms", "p50_ms", "p95_ms")):  # max and p99 are too noisy to gate on
+            worse = change > threshold and after - before >= floor_ms
+        elif name.endswith(("per_s", "_hz")):
+            worse = change < -threshold and (not after or 1000 / after - 1000 / before >= floor_ms)
+        else:
+            continue
+        if worse:
+            regressions.append(f"{name}: {before:.4g} -> {after:.4g} ({change:+.0%})")
+    return regressions
+
+
+def print_report(results: dict) -> None:
+    for name, entry in results.get("driver", {}).items():
+        print(f"driver {name:>28}: p50 {entry['p50_ms']:7.3f} ms  p99 {entry['p99_ms']:7.3f} ms  "
+              f"{entry['packets_per_s']:10,.0f} packets/s")
+    for name, entry in results.get("print_status", {}).items():
+        print(f"print_status {name:>22}: p50 {entry['p50_ms']:7.3f} ms  p99 {entry['p99_ms']:7.3f} ms")
+    if "deformable" in results:
+        deformable = results["deformable"]
+        print(f"deformable: step p50 {deformable['step']['p50_ms']:.3f} ms, "
+              f"{deformable['achieved_hz']:.1f}/{deformable['target_hz']:.0f} Hz, {deformable['overruns']} overruns")
+    for stage, entry in results.get("agent", {}).items():
+        print(f"agent {stage:>29}: mean {entry['mean_ms']:8.2f} ms  p95 {entry['p95_ms']:8.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", "-o", help="JSON file for the results (default: benchmark-<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results to compare against; exits with 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument("--floor", type=float, default=ABSOLUTE_FLOOR_MS,
+                        help="Ignore changes smaller than this many milliseconds")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--realtime", action="store_true", help="Include simulated wire time and dynamics")
+    parser.add_argument("--agent-steps", type=int, default=10)
+    parser.add_argument("--inference-delay", type=float, default=0.0, help="Stubbed model latency in seconds")
+    parser.add_argument("--sections", nargs="+", choices=["driver", "print_status", "deformable", "agent"])
+    args = parser.parse_args()
+
+    results = run(args.iterations, args.realtime, agent_steps=args.agent_steps, inference_delay=args.inference_delay,
+                  sections=args.sections)
+    print_report(results)
+    output = args.output or f"benchmark-{results['meta']['commit'] or 'local'}.json"
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("realtime") != results["meta"]["realtime"]:
+            print("Warning: comparing runs with and without --realtime")
+        regressions = compare(baseline, results, args.threshold, args.floor)
+        for line in regressions:
+            print(f"Regression: {line}")
+        if regressions:
+            sys.exit(1)
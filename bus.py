@@ -0,0 +1,174 @@
+"""
+Single bus-owner thread for an STSServoDriver.
+
+The servo bus is half duplex: a request and its reply must not be interleaved with
+another caller's request. BusWorker owns the driver and executes every transaction on
+its own thread, ordered by priority (emergency/torque-off first, then motion, then
+telemetry polling). Callers get a concurrent.futures.Future or an asyncio awaitable,
+or use BusDriver, a drop-in proxy with the STSServoDriver API that blocks on the result.
+"""
+
+import asyncio
+import itertools
+import time
+from collections import deque
+from concurrent.futures import Future
+from enum import IntEnum
+from queue import PriorityQueue
+from threading import Thread, Event, Lock, get_ident
+from typing import Dict
+
+from Driver import STSServoDriver, STSRegisters
+
+
+class Priority(IntEnum):
+    EMERGENCY = 0
+    MOTION = 1
+    TELEMETRY = 2
+
+
+_STOP = 99  # Sorts after every real priority so queued work is drained before stopping
+
+MOTION_METHODS = {
+    "write_register", "sync_write", "set_target_position", "sync_set_target_positions",
+    "reg_write", "action", "stage_target_positions",
+}
+LOCAL_METHODS = {"calculate_checksum", "position_payload"}
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(int(fraction * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+class BusMetrics:
+    """Queue-wait and service latencies of recent transactions, per priority"""
+
+    def __init__(self, window: int = 1000):
+        self._lock = Lock()
+        self.counts = {priority: 0 for priority in Priority}
+        self.errors = 0
+        self.wait = {priority: deque(maxlen=window) for priority in Priority}
+        self.service = {priority: deque(maxlen=window) for priority in Priority}
+
+    def record(self, priority: Priority, wait: float, service: float, failed: bool) -> None:
+        with self._lock:
+            self.counts[priority] += 1
+            self.errors += failed
+            self.wait[priority].append(wait)
+            self.service[priority].append(service)
+
+    def summary(self) -> Dict[str, dict]:
+        """Transaction counts and latency percentiles (milliseconds) per priority"""
+        result = {}
+        with self._lock:
+            for priority in Priority:
+                wait = sorted(self.wait[priority])
+                service = sorted(self.service[priority])
+                result[priority.name.lower()] = {
+                    "count": self.counts[priority],
+                    "wait_p50_ms": _ms(_percentile(wait, 0.5)),
+                    "wait_p99_ms": _ms(_percentile(wait, 0.99)),
+                    "service_p50_ms": _ms(_percentile(service, 0.5)),
+                    "service_p99_ms": _ms(_percentile(service, 0.99)),
+                    "service_max_ms": _ms(service[-1] if service else None),
+                }
+        return result
+
+
+def _ms(seconds):
+    return None if seconds is None else seconds * 1000
+
+
+class BusWorker:
+    def __init__(self, driver: STSServoDriver, name: str = "servo-bus"):
+        self.driver = driver
+        self.metrics = BusMetrics()
+        self._queue = PriorityQueue()
+        self._sequence = itertools.count()  # Keeps FIFO order within one priority
+        self._stopped = Event()
+        self._thread = Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def on_worker_thread(self) -> bool:
+        return get_ident() == self._thread.ident
+
+    def submit(self, function, *args, priority: Priority = Priority.TELEMETRY, **kwargs) -> Future:
+        """Queue a bus transaction; function is called on the bus thread"""
+        if self._stopped.is_set():
+            raise RuntimeError("Bus worker is stopped")
+        future = Future()
+        self._queue.put((int(priority), next(self._sequence), time.perf_counter(), future, function, args, kwargs))
+        return future
+
+    def submit_async(self, function, *args, priority: Priority = Priority.TELEMETRY, **kwargs) -> asyncio.Future:
+        """Queue a bus transaction and return an awaitable for the running event loop"""
+        return asyncio.wrap_future(self.submit(function, *args, priority=priority, **kwargs))
+
+    def call(self, function, *args, priority: Priority = Priority.TELEMETRY, timeout: float = None, **kwargs):
+        """Run a bus transaction and wait for its result"""
+        if self.on_worker_thread:
+            return function(*args, **kwargs)
+        return self.submit(function, *args, priority=priority, **kwargs).result(timeout)
+
+    def stop(self, timeout: float = None) -> None:
+        """Finish the queued transactions and stop the bus thread"""
+        if not self._stopped.is_set():
+            self._stopped.set()
+            self._queue.put((_STOP, next(self._sequence), 0, None, None, (), {}))
+        if not self.on_worker_thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            priority, _, queued_at, future, function, args, kwargs = self._queue.get()
+            if priority == _STOP:
+                break
+            if not future.set_running_or_notify_cancel():
+                continue
+            started = time.perf_counter()
+            failed = False
+            try:
+                result = function(*args, **kwargs)
+            except BaseException as e:
+                failed = True
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            self.metrics.record(Priority(priority), started - queued_at, time.perf_counter() - started, failed)
+
+
+def priority_for(method: str, args) -> Priority:
+    """Classify a driver call: torque-off writes are emergencies, other writes are motion"""
+    if method == "write_register" and len(args) >= 3 and args[1] == STSRegisters.TORQUE_SWITCH and not any(args[2]):
+        return Priority.EMERGENCY
+    if method == "sync_write" and len(args) >= 2 and args[0] == STSRegisters.TORQUE_SWITCH \
+            and not any(any(value) for value in args[1].values()):
+        return Priority.EMERGENCY
+    if method in MOTION_METHODS:
+        return Priority.MOTION
+    return Priority.TELEMETRY
+
+
+class BusDriver:
+    """Drop-in STSServoDriver replacement that runs every call on a BusWorker thread"""
+
+    def __init__(self, bus: BusWorker):
+        self.bus = bus
+
+    def __getattr__(self, name):
+        attribute = getattr(self.bus.driver, name)
+        if not callable(attribute) or name in LOCAL_METHODS:
+            return attribute
+
+        def call(*args, **kwargs):
+            return self.bus.call(attribute, *args, priority=priority_for(name, args), **kwargs)
+        call.__name__ = name
+        return call
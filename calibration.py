@@ -0,0 +1,205 @@
+"""
+Automated joint calibration from load sensing.
+
+Each joint is swept slowly in both directions with reduced torque while the feedback block
+of all servos is streamed with one SYNC READ per cycle. A mechanical end stop (or, for the
+gripper, the fingers closing on each other or on an object) shows up as a load spike and a
+growing gap between the commanded and the measured position; the stop positions then give
+the joint limits. The result is stored as a per-robot profile that Robot loads at startup,
+replacing the hard-coded SERVO_LIMITS and the manual FD.exe procedure in STS-Tips.txt:
+
+    profile = calibrate(robot)               # or robot.calibrate()
+    save_profile(profile, profile_path())    # ~/.easybot/profiles/default.json
+
+Works against simulator.make_arm_bus(), whose end stops sit just outside the default limits.
+"""
+
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from Driver import STSRegisters
+from servo import ServoLimits
+
+PROFILE_DIR = os.path.join(os.path.expanduser("~"), ".easybot", "profiles")
+PROFILE_VERSION = 1
+TICKS_MAX = 4095
+
+
+@dataclass
+class SweepSettings:
+    speed: float = 400.0         # Sweep speed, ticks/s
+    rate_hz: float = 50.0        # Setpoint and sampling rate
+    load_threshold: int = 150    # |load| (0.1 % units) that counts as a spike
+    stall_lag: int = 60          # Commanded-vs-measured gap (ticks) that counts as stalled
+    confirm: int = 3             # Consecutive samples needed to accept a stop
+    torque_limit: int = 300      # TORQUE_LIMIT during the sweep (0.1 %), so contacts stay gentle
+    margin: int = 40             # Distance kept from a detected end stop
+    timeout: float = 15.0        # Seconds per sweep direction
+
+
+@dataclass
+class JointCalibration:
+    servo_id: int
+    min_stop: int
+    max_stop: int
+    limits: ServoLimits
+    samples: List[Tuple[float, int, int]] = field(default_factory=list, repr=False)  # (time, position, load)
+
+
+@dataclass
+class CalibrationProfile:
+    limits: Dict[int, ServoLimits]
+    stops: Dict[int, Tuple[int, int]] = field(default_factory=dict)  # Detected (min, max) end stops
+    created: float = field(default_factory=time.time)
+
+
+def profile_path(name: str = "default") -> str:
+    return os.path.join(PROFILE_DIR, f"{name}.json")
+
+
+def save_profile(profile: CalibrationProfile, path: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    data = {
+        "version": PROFILE_VERSION,
+        "created": profile.created,
+        "limits": {str(servo_id): asdict(limits) for servo_id, limits in profile.limits.items()},
+        "stops": {str(servo_id): list(stops) for servo_id, stops in profile.stops.items()},
+    }
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def load_profile(path: str) -> Optional[CalibrationProfile]:
+    """The profile stored at path, or None if there is none (or it cannot be read)"""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("version") != PROFILE_VERSION:
+            return None
+        return CalibrationProfile(
+            limits={int(servo_id): ServoLimits(**limits) for servo_id, limits in data["limits"].items()},
+            stops={int(servo_id): tuple(stops) for servo_id, stops in data.get("stops", {}).items()},
+            created=data.get("created", 0.0),
+        )
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _sweep(robot, servo_id: int, start: int, direction: int, settings: SweepSettings,
+           samples: List[Tuple[float, int, int]]) -> int:
+    """Move one joint from start in direction until it stops; returns the measured stop position
+
+    Raises:
+        RuntimeError: If no stop is found within settings.timeout
+    """
+    driver = robot.driver
+    servo_ids = [servo.id for servo in robot.servos]
+    period = 1.0 / settings.rate_hz
+    step = settings.speed * period
+    target = float(start)
+    hits = stalls = 0
+    began = time.perf_counter()
+    next_cycle = began
+    position = start
+    found = False
+    while time.perf_counter() - began < settings.timeout:
+        target = min(TICKS_MAX, max(0, target + direction * step))
+        # Bypass Servo.clamp: the point is to find out where the real limits are
+        driver.sync_set_target_positions({servo_id: int(target)}, speed=int(settings.speed))
+        statuses = driver.sync_read_status(servo_ids)
+        status = statuses.get(servo_id)
+        for servo in robot.servos:
+            servo.update_status(statuses.get(servo.id))
+        if status is not None:
+            position = status.position
+            samples.append((time.perf_counter() - began, status.position, status.load))
+            spike = abs(status.load) >= settings.load_threshold
+            # Once the target is clamped at the end of the encoder range the lag cannot grow any
+            # further, so a stop closer to the end than stall_lag is recognised by the load alone
+            clamped = target in (0, TICKS_MAX) and abs(target - status.position) >= 2
+            stalled = abs(target - status.position) >= settings.stall_lag or (clamped and spike)
+            # Acceleration alone also causes load spikes: a stop needs the joint to fall behind as well,
+            # or to stay behind for longer (a weak stop that never reaches the load threshold)
+            hits = hits + 1 if spike and stalled else 0
+            stalls = stalls + 1 if stalled else 0
+            if hits >= settings.confirm or stalls >= 3 * settings.confirm:
+                found = True
+                break
+        if target in (0, TICKS_MAX) and status is not None and abs(target - status.position) < 2:
+            found = True
+            break  # Reached the end of the encoder range without a stop
+        next_cycle += period
+        time.sleep(max(0.0, next_cycle - time.perf_counter()))
+    # Back off so the joint does not keep pushing against the stop
+    back_off = position - direction * settings.margin
+    driver.sync_set_target_positions({servo_id: int(back_off)})
+    robot.servos.get_servo_by_id(servo_id).record_target(int(back_off))
+    if not found:
+        raise RuntimeError(f"Servo {servo_id}: no end stop detected within {settings.timeout:g} s "
+                           f"(last position {position})")
+    return position
+
+
+def calibrate_joint(robot, servo_id: int, settings: SweepSettings = None, default: int = None,
+                    gripper: bool = False) -> JointCalibration:
+    """Find both end stops of one joint and derive its limits
+
+    Args:
+        default: Preferred default position, used when it lies within the new limits
+        gripper: The closing stop (low ticks) is the finger contact position and is used as the
+            closed limit without margin; the default is the open limit
+    """
+    settings = settings or SweepSettings()
+    driver = robot.driver
+    servo = robot.servos.get_servo_by_id(servo_id)
+    status = driver.read_status(servo_id)
+    if status is None:
+        raise RuntimeError(f"Servo {servo_id} not responding")
+    # Through the register map, so its mirror of TORQUE_LIMIT stays valid (raises if the read fails)
+    registers = robot.registers
+    torque_limit = registers.get(servo_id, STSRegisters.TORQUE_LIMIT)
+    registers.set_torque_limit(servo_id, settings.torque_limit)
+    registers.flush()
+    samples = []
+    try:
+        min_stop = _sweep(robot, servo_id, status.position, -1, settings, samples)
+        max_stop = _sweep(robot, servo_id, min_stop + settings.margin, 1, settings, samples)
+    finally:
+        registers.set_torque_limit(servo_id, torque_limit)
+        registers.flush()
+
+    low = min_stop if gripper else min_stop + settings.margin
+    high = max_stop - settings.margin
+    if low >= high:
+        raise RuntimeError(f"Servo {servo_id}: no usable range between the stops at {min_stop} and {max_stop}")
+    if gripper:
+        default_pos = high
+    elif default is not None and low <= default <= high:
+        default_pos = default
+    else:
+        default_pos = (low + high) // 2
+    limits = ServoLimits(low, high, default_pos)
+    servo.limits = limits
+    servo.set_position(default_pos)
+    return JointCalibration(servo_id, min_stop, max_stop, limits, samples)
+
+
+def calibrate(robot, servo_ids: List[int] = None, settings: SweepSettings = None,
+              gripper_id: int = 1) -> CalibrationProfile:
+    """Calibrate the given joints (all by default) one after another and return the profile
+
+    The servos' limits are updated in place as each joint finishes.
+    """
+    servo_ids = [servo.id for servo in robot.servos] if servo_ids is None else servo_ids
+    limits, stops = {}, {}
+    for servo_id in servo_ids:
+        current = robot.servos.get_servo_by_id(servo_id).limits
+        result = calibrate_joint(robot, servo_id, settings, default=current.default_pos,
+                                 gripper=servo_id == gripper_id)
+        print(f"Servo {servo_id}: stops at {result.min_stop}/{result.max_stop}, limits {result.limits}")
+        limits[servo_id] = result.limits
+        stops[servo_id] = (result.min_stop, result.max_stop)
+    return CalibrationProfile(limits, stops)
@@ -0,0 +1,165 @@
+"""
+Long-lived camera capture for the agent.
+
+CameraCapture keeps the device open and grabs frames on a background thread into a small
+ring of preallocated buffers (cv2 reads straight into them), so getting the latest frame
+costs no device open, no exposure settling and no copy. A frame returned without a copy
+is only valid until the capture thread reuses its slot (buffer_size - 1 frames later, about
+100 ms at 30 fps); pass copy=True to keep it longer. The same interface works with a
+video file, a single image or a directory of images, which makes the agent testable
+without a camera:
+
+    camera = CameraCapture(0)              # device index
+    camera = CameraCapture("run.mp4")      # video file, looped
+    camera = CameraCapture("frames/")      # images in name order, looped
+"""
+
+import os
+import threading
+import time
+from typing import Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class CameraCapture:
+    def __init__(self, source: Union[int, str] = 0, buffer_size: int = 4, fps: float = 30.0, loop: bool = True,
+                 width: int = None, height: int = None):
+        """
+        Args:
+            source: Camera index, video file, image file or directory of images
+            buffer_size: Number of ring buffer slots; a returned frame stays valid until
+                buffer_size - 1 newer frames have been captured
+            fps: Playback rate for file sources (cameras run at their own rate)
+            loop: Restart file sources at the end instead of stopping
+            width, height: Requested camera resolution
+        """
+        self.source = source
+        self.buffer_size = max(2, buffer_size)
+        self.fps = fps
+        self.loop = loop
+        self.width = width
+        self.height = height
+        self.frame_count = 0
+        self.read_failures = 0
+        self._slots = [None] * self.buffer_size
+        self._timestamps = [0.0] * self.buffer_size
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self._capture = None
+        self._images = None
+        self.error = None
+
+    @property
+    def is_file_source(self) -> bool:
+        return not isinstance(self.source, int)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self) -> "CameraCapture":
+        """Open the source and start the capture thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        if isinstance(self.source, str) and os.path.isdir(self.source):
+            names = sorted(name for name in os.listdir(self.source) if name.lower().endswith(IMAGE_EXTENSIONS))
+            self._images = [os.path.join(self.source, name) for name in names]
+            if not self._images:
+                raise RuntimeError(f"No images found in {self.source}")
+        elif isinstance(self.source, str) and self.source.lower().endswith(IMAGE_EXTENSIONS):
+            self._images = [self.source]
+        else:
+            self._capture = cv2.VideoCapture(self.source)
+            if not self._capture.isOpened():
+                raise RuntimeError(f"Failed to open camera source {self.source!r}")
+            if self.width:
+                self._capture.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+            if self.height:
+                self._capture.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+            # Keep the driver-side queue short so reads return fresh frames
+            self._capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="camera-capture", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._capture is not None:
+            self._capture.release()
+            self._capture = None
+
+    def _read_into(self, slot: Optional[np.ndarray]) -> Tuple[bool, Optional[np.ndarray]]:
+        if self._images is not None:
+            path = self._images[self.frame_count % len(self._images)]
+            if not self.loop and self.frame_count >= len(self._images):
+                return False, None
+            image = cv2.imread(path)
+            if image is None:
+                return False, None
+            if slot is not None and slot.shape == image.shape:
+                np.copyto(slot, image)
+                return True, slot
+            return True, image
+        ok, frame = self._capture.read(slot) if slot is not None else self._capture.read()
+        if not ok and self.is_file_source and self.loop:
+            self._capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self._capture.read(slot) if slot is not None else self._capture.read()
+        return ok, frame
+
+    def _run(self):
+        period = 1.0 / self.fps if self.is_file_source and self.fps else 0.0
+        next_frame = time.perf_counter()
+        while not self._stop.is_set():
+            index = (self.frame_count + 1) % self.buffer_size
+            try:
+                ok, frame = self._read_into(self._slots[index])
+            except cv2.error as e:
+                ok, frame, self.error = False, None, e
+            if not ok:
+                self.read_failures += 1
+                if self.is_file_source and not self.loop:
+                    break
+                self._stop.wait(0.01)
+                continue
+            with self._condition:
+                self._slots[index] = frame
+                self._timestamps[index] = time.time()
+                self.frame_count += 1
+                self._condition.notify_all()
+            if period:
+                next_frame += period
+                self._stop.wait(max(0.0, next_frame - time.perf_counter()))
+
+    def latest(self, timeout: float = 2.0, newer_than: int = 0, copy: bool = False) -> Tuple[np.ndarray, int, float]:
+        """Most recent frame, with its sequence number and capture time
+
+        Args:
+            timeout: Seconds to wait for a frame
+            newer_than: Only return a frame with a higher sequence number than this
+            copy: Return a copy; otherwise the frame is the ring slot itself and is overwritten
+                buffer_size - 1 frames later
+
+        Raises:
+            RuntimeError: If no (new enough) frame arrives within timeout
+        """
+        if self._thread is None:
+            self.start()
+        with self._condition:
+            if not self._condition.wait_for(lambda: self.frame_count > newer_than, timeout):
+                raise RuntimeError("Failed to grab frame from camera")
+            index = self.frame_count % self.buffer_size
+            # Copied under the lock: the capture thread only writes a slot it is about to publish,
+            # never the one published last
+            frame = self._slots[index].copy() if copy else self._slots[index]
+            return frame, self.frame_count, self._timestamps[index]
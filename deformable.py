@@ -8,10 +8,11 @@ by monitoring their torque levels and automatically adjusting their positions wh
 This creates a more natural and safe interaction between the robot and its environment.
 
 Key features:
-- Continuous monitoring of servo torque levels
-- Automatic position adjustment when resistance is detected
-- Threaded implementation for non-blocking operation
-- Configurable torque thresholds and adjustment steps
+- Fixed-rate control loop (100 Hz by default) with achieved-rate and overrun reporting
+- One bulk read of load/position for all servos and one sync write of the adjustments per cycle
+- Automatic position adjustment proportional to the excess torque
+- Per-joint torque thresholds, gains and step limits
+- Terminal rendering on its own thread, outside the control path
 
 This behavior is particularly useful for:
 - Safe human-robot interaction
@@ -24,17 +25,35 @@ It may need refinement for production use.
 """
 
 from robot import Robot, ServoId
+from bus import Priority
 import time
+from dataclasses import dataclass
 from threading import Thread, Event
+from typing import Dict
+
+
+@dataclass
+class JointCompliance:
+    torque_threshold: int = 13  # Current reading above which the joint yields
+    gain: float = 0.5           # Ticks of yield per unit of torque above the threshold
+    max_step: int = 20          # Largest yield per control cycle, in ticks
 
 
 class DeformableController:
-    def __init__(self, robot: Robot):
+    def __init__(self, robot: Robot, rate_hz: float = 100.0, compliance: Dict[int, JointCompliance] = None,
+                 render_hz: float = 5.0):
         self.robot = robot
         self.stop_event = Event()
         self.monitoring_thread = None
-        self.TORQUE_THRESHOLD = 13
-        self.ADJUSTMENT_STEP = 1  # How many units to adjust position when torque is high
+        self.render_thread = None
+        self.rate_hz = rate_hz
+        self.render_hz = render_hz  # Terminal status table refresh rate, 0 disables it
+        self.compliance = {servo.id: JointCompliance() for servo in robot.servos}
+        self.compliance.update(compliance or {})
+        self.cycles = 0
+        self.overruns = 0
+        self.achieved_hz = 0.0
+        self.max_cycle_time = 0.0
 
     def start_monitoring(self):
         """Start the deformable behavior monitoring in a separate thread"""
@@ -43,44 +62,83 @@ class DeformableController:
             self.monitoring_thread = Thread(target=self._monitor_loop)
             self.monitoring_thread.daemon = True
             self.monitoring_thread.start()
+            if self.render_hz > 0:
+                self.render_thread = Thread(target=self._render_loop)
+                self.render_thread.daemon = True
+                self.render_thread.start()
 
     def stop_monitoring(self):
         """Stop the deformable behavior monitoring"""
         self.stop_event.set()
-        if self.monitoring_thread:
-            self.monitoring_thread.join()
+        for thread in (self.monitoring_thread, self.render_thread):
+            if thread:
+                thread.join()
+
+    def get_stats(self) -> Dict[str, float]:
+        """Loop timing: achieved frequency, overrun count and worst cycle time"""
+        return {
+            "target_hz": self.rate_hz,
+            "achieved_hz": self.achieved_hz,
+            "cycles": self.cycles,
+            "overruns": self.overruns,
+            "max_cycle_ms": self.max_cycle_time * 1000,
+        }
+
+    def control_step(self):
+        """One compliance cycle: bulk-read all servos, yield the overloaded ones with one sync write"""
+        servos = self.robot.servos
+        driver = self.robot.bus.driver
+        statuses = self.robot.bus.call(driver.sync_read_status, [servo.id for servo in servos],
+                                       priority=Priority.MOTION)
+        new_targets = {}
+        for servo_id, status in statuses.items():
+            servo = servos.get_servo_by_id(servo_id)
+            servo.update_status(status)
+            joint = self.compliance[servo_id]
+            excess = status.current - joint.torque_threshold
+            if excess <= 0:
+                continue
+            # Yield towards the commanded target, proportionally to the excess torque
+            direction = 1 if servo.target_position > status.position else -1
+            step = min(joint.max_step, max(1, round(joint.gain * excess)))
+            new_targets[servo_id] = status.position + direction * step
+        if new_targets:
+            servos.set_positions(new_targets)
 
     def _monitor_loop(self):
-        """Main monitoring loop that checks torque and adjusts positions"""
+        """Fixed-rate control loop; missed deadlines are counted as overruns and skipped"""
+        period = 1.0 / self.rate_hz
+        next_deadline = time.perf_counter()
+        window_start, window_cycles = next_deadline, 0
         while not self.stop_event.is_set():
-            for servo in self.robot.servos.servos:
-                try:
-                    # Get current torque and positions
-                    current_torque = self.robot.driver.get_current_torque(servo.id)
-                    if current_torque is None:
-                        continue
-
-                    if current_torque > self.TORQUE_THRESHOLD:
-                        current_pos = self.robot.driver.get_current_position(servo.id)
-                        target_pos = self.robot.driver.get_target_position(servo.id)
-                        
-                        if current_pos is None or target_pos is None:
-                            continue
-
-                        # Calculate direction of adjustment (towards target)
-                        direction = 1 if target_pos > current_pos else -1
-                        
-                        # Move slightly towards the target position
-                        new_pos = current_pos + (direction * self.ADJUSTMENT_STEP)
-                        
-                        # Apply the new position
-                        servo.set_position(new_pos)
-
-                except Exception as e:
-                    print(f"Error monitoring servo {servo.id}: {e}")
-
-            self.robot.print_status()  # Use robot's built-in status printing
-            time.sleep(0.1)  # Small delay to prevent excessive CPU usage
+            cycle_start = time.perf_counter()
+            try:
+                self.control_step()
+            except Exception as e:
+                print(f"Error in compliance loop: {e}")
+            now = time.perf_counter()
+            self.max_cycle_time = max(self.max_cycle_time, now - cycle_start)
+            self.cycles += 1
+            window_cycles += 1
+            if now - window_start >= 1.0:
+                self.achieved_hz = window_cycles / (now - window_start)
+                window_start, window_cycles = now, 0
+
+            next_deadline += period
+            if next_deadline < now:
+                self.overruns += 1
+                next_deadline = now
+            else:
+                self.stop_event.wait(next_deadline - now)
+
+    def _render_loop(self):
+        """Redraw the status table from the cached snapshot, off the control path"""
+        while not self.stop_event.wait(1.0 / self.render_hz):
+            stats = self.get_stats()
+            self.robot.servos.print_status(
+                refresh=False,
+                footer=f"Compliance loop: {stats['achieved_hz']:.1f}/{self.rate_hz:.0f} Hz, "
+                       f"{stats['overruns']} overruns, worst cycle {stats['max_cycle_ms']:.1f} ms")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,168 @@
+"""
+Serial port discovery and servo enumeration.
+
+All serial ports reported by serial.tools.list_ports are probed concurrently with short
+timeouts. On each port, IDs 1-253 are swept with batched SYNC READs of the firmware
+version registers: every servo present answers in its slot, missing IDs only leave a
+gap, so one packet covers a whole batch and the sweep also yields firmware versions.
+
+The result (port, baud rate, IDs, firmware versions) is cached on disk. A warm start
+verifies the cached bus with a single sync read and returns within milliseconds.
+
+    python discovery.py            # discover, print and cache the bus
+"""
+
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict, field
+from typing import Dict, Iterable, List, Optional
+
+import serial
+
+from Driver import STSServoDriver, STSRegisters
+
+DEFAULT_BAUDRATES = (1000000, 500000, 115200)
+ALL_IDS = range(1, 254)
+SWEEP_BATCH = 32
+PROBE_TIMEOUT = 0.02  # Seconds; a reply at 1 Mbps arrives well within 1 ms
+CACHE_PATH = os.path.join(os.path.expanduser("~"), ".easybot", "servo_bus.json")
+CH340_VID = 0x1A86
+
+
+@dataclass
+class BusInfo:
+    port: str
+    baudrate: int
+    servo_ids: List[int]
+    firmware: Dict[int, str] = field(default_factory=dict)
+
+    def open(self, timeout: float = 1) -> STSServoDriver:
+        return STSServoDriver(self.port, self.baudrate, timeout=timeout)
+
+
+def candidate_ports() -> List[str]:
+    """Serial ports that may have servos attached, USB-serial adapters (CH340) first"""
+    try:
+        from serial.tools import list_ports
+        ports = list(list_ports.comports())
+    except ImportError:
+        ports = []
+    if ports:
+        def rank(port):
+            usb = port.vid is not None or "USB" in port.device or "ACM" in port.device
+            return (port.vid != CH340_VID, not usb, port.device)
+        return [port.device for port in sorted(ports, key=rank)]
+    if sys.platform.startswith("win"):
+        return [f"COM{number}" for number in range(1, 10)]
+    import glob
+    return sorted(glob.glob("/dev/ttyUSB*") + glob.glob("/dev/ttyACM*"))
+
+
+def read_firmware(driver: STSServoDriver, servo_ids: Iterable[int]) -> Dict[int, str]:
+    """Firmware versions of the servos that answer, with one sync read"""
+    response = driver.sync_read(servo_ids, STSRegisters.FIRMWARE_MAJOR, 2)
+    return {servo_id: f"{data[0]}.{data[1]}" for servo_id, data in response.items()}
+
+
+def sweep_ids(driver: STSServoDriver, servo_ids: Iterable[int] = ALL_IDS, batch: int = SWEEP_BATCH) -> Dict[int, str]:
+    """Find the servos on a bus with batched sync reads; returns firmware versions by ID"""
+    servo_ids = list(servo_ids)
+    found = {}
+    for start in range(0, len(servo_ids), batch):
+        found.update(read_firmware(driver, servo_ids[start:start + batch]))
+    return found
+
+
+def probe_port(port: str, baudrates: Iterable[int] = DEFAULT_BAUDRATES, servo_ids: Iterable[int] = ALL_IDS,
+               timeout: float = PROBE_TIMEOUT) -> Optional[BusInfo]:
+    """Try each baud rate on a port and return what answers on the first one with servos"""
+    for baudrate in baudrates:
+        try:
+            driver = STSServoDriver(port, baudrate, timeout=timeout)
+        except (serial.SerialException, OSError):
+            return None
+        driver.log_errors = False
+        try:
+            driver.serial.reset_input_buffer()
+            firmware = sweep_ids(driver, servo_ids)
+        except (serial.SerialException, OSError):
+            firmware = {}
+        finally:
+            driver.serial.close()
+        if firmware:
+            return BusInfo(port, baudrate, sorted(firmware), firmware)
+    return None
+
+
+def load_cache(path: str = CACHE_PATH) -> Optional[BusInfo]:
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        data["firmware"] = {int(servo_id): version for servo_id, version in data.get("firmware", {}).items()}
+        return BusInfo(**data)
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def save_cache(info: BusInfo, path: str = CACHE_PATH) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(asdict(info), f, indent=2)
+
+
+def verify(info: BusInfo, timeout: float = PROBE_TIMEOUT) -> bool:
+    """Check with one sync read that every cached servo still answers on the cached port"""
+    try:
+        driver = STSServoDriver(info.port, info.baudrate, timeout=timeout)
+    except (serial.SerialException, OSError):
+        return False
+    driver.log_errors = False
+    try:
+        return set(read_firmware(driver, info.servo_ids)) == set(info.servo_ids)
+    finally:
+        driver.serial.close()
+
+
+def discover_all(ports: List[str] = None, baudrates: Iterable[int] = DEFAULT_BAUDRATES) -> List[BusInfo]:
+    """Every port with servos attached, probed concurrently (one entry per USB adapter)"""
+    ports = candidate_ports() if ports is None else ports
+    if not ports:
+        return []
+    with ThreadPoolExecutor(max_workers=len(ports)) as pool:
+        return [info for info in pool.map(lambda port: probe_port(port, baudrates), ports) if info]
+
+
+def discover(required_ids: Iterable[int] = (), ports: List[str] = None, baudrates: Iterable[int] = DEFAULT_BAUDRATES,
+             use_cache: bool = True, cache_path: str = CACHE_PATH) -> BusInfo:
+    """Find the servo bus, preferring a still-valid cached result
+
+    Raises:
+        RuntimeError: If no port has all of required_ids (or any servo at all)
+    """
+    required = set(required_ids)
+    if use_cache:
+        cached = load_cache(cache_path)
+        if cached and required <= set(cached.servo_ids) and verify(cached):
+            return cached
+
+    ports = candidate_ports() if ports is None else ports
+    if not ports:
+        raise RuntimeError("No serial ports found")
+    results = discover_all(ports, baudrates)
+    matches = [info for info in results if required <= set(info.servo_ids)]
+    if not matches:
+        raise RuntimeError(f"No servo bus found on {', '.join(ports)}")
+    best = max(matches, key=lambda info: len(info.servo_ids))
+    if use_cache:
+        save_cache(best, cache_path)
+    return best
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    info = discover(use_cache="--rescan" not in sys.argv)
+    print(f"{info.port} @ {info.baudrate} baud: servos {info.servo_ids} "
+          f"(firmware {info.firmware}) found in {(time.perf_counter() - start) * 1000:.1f} ms")
@@ -0,0 +1,133 @@
+"""
+Several servo buses (USB adapters) and arms driven from one process.
+
+The half-duplex bus allows one transaction at a time, so a single adapter caps the
+command and feedback rate. Fleet owns one BusWorker thread per bus; group operations are
+split by bus and submitted to all workers at once, so the buses run their transactions in
+parallel and aggregate throughput grows with the number of adapters. Servos are indexed
+by (bus, id) in a dict, since IDs only need to be unique on their own bus:
+
+    fleet = Fleet.discover()                          # one bus per port with servos
+    fleet.set_positions({"left": {1: 1500}, "right": {1: 1500}})
+    left = fleet.robot("left")                        # Robot sharing the bus worker
+
+Works against several simulator.make_arm_bus() buses (SimulatedSerial per bus).
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from Driver import STSServoDriver
+from bus import BusDriver, BusWorker, Priority
+from discovery import DEFAULT_BAUDRATES, discover_all
+from servo import Servo, ServoLimits
+from servos import Servos
+
+DEFAULT_LIMITS = ServoLimits(0, 4095, 2048)
+
+
+class Fleet:
+    def __init__(self, drivers: Dict[str, STSServoDriver], servo_ids: Dict[str, Iterable[int]] = None,
+                 limits: Dict[Tuple[str, int], ServoLimits] = None):
+        """
+        Args:
+            drivers: Driver per bus name; each gets its own BusWorker thread
+            servo_ids: Servo IDs per bus; buses without an entry start empty (see add_servo)
+            limits: Limits per (bus, id); DEFAULT_LIMITS (full range) otherwise
+        """
+        self.buses: Dict[str, BusWorker] = {}
+        self.drivers: Dict[str, BusDriver] = {}
+        self.servos: Dict[str, Servos] = {}
+        self._index: Dict[Tuple[str, int], Servo] = {}
+        self._robots = {}
+        limits = limits or {}
+        for name, driver in drivers.items():
+            self.buses[name] = BusWorker(driver, name=f"servo-bus-{name}")
+            self.drivers[name] = BusDriver(self.buses[name])
+            self.servos[name] = Servos([])
+            for servo_id in (servo_ids or {}).get(name, ()):
+                self.add_servo(name, servo_id, limits.get((name, servo_id), DEFAULT_LIMITS))
+
+    @classmethod
+    def discover(cls, ports: List[str] = None, baudrates: Iterable[int] = DEFAULT_BAUDRATES) -> "Fleet":
+        """One bus per serial port with servos attached, named after the port"""
+        buses = discover_all(ports, baudrates)
+        if not buses:
+            raise RuntimeError("No servo bus found")
+        return cls({info.port: info.open() for info in buses}, {info.port: info.servo_ids for info in buses})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def add_servo(self, bus: str, servo_id: int, limits: ServoLimits = DEFAULT_LIMITS, name: str = None) -> Servo:
+        if (bus, servo_id) in self._index:
+            raise ValueError(f"Servo {servo_id} already exists on bus {bus}")
+        servo = Servo(servo_id, self.drivers[bus], limits, name or f"{bus}:{servo_id}")
+        self.servos[bus].add(servo)
+        self._index[(bus, servo_id)] = servo
+        return servo
+
+    def servo(self, bus: str, servo_id: int) -> Servo:
+        """O(1) lookup of a servo by bus name and ID
+
+        Raises:
+            ValueError: If there is no such servo
+        """
+        try:
+            return self._index[(bus, servo_id)]
+        except KeyError:
+            raise ValueError(f"No servo {servo_id} on bus {bus}") from None
+
+    def robot(self, bus: str, profile: Optional[str] = "default"):
+        """A Robot (SO-ARM100 with IDs 1-6) on one bus, sharing that bus's worker thread
+
+        The Robot keeps its own Servo objects, so its cached targets are separate from self.servos.
+        """
+        if bus not in self._robots:
+            from robot import Robot
+            self._robots[bus] = Robot(self.drivers[bus], profile=profile)
+        return self._robots[bus]
+
+    def _fan_out(self, function_name: str, per_bus: Dict[str, tuple], priority: Priority) -> Dict[str, object]:
+        """Call Servos.<function_name>(*args) for each bus on its own worker, all buses at once"""
+        futures = {bus: self.buses[bus].submit(getattr(self.servos[bus], function_name), *args, priority=priority)
+                   for bus, args in per_bus.items()}
+        return {bus: future.result() for bus, future in futures.items()}
+
+    def set_positions(self, positions: Dict[str, Dict[int, int]]) -> None:
+        """Move servos on several buses (one sync write per bus, sent in parallel)"""
+        self._fan_out("set_positions", {bus: (targets,) for bus, targets in positions.items() if targets},
+                      Priority.MOTION)
+
+    def stage_positions(self, positions: Dict[str, Dict[int, int]]) -> None:
+        """Preload targets on several buses with REG WRITE; they start on trigger()"""
+        self._fan_out("stage_positions", {bus: (targets,) for bus, targets in positions.items() if targets},
+                      Priority.MOTION)
+
+    def trigger(self) -> Dict[str, Dict[int, int]]:
+        """Start the staged moves on every bus; the ACTION broadcasts go out on all buses at once"""
+        return self._fan_out("trigger", {bus: () for bus in self.buses}, Priority.MOTION)
+
+    def refresh(self, max_age: float = None) -> None:
+        """Refresh the cached status of all stale servos, one sync read per bus in parallel"""
+        self._fan_out("refresh", {bus: (None, max_age) for bus in self.buses if len(self.servos[bus])},
+                      Priority.TELEMETRY)
+
+    def read_positions(self, max_age: float = None) -> Dict[str, Dict[int, int]]:
+        """Current positions per bus, refreshing stale servos first"""
+        return self._fan_out("read_positions", {bus: (None, max_age) for bus in self.buses if len(self.servos[bus])},
+                             Priority.TELEMETRY)
+
+    def metrics(self) -> Dict[str, Dict[str, dict]]:
+        """BusMetrics summary per bus"""
+        return {bus: worker.metrics.summary() for bus, worker in self.buses.items()}
+
+    def stop(self) -> None:
+        """Finish queued transactions and stop every bus worker"""
+        for worker in self.buses.values():
+            worker.stop()
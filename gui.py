@@ -1,19 +1,39 @@
 import tkinter as tk
 from robot import Robot, ServoId
+from threading import Thread, Event, Lock
 import time
 
+MAX_LEAD = 150  # Ticks a held button may move a target ahead of the measured position
+
 
 class RobotGUI:
-    def __init__(self):
-        self.robot = Robot()
+    def __init__(self, robot: Robot = None, command_hz: float = 20.0, poll_hz: float = 10.0):
+        """
+        Args:
+            robot: Robot to control; a new Robot() when None
+            command_hz: Maximum rate at which queued button moves are sent to the servos
+            poll_hz: Rate at which the status display is refreshed from the servos
+        """
+        self.robot = robot or Robot()
         self.window = tk.Tk()
         self.window.title("Robot Control")
-        
+        self.command_hz = command_hz
+        self.poll_hz = poll_hz
+
         # For tracking button press state
         self.pressed_button = None
         self.repeat_action = None
         self.is_repeating = False
 
+        # Shared with the I/O thread: the Tk thread only queues offsets and reads the snapshot
+        self._lock = Lock()
+        self._pending = {}    # servo_id -> accumulated offset not yet sent
+        self._snapshot = {}   # servo_id -> (status, target) from the last poll
+        self._snapshot_time = None
+        self._error = None
+        self._stop = Event()
+        self.status_labels = {}
+
         # Create controls for each joint
         self.create_joint_controls("Gripper", ServoId.GRIPPER)
         self.create_joint_controls("Wrist Rotation", ServoId.WRIST_ROTATE)
@@ -25,11 +45,81 @@ class RobotGUI:
         # Create extend controls
         self.create_extend_controls()
 
+        self.info_label = tk.Label(self.window, text="", anchor=tk.W, fg="gray")
+        self.info_label.pack(fill=tk.X, padx=5, pady=5)
+
+        # All serial I/O happens on this thread, so a slow or missing servo never freezes the window
+        self.io_thread = Thread(target=self._io_loop, name="gui-io", daemon=True)
+        self.io_thread.start()
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
         # Start updating status
         self.update_status()
 
+    def queue_offsets(self, offsets):
+        """Add joint offsets to the next command; held-button repeats are coalesced until it is sent"""
+        with self._lock:
+            for servo_id, offset in offsets.items():
+                self._pending[servo_id] = self._pending.get(servo_id, 0) + offset
+
+    def _send_pending(self):
+        """Send the queued offsets, applied to the targets but kept within MAX_LEAD of the measured positions
+
+        Offsets of servos that do not reply are dropped, so they do not pile up and make the
+        servo jump once it answers again.
+        """
+        with self._lock:
+            offsets, self._pending = self._pending, {}
+        if not offsets:
+            return
+        self.robot.servos.refresh(list(offsets), max_age=1.0 / self.command_hz)
+        targets = {}
+        for servo_id, offset in offsets.items():
+            servo = self.robot.servos.get_servo_by_id(servo_id)
+            if servo.status is None:
+                continue
+            measured = servo.status.position
+            base = servo.target_position
+            target = (measured if base is None else base) + offset
+            targets[servo_id] = max(measured - MAX_LEAD, min(target, measured + MAX_LEAD))
+        if targets:
+            self.robot.servos.set_positions(targets)
+
+    def _poll(self):
+        self.robot.servos.refresh(max_age=0)
+        snapshot = {servo.id: (servo.status, servo.target_position) for servo in self.robot.servos}
+        with self._lock:
+            self._snapshot = snapshot
+            self._snapshot_time = time.monotonic()
+
+    def _io_loop(self):
+        command_period = 1.0 / self.command_hz
+        next_poll = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                self._send_pending()
+                if time.perf_counter() >= next_poll:
+                    self._poll()
+                    next_poll = time.perf_counter() + 1.0 / self.poll_hz
+                self._error = None
+            except Exception as e:
+                self._error = str(e)
+            self._stop.wait(command_period)
+
     def update_status(self):
-        self.robot.print_status()
+        with self._lock:
+            snapshot, snapshot_time = self._snapshot, self._snapshot_time
+        for servo_id, label in self.status_labels.items():
+            status, target = snapshot.get(servo_id, (None, None))
+            if status is None:
+                label.config(text="no reply")
+            else:
+                label.config(text=f"pos {status.position:4d}  target {target if target is not None else '-':>4}  "
+                                  f"load {status.load:5d}  {status.temperature:3d}°C")
+        if self._error:
+            self.info_label.config(text=f"Error: {self._error}", fg="red")
+        elif snapshot_time is not None:
+            self.info_label.config(text=f"Status age {(time.monotonic() - snapshot_time) * 1000:.0f} ms", fg="gray")
         self.window.after(100, self.update_status)  # Update every 100ms
 
     def button_held(self):
@@ -60,22 +150,22 @@ class RobotGUI:
         label.pack(side=tk.LEFT)
 
         fine_retract_btn = tk.Button(frame, text="<<", width=2, height=2)
-        fine_retract_btn.bind('<ButtonPress-1>', lambda e: self.on_button_press(fine_retract_btn, lambda: self.robot.extend(10)))
+        fine_retract_btn.bind('<ButtonPress-1>', lambda e: self.on_button_press(fine_retract_btn, lambda: self.queue_offsets(Robot.extend_offsets(10))))
         fine_retract_btn.bind('<ButtonRelease-1>', lambda e: self.on_button_release(fine_retract_btn))
         fine_retract_btn.pack(side=tk.LEFT, padx=2)
 
         retract_btn = tk.Button(frame, text="-", width=5, height=2)
-        retract_btn.bind('<ButtonPress-1>', lambda e: self.on_button_press(retract_btn, lambda: self.robot.extend(50)))
+        retract_btn.bind('<ButtonPress-1>', lambda e: self.on_button_press(retract_btn, lambda: self.queue_offsets(Robot.extend_offsets(50))))
         retract_btn.bind('<ButtonRelease-1>', lambda e: self.on_button_release(retract_btn))
         retract_btn.pack(side=tk.LEFT, padx=2)
 
         extend_btn = tk.Button(frame, text="+", width=5, height=2)
-        extend_btn.bind('<ButtonPress-1>', lambda e: self.on_button_press(extend_btn, lambda: self.robot.extend(-50)))
+        extend_btn.bind('<ButtonPress-1>', lambda e: self.on_button_press(extend_btn, lambda: self.queue_offsets(Robot.extend_offsets(-50))))
         extend_btn.bind('<ButtonRelease-1>', lambda e: self.on_button_release(extend_btn))
         extend_btn.pack(side=tk.LEFT, padx=2)
 
         fine_extend_btn = tk.Button(frame, text=">>", width=2, height=2)
-        fine_extend_btn.bind('<ButtonPress-1>', lambda e: self.on_button_press(fine_extend_btn, lambda: self.robot.extend(-10)))
+        fine_extend_btn.bind('<ButtonPress-1>', lambda e: self.on_button_press(fine_extend_btn, lambda: self.queue_offsets(Robot.extend_offsets(-10))))
         fine_extend_btn.bind('<ButtonRelease-1>', lambda e: self.on_button_release(fine_extend_btn))
         fine_extend_btn.pack(side=tk.LEFT)
 
@@ -87,33 +177,42 @@ class RobotGUI:
         label.pack(side=tk.LEFT)
 
         fine_dec_btn = tk.Button(frame, text="<<", width=2, height=2)
-        fine_dec_btn.bind('<ButtonPress-1>', 
+        fine_dec_btn.bind('<ButtonPress-1>',
             lambda e: self.on_button_press(fine_dec_btn,
-                lambda: self.robot.set_servo_position(servo_id, self.robot.positions[servo_id] - 10)))
+                lambda: self.queue_offsets({servo_id: -10})))
         fine_dec_btn.bind('<ButtonRelease-1>', lambda e: self.on_button_release(fine_dec_btn))
         fine_dec_btn.pack(side=tk.LEFT, padx=2)
 
         dec_btn = tk.Button(frame, text="-", width=5, height=2)
-        dec_btn.bind('<ButtonPress-1>', 
+        dec_btn.bind('<ButtonPress-1>',
             lambda e: self.on_button_press(dec_btn,
-                lambda: self.robot.set_servo_position(servo_id, self.robot.positions[servo_id] - 100)))
+                lambda: self.queue_offsets({servo_id: -100})))
         dec_btn.bind('<ButtonRelease-1>', lambda e: self.on_button_release(dec_btn))
         dec_btn.pack(side=tk.LEFT, padx=2)
 
         inc_btn = tk.Button(frame, text="+", width=5, height=2)
-        inc_btn.bind('<ButtonPress-1>', 
+        inc_btn.bind('<ButtonPress-1>',
             lambda e: self.on_button_press(inc_btn,
-                lambda: self.robot.set_servo_position(servo_id, self.robot.positions[servo_id] + 100)))
+                lambda: self.queue_offsets({servo_id: 100})))
         inc_btn.bind('<ButtonRelease-1>', lambda e: self.on_button_release(inc_btn))
         inc_btn.pack(side=tk.LEFT, padx=2)
 
         fine_inc_btn = tk.Button(frame, text=">>", width=2, height=2)
-        fine_inc_btn.bind('<ButtonPress-1>', 
+        fine_inc_btn.bind('<ButtonPress-1>',
             lambda e: self.on_button_press(fine_inc_btn,
-                lambda: self.robot.set_servo_position(servo_id, self.robot.positions[servo_id] + 10)))
+                lambda: self.queue_offsets({servo_id: 10})))
         fine_inc_btn.bind('<ButtonRelease-1>', lambda e: self.on_button_release(fine_inc_btn))
         fine_inc_btn.pack(side=tk.LEFT)
 
+        status_label = tk.Label(frame, text="", width=44, anchor=tk.W, font=("Courier", 10))
+        status_label.pack(side=tk.LEFT, padx=8)
+        self.status_labels[servo_id] = status_label
+
+    def close(self):
+        self._stop.set()
+        self.io_thread.join(timeout=2.0)
+        self.window.destroy()
+
     def run(self):
         self.window.mainloop()
 
@@ -0,0 +1,210 @@
+"""
+Forward and inverse kinematics for the SO-ARM100, batched with NumPy.
+
+Joint order is (base, shoulder, elbow, wrist bend, wrist rotate). Ticks are converted to
+radians with 4096 ticks/rev around a calibrated zero (2048 after the midpoint calibration
+described in STS-Tips.txt). In the zero pose the arm points straight up; positive pitch
+angles lean the arm forward, positive base yaw turns it counter-clockwise seen from above.
+
+forward() evaluates thousands of configurations per call; inverse() is a batched damped
+least-squares solver (base yaw is solved in closed form) that respects the joint limits.
+With a tool pitch the planar chain is fully determined, so both elbow branches are solved
+in closed form first and the iterative solver only handles what they leave.
+Link lengths are approximate and can be adjusted with ArmGeometry for your build.
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+TICKS_PER_REV = 4096
+RADIANS_PER_TICK = 2 * math.pi / TICKS_PER_REV
+JOINT_COUNT = 5
+
+
+@dataclass
+class ArmGeometry:
+    base_height: float = 0.0985  # Table to shoulder axis, meters
+    upper_arm: float = 0.1160    # Shoulder axis to elbow axis
+    forearm: float = 0.1350      # Elbow axis to wrist axis
+    hand: float = 0.1050         # Wrist axis to gripper tip
+
+
+@dataclass
+class JointCalibration:
+    zero_ticks: int = 2048
+    direction: int = -1  # -1: higher tick values bend the joint upward / rotate the base clockwise
+
+
+class ArmKinematics:
+    def __init__(self, joint_limits: Sequence[Tuple[int, int]], geometry: ArmGeometry = None,
+                 calibration: Sequence[JointCalibration] = None):
+        """
+        Args:
+            joint_limits: (min_ticks, max_ticks) per joint, in joint order
+            geometry: Link lengths
+            calibration: Zero offset and direction per joint, in joint order
+        """
+        self.geometry = geometry or ArmGeometry()
+        calibration = calibration or [JointCalibration() for _ in range(JOINT_COUNT)]
+        self.zero_ticks = np.array([joint.zero_ticks for joint in calibration], dtype=float)
+        self.direction = np.array([joint.direction for joint in calibration], dtype=float)
+        limits = np.array([self.ticks_to_radians(np.array(joint_limits, dtype=float)[:, i]) for i in range(2)])
+        self.lower = limits.min(axis=0)
+        self.upper = limits.max(axis=0)
+        g = self.geometry
+        self.links = np.array([g.upper_arm, g.forearm, g.hand])
+
+    def ticks_to_radians(self, ticks: np.ndarray) -> np.ndarray:
+        return (np.asarray(ticks, dtype=float) - self.zero_ticks) * RADIANS_PER_TICK * self.direction
+
+    def radians_to_ticks(self, angles: np.ndarray) -> np.ndarray:
+        return np.rint(np.asarray(angles, dtype=float) * self.direction / RADIANS_PER_TICK + self.zero_ticks).astype(int)
+
+    def _planar(self, pitch_joints: np.ndarray):
+        """Radial distance, height and tool pitch of the planar chain for (N, 3) pitch joint angles"""
+        absolute = np.cumsum(pitch_joints, axis=-1)  # Angle of each link from vertical
+        r = np.sum(self.links * np.sin(absolute), axis=-1)
+        z = self.geometry.base_height + np.sum(self.links * np.cos(absolute), axis=-1)
+        return r, z, absolute
+
+    def forward(self, angles: np.ndarray):
+        """Gripper tip position (N, 3), pitch from vertical (N,) and roll (N,) for (N, 5) joint angles"""
+        angles = np.atleast_2d(np.asarray(angles, dtype=float))
+        r, z, absolute = self._planar(angles[:, 1:4])
+        yaw = angles[:, 0]
+        xyz = np.stack([r * np.cos(yaw), r * np.sin(yaw), z], axis=-1)
+        return xyz, absolute[:, -1], angles[:, 4]
+
+    def forward_ticks(self, ticks: np.ndarray):
+        """forward() for servo tick values"""
+        return self.forward(self.ticks_to_radians(np.atleast_2d(ticks)))
+
+    def _closed_form_planar(self, target: np.ndarray, q: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Shoulder/elbow/wrist angles (N, 3) reaching (r, z, pitch) exactly, and a (N,) mask of solutions
+
+        Of the two elbow branches the one within the joint limits and closest to q is used;
+        rows without one keep q.
+        """
+        g = self.geometry
+        upper_arm, forearm = self.links[:2]
+        # Wrist axis position, measured from the shoulder axis (x along the vertical, y radial)
+        x = target[:, 1] - g.base_height - g.hand * np.cos(target[:, 2])
+        y = target[:, 0] - g.hand * np.sin(target[:, 2])
+        cos_elbow = (x ** 2 + y ** 2 - upper_arm ** 2 - forearm ** 2) / (2 * upper_arm * forearm)
+        in_reach = np.abs(cos_elbow) <= 1
+        best, solved = q.copy(), np.zeros(len(q), dtype=bool)
+        best_distance = np.full(len(q), np.inf)
+        for sign in (1, -1):
+            elbow = sign * np.arccos(np.clip(cos_elbow, -1, 1))
+            shoulder = np.arctan2(y, x) - np.arctan2(forearm * np.sin(elbow), upper_arm + forearm * np.cos(elbow))
+            wrist = np.angle(np.exp(1j * (target[:, 2] - shoulder - elbow)))  # Wrapped to (-pi, pi]
+            candidate = np.stack([shoulder, elbow, wrist], axis=-1)
+            valid = in_reach & np.all((candidate >= self.lower[1:4]) & (candidate <= self.upper[1:4]), axis=-1)
+            distance = np.sum((candidate - q) ** 2, axis=-1)
+            better = valid & (distance < best_distance)
+            best[better], best_distance[better] = candidate[better], distance[better]
+            solved |= valid
+        return best, solved
+
+    def _solve_planar(self, q: np.ndarray, target: np.ndarray, with_pitch: bool, iterations: int,
+                      tolerance: float, damping: float) -> np.ndarray:
+        """Damped least-squares iterations on the shoulder/elbow/wrist angles towards (r, z[, pitch])
+
+        The pitch residual (radians) is weighted by the hand length, so it is comparable to the
+        position residuals (meters) and does not dominate the steps.
+        """
+        identity = np.eye(target.shape[1]) * damping ** 2
+        weight = np.array([1.0, 1.0] + ([self.geometry.hand] if with_pitch else []))
+        for _ in range(iterations):
+            r, z, absolute = self._planar(q[:, 1:4])
+            current = np.stack([r, z] + ([absolute[:, -1]] if with_pitch else []), axis=-1)
+            error = (target - current) * weight
+            if np.all(np.abs(error) < tolerance):
+                break
+            # Jacobian of (r, z[, pitch]) w.r.t. the three pitch joints: each joint moves all links after it
+            dr = np.cumsum((self.links * np.cos(absolute))[:, ::-1], axis=-1)[:, ::-1]
+            dz = -np.cumsum((self.links * np.sin(absolute))[:, ::-1], axis=-1)[:, ::-1]
+            jacobian = np.stack([dr, dz] + ([np.full_like(dr, self.geometry.hand)] if with_pitch else []), axis=1)
+            jacobian_t = np.swapaxes(jacobian, 1, 2)
+            step = jacobian_t @ np.linalg.solve(jacobian @ jacobian_t + identity, error[:, :, None])
+            q[:, 1:4] = np.clip(q[:, 1:4] + step[:, :, 0], self.lower[1:4], self.upper[1:4])
+        return q
+
+    def _reached(self, q: np.ndarray, target: np.ndarray, with_pitch: bool, tolerance: float) -> np.ndarray:
+        r, z, absolute = self._planar(q[:, 1:4])
+        reached = np.hypot(target[:, 0] - r, target[:, 1] - z) < tolerance
+        if with_pitch:
+            reached &= np.abs(target[:, 2] - absolute[:, -1]) < 10 * tolerance
+        return reached
+
+    def inverse(self, xyz: np.ndarray, pitch: Optional[np.ndarray] = None, roll: Optional[np.ndarray] = None,
+                initial: Optional[np.ndarray] = None, iterations: int = 100, tolerance: float = 1e-3,
+                damping: float = 0.01, restarts: int = 3, seed: int = 0):
+        """Joint angles (N, 5) reaching the targets, and a (N,) mask of targets reached within tolerance
+
+        Args:
+            xyz: Target gripper tip positions (N, 3), meters
+            pitch: Optional tool pitch from vertical in the arm plane (N,), radians, as returned by
+                forward(); left free when None
+            roll: Optional wrist roll (N,); the initial roll is kept when None
+            initial: Starting joint angles (N, 5); the middle of the joint range when None
+            tolerance: Position tolerance in meters
+            restarts: Extra attempts from random starting angles for targets not reached
+        """
+        xyz = np.atleast_2d(np.asarray(xyz, dtype=float))
+        count = len(xyz)
+        q = np.tile((self.lower + self.upper) / 2, (count, 1)) if initial is None \
+            else np.array(np.broadcast_to(initial, (count, JOINT_COUNT)), dtype=float)
+        if roll is not None:
+            q[:, 4] = np.broadcast_to(roll, (count,))
+
+        # Base yaw in closed form: facing the target, or facing away with the arm leaning backwards.
+        # The base range often allows both; the second is tried for targets the first does not reach
+        yaw = np.arctan2(xyz[:, 1], xyz[:, 0])
+        radial = np.hypot(xyz[:, 0], xyz[:, 1])
+        flipped = np.where(yaw > 0, yaw - np.pi, yaw + np.pi)
+        with_pitch = pitch is not None
+        q = np.clip(q, self.lower, self.upper)
+        result = q.copy()
+        reached = np.zeros(count, dtype=bool)
+        attempted = np.zeros(count, dtype=bool)
+        rng = np.random.default_rng(seed)
+        for base, distance in ((yaw, radial), (flipped, -radial)):
+            rows = np.flatnonzero(~reached & (base >= self.lower[0]) & (base <= self.upper[0]))
+            if not len(rows):
+                continue
+            target = [distance[rows], xyz[rows, 2]]
+            if with_pitch:
+                target.append(np.broadcast_to(pitch, (count,))[rows])
+            guess = q[rows].copy()
+            guess[:, 0] = base[rows]
+            guess, solved = self._solve_branch(guess, np.stack(target, axis=-1), with_pitch, iterations, tolerance,
+                                               damping, restarts, rng)
+            # Keep the first branch's best effort for targets no branch reaches
+            update = solved | ~attempted[rows]
+            result[rows[update]] = guess[update]
+            attempted[rows] = True
+            reached[rows[solved]] = True
+        return result, reached
+
+    def _solve_branch(self, q: np.ndarray, target: np.ndarray, with_pitch: bool, iterations: int, tolerance: float,
+                      damping: float, restarts: int, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+        """Solve the planar chain for one base yaw branch; returns the angles and the reached mask"""
+        if with_pitch:
+            q[:, 1:4], _ = self._closed_form_planar(target, q[:, 1:4])
+        q = self._solve_planar(q, target, with_pitch, iterations, tolerance / 10, damping)
+        reached = self._reached(q, target, with_pitch, tolerance)
+        for _ in range(restarts):
+            retry = np.flatnonzero(~reached)
+            if not len(retry):
+                break
+            guess = q[retry].copy()
+            guess[:, 1:4] = rng.uniform(self.lower[1:4], self.upper[1:4], (len(retry), 3))
+            guess = self._solve_planar(guess, target[retry], with_pitch, iterations, tolerance / 10, damping)
+            solved = self._reached(guess, target[retry], with_pitch, tolerance)
+            q[retry[solved]] = guess[solved]
+            reached[retry[solved]] = True
+        return q, reached
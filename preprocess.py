@@ -0,0 +1,159 @@
+"""
+Image preprocessing for vision requests.
+
+FramePreprocessor crops a region of interest (e.g. around the gripper), downscales the
+frame to fit a vision token budget and JPEG-encodes it at a target quality, optionally
+lowering the quality until the payload fits a byte budget. The encoding is cached per
+frame, so several requests about the same frame encode it only once. Every result carries
+the payload size and encode time, making the resolution/latency tradeoff measurable.
+
+Token estimates follow the OpenAI image pricing rules: "low" detail costs 85 tokens at up
+to 512x512; "high" detail is scaled to fit 2048x2048, then to 768 px on the short side,
+and costs 85 + 170 tokens per 512x512 tile.
+"""
+
+import base64
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+TILE = 512
+BASE_TOKENS = 85
+TILE_TOKENS = 170
+
+
+@dataclass
+class PreprocessConfig:
+    roi: Optional[Tuple[float, float, float, float]] = None  # (x, y, width, height) as fractions of the frame
+    detail: str = "high"             # "high" or "low"
+    max_tokens: int = 765            # Vision token budget per image ("high" detail only)
+    jpeg_quality: int = 80
+    max_bytes: Optional[int] = None  # Lower the JPEG quality (down to min_quality) until the image fits
+    min_quality: int = 40
+
+
+@dataclass
+class EncodedFrame:
+    base64: str
+    bytes_sent: int
+    width: int
+    height: int
+    quality: int
+    tokens: int
+    detail: str
+    encode_ms: float
+
+    @property
+    def data_url(self) -> str:
+        return f"data:image/jpeg;base64,{self.base64}"
+
+    def describe(self) -> str:
+        return (f"{self.bytes_sent / 1024:.1f} kB ({self.width}x{self.height}, q{self.quality}, "
+                f"~{self.tokens} tokens) encoded in {self.encode_ms:.1f} ms")
+
+
+def _billed_size(width: int, height: int) -> Tuple[float, float]:
+    """Image size after the API's own "high" detail rescaling"""
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    return width * scale, height * scale
+
+
+def estimate_tokens(width: int, height: int, detail: str = "high") -> int:
+    if detail == "low":
+        return BASE_TOKENS
+    width, height = _billed_size(width, height)
+    return BASE_TOKENS + TILE_TOKENS * math.ceil(width / TILE) * math.ceil(height / TILE)
+
+
+def target_size(width: int, height: int, detail: str = "high", max_tokens: int = 765) -> Tuple[int, int]:
+    """Largest size (never upscaled) that the API will not shrink further and that fits the token budget"""
+    if detail == "low":
+        scale = min(1.0, TILE / max(width, height))
+    else:
+        billed_width, _ = _billed_size(width, height)
+        scale = billed_width / width
+        low, high = 0.0, scale
+        max_tokens = max(max_tokens, BASE_TOKENS + TILE_TOKENS)  # A single tile is the minimum
+        if estimate_tokens(width * scale, height * scale) > max_tokens:
+            for _ in range(20):  # Binary search on the scale
+                middle = (low + high) / 2
+                if BASE_TOKENS + TILE_TOKENS * math.ceil(width * middle / TILE) * math.ceil(height * middle / TILE) <= max_tokens:
+                    low = middle
+                else:
+                    high = middle
+            scale = max(low, 1.0 / max(width, height))
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+class FramePreprocessor:
+    def __init__(self, config: PreprocessConfig = None, cache_size: int = 8):
+        self.config = config or PreprocessConfig()
+        self.history = deque(maxlen=500)  # Recent EncodedFrame results, for payload statistics
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def frame_key(frame: np.ndarray):
+        """Cheap content key: camera ring buffers reuse arrays, so id() alone is not enough"""
+        return frame.shape, hash(frame[::8, ::8].tobytes())
+
+    def crop(self, frame: np.ndarray) -> np.ndarray:
+        if self.config.roi is None:
+            return frame
+        height, width = frame.shape[:2]
+        x, y, w, h = self.config.roi
+        left, top = int(x * width), int(y * height)
+        return frame[top:top + max(1, int(h * height)), left:left + max(1, int(w * width))]
+
+    def _encode(self, image: np.ndarray) -> Tuple[np.ndarray, int]:
+        quality = self.config.jpeg_quality
+        while True:
+            ok, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            if not ok:
+                raise RuntimeError("JPEG encoding failed")
+            if self.config.max_bytes is None or len(buffer) <= self.config.max_bytes or quality <= self.config.min_quality:
+                return buffer, quality
+            quality = max(self.config.min_quality, quality - 10)
+
+    def process(self, frame: np.ndarray, key=None) -> EncodedFrame:
+        """Crop, downscale and JPEG/base64-encode a frame (cached by key, or by frame content)"""
+        key = (self.frame_key(frame) if key is None else key, self.config.roi, self.config.detail,
+               self.config.max_tokens, self.config.jpeg_quality, self.config.max_bytes)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+        start = time.perf_counter()
+        image = self.crop(frame)
+        height, width = image.shape[:2]
+        new_width, new_height = target_size(width, height, self.config.detail, self.config.max_tokens)
+        if (new_width, new_height) != (width, height):
+            image = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_AREA)
+        buffer, quality = self._encode(image)
+        encoded = EncodedFrame(
+            base64=base64.b64encode(buffer).decode('utf-8'),
+            bytes_sent=len(buffer),
+            width=new_width,
+            height=new_height,
+            quality=quality,
+            tokens=estimate_tokens(new_width, new_height, self.config.detail),
+            detail=self.config.detail,
+            encode_ms=(time.perf_counter() - start) * 1000,
+        )
+        with self._lock:
+            self.history.append(encoded)
+            self._cache[key] = encoded
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return encoded
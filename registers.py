@@ -0,0 +1,271 @@
+"""
+Mirrored configuration registers with dirty tracking.
+
+RegisterMap keeps a copy of the EEPROM (0x00-0x27) and RAM (0x28-0x37) register regions of
+every servo. Each region is loaded on first use with one SYNC READ for all servos, so
+reading PID gains, limits or the operation mode afterwards costs no bus traffic. Changes
+are only recorded; flush() sends the changed bytes as contiguous blocks, one SYNC WRITE
+for all servos that changed the same block and a plain WRITE otherwise. Writes of
+unchanged values are skipped, which also saves EEPROM wear, and EEPROM writes are wrapped
+in the WRITE_LOCK unlock/lock sequence:
+
+    registers = RegisterMap(robot.driver, [servo.id for servo in robot.servos])
+    for servo_id in (4, 5):
+        registers.set_pid(servo_id, p=24, d=40)
+    registers.flush()        # one sync write of 0x15-0x16 for both servos, inside WRITE_LOCK
+
+The mirror assumes this map is the only writer of configuration registers; call
+invalidate() after writing them some other way. Motion registers (torque switch, target
+position, speed, ...) change behind the mirror's back all the time, so writes to them are
+never skipped.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from Driver import STSMode, STSRegisters
+
+EEPROM = (STSRegisters.FIRMWARE_MAJOR, STSRegisters.TORQUE_SWITCH)   # [start, end)
+RAM = (STSRegisters.TORQUE_SWITCH, STSRegisters.CURRENT_POSITION)
+REGIONS = {"eeprom": EEPROM, "ram": RAM}
+MIRROR_SIZE = RAM[1]
+
+WORD_REGISTERS = {
+    STSRegisters.MINIMUM_ANGLE, STSRegisters.MAXIMUM_ANGLE, STSRegisters.MAXIMUM_TORQUE,
+    STSRegisters.MINIMUM_STARTUP_FORCE, STSRegisters.CURRENT_PROTECTION_TH, STSRegisters.POSITION_CORRECTION,
+    STSRegisters.TARGET_POSITION, STSRegisters.RUNNING_TIME, STSRegisters.RUNNING_SPEED, STSRegisters.TORQUE_LIMIT,
+}
+READ_ONLY = {STSRegisters.FIRMWARE_MAJOR, STSRegisters.FIRMWARE_MINOR, STSRegisters.SERVO_MAJOR,
+             STSRegisters.SERVO_MINOR}
+VOLATILE = {STSRegisters.TORQUE_SWITCH, STSRegisters.TARGET_ACCELERATION, STSRegisters.TARGET_POSITION,
+            STSRegisters.RUNNING_TIME, STSRegisters.RUNNING_SPEED}
+
+
+def register_width(register: int) -> int:
+    return 2 if register in WORD_REGISTERS else 1
+
+
+def region_of(register: int) -> str:
+    for name, (start, end) in REGIONS.items():
+        if start <= register < end:
+            return name
+    raise ValueError(f"Register 0x{register:02X} is not a mirrored configuration register")
+
+
+class RegisterFile:
+    """Mirror of one servo's configuration registers plus its pending changes"""
+
+    def __init__(self, servo_id: int):
+        self.servo_id = servo_id
+        self.values = bytearray(MIRROR_SIZE)     # Last values known to be on the servo
+        self.pending = bytearray(MIRROR_SIZE)    # values with the unflushed changes applied
+        self.loaded = set()                      # Names of the regions read from the servo
+        self.dirty = set()                       # Addresses of changed bytes
+
+    def load(self, region: str, data: bytes) -> None:
+        start, end = REGIONS[region]
+        self.values[start:end] = data
+        for address in range(start, end):
+            if address not in self.dirty:
+                self.pending[address] = data[address - start]
+        self.loaded.add(region)
+
+    def get(self, register: int) -> int:
+        return int.from_bytes(self.pending[register:register + register_width(register)], "little")
+
+    def set(self, register: int, value: int) -> bool:
+        """Record a new value; returns False when it equals the known value (nothing to write)"""
+        width = register_width(register)
+        data = int(value).to_bytes(width, "little")
+        addresses = range(register, register + width)
+        self.pending[register:register + width] = data
+        if register not in VOLATILE and self.values[register:register + width] == data:
+            self.dirty.difference_update(addresses)
+            return False
+        self.dirty.update(addresses)
+        return True
+
+    def dirty_blocks(self) -> List[Tuple[int, bytes]]:
+        """Changed bytes as (start, data) runs of contiguous addresses, never spanning two regions"""
+        blocks = []
+        for address in sorted(self.dirty):
+            if blocks and blocks[-1][0] + len(blocks[-1][1]) == address and address != RAM[0]:
+                blocks[-1][1].append(self.pending[address])
+            else:
+                blocks.append((address, bytearray([self.pending[address]])))
+        return [(start, bytes(data)) for start, data in blocks]
+
+    def commit(self, start: int, data: bytes) -> None:
+        self.values[start:start + len(data)] = data
+        self.dirty.difference_update(range(start, start + len(data)))
+
+
+class RegisterMap:
+    def __init__(self, driver, servo_ids: Iterable[int]):
+        """
+        Args:
+            driver: STSServoDriver or BusDriver used for all reads and writes
+            servo_ids: Servos whose registers are mirrored
+        """
+        self.driver = driver
+        self.files: Dict[int, RegisterFile] = {servo_id: RegisterFile(servo_id) for servo_id in servo_ids}
+        self.packets = 0       # Packets sent by flush(), including WRITE_LOCK
+        self.bytes_written = 0
+        self.skipped = 0       # set() calls that matched the known value
+
+    def _file(self, servo_id: int) -> RegisterFile:
+        try:
+            return self.files[servo_id]
+        except KeyError:
+            raise ValueError(f"Servo {servo_id} is not in the register map") from None
+
+    def load(self, servo_ids: Iterable[int] = None, regions: Iterable[str] = REGIONS) -> None:
+        """Read whole regions with one sync read per region for all given servos
+
+        Raises:
+            RuntimeError: If a servo does not reply
+        """
+        servo_ids = list(self.files) if servo_ids is None else list(servo_ids)
+        missing = set()
+        for region in regions:
+            start, end = REGIONS[region]
+            blocks = self.driver.sync_read(servo_ids, start, end - start)
+            for servo_id in servo_ids:
+                data = blocks.get(servo_id)
+                if data is not None and len(data) == end - start:
+                    self._file(servo_id).load(region, data)
+                else:
+                    missing.add(servo_id)
+        if missing:
+            raise RuntimeError(f"No register reply from servos {sorted(missing)}")
+
+    def invalidate(self, servo_id: int = None) -> None:
+        """Forget the mirrored values (of one servo, or all); pending changes are dropped too"""
+        for servo_id in self.files if servo_id is None else [servo_id]:
+            self.files[servo_id] = RegisterFile(servo_id)
+
+    def _ensure_loaded(self, servo_id: int, register: int) -> RegisterFile:
+        registers = self._file(servo_id)
+        region = region_of(register)
+        if region not in registers.loaded:
+            # Load every servo that lacks the region, so the next lookups are free as well
+            try:
+                self.load([file.servo_id for file in self.files.values() if region not in file.loaded], [region])
+            except RuntimeError:
+                # Other servos that did not reply are retried on their own next use
+                if region not in registers.loaded:
+                    raise
+        return registers
+
+    def get(self, servo_id: int, register: int) -> int:
+        """Value of a register, including unflushed changes (reads the region once if needed)"""
+        return self._ensure_loaded(servo_id, register).get(register)
+
+    def set(self, servo_id: int, register: int, value: int) -> bool:
+        """Record a register change for the next flush(); returns False if it is redundant"""
+        if register in READ_ONLY or register == STSRegisters.WRITE_LOCK:
+            raise ValueError(f"Register 0x{register:02X} cannot be set through the register map")
+        changed = self._ensure_loaded(servo_id, register).set(register, value)
+        self.skipped += not changed
+        return changed
+
+    @property
+    def dirty(self) -> Dict[int, List[Tuple[int, bytes]]]:
+        """Pending blocks per servo"""
+        return {servo_id: registers.dirty_blocks() for servo_id, registers in self.files.items() if registers.dirty}
+
+    def _write(self, blocks: Dict[Tuple[int, int], Dict[int, bytes]]) -> List[int]:
+        """Send (start, length) -> {servo: data}; returns the servos that did not acknowledge"""
+        failed = []
+        for (start, length), data in blocks.items():
+            if len(data) > 1:
+                self.driver.sync_write(start, data)
+            else:
+                (servo_id, values), = data.items()
+                if not self.driver.write_register(servo_id, start, values):
+                    failed.append(servo_id)
+                    continue
+            self.packets += 1
+            self.bytes_written += length * len(data)
+            for servo_id, values in data.items():
+                self.files[servo_id].commit(start, values)
+        return failed
+
+    def _lock(self, servo_ids: List[int], locked: bool) -> List[int]:
+        """Set WRITE_LOCK; returns the servos not confirmed to have unlocked (nothing is checked when locking)"""
+        value = bytes([1 if locked else 0])
+        if len(servo_ids) == 1:
+            self.packets += 1
+            return [] if self.driver.write_register(servo_ids[0], STSRegisters.WRITE_LOCK, value) or locked \
+                else servo_ids
+        self.driver.sync_write(STSRegisters.WRITE_LOCK, {servo_id: value for servo_id in servo_ids})
+        self.packets += 1
+        if locked:
+            return []
+        # Sync writes are not acknowledged: read the lock back before writing EEPROM
+        confirmed = self.driver.sync_read(servo_ids, STSRegisters.WRITE_LOCK, 1)
+        self.packets += 1
+        return [servo_id for servo_id in servo_ids if confirmed.get(servo_id) != value]
+
+    def flush(self) -> int:
+        """Send all pending changes; returns the number of packets sent
+
+        EEPROM changes of a servo whose unlock is not confirmed are not sent.
+
+        Raises:
+            RuntimeError: If a servo did not acknowledge its write or unlock (its changes stay pending)
+        """
+        packets = self.packets
+        blocks = {"eeprom": {}, "ram": {}}
+        for servo_id, dirty in self.dirty.items():
+            for start, data in dirty:
+                blocks[region_of(start)].setdefault((start, len(data)), {})[servo_id] = data
+        failed = self._write(blocks["ram"])
+        if blocks["eeprom"]:
+            servo_ids = sorted({servo_id for data in blocks["eeprom"].values() for servo_id in data})
+            still_locked = self._lock(servo_ids, False)
+            try:
+                failed += still_locked
+                eeprom = {block: {servo_id: values for servo_id, values in data.items() if servo_id not in still_locked}
+                          for block, data in blocks["eeprom"].items()}
+                failed += self._write({block: data for block, data in eeprom.items() if data})
+            finally:
+                self._lock(servo_ids, True)
+        if failed:
+            raise RuntimeError(f"No write reply from servos {sorted(set(failed))}")
+        return self.packets - packets
+
+    # Helpers for the common configuration registers; changes are sent on flush()
+
+    def pid(self, servo_id: int) -> Tuple[int, int, int]:
+        """Position loop (P, D, I) gains"""
+        return (self.get(servo_id, STSRegisters.POS_PROPORTIONAL_GAIN),
+                self.get(servo_id, STSRegisters.POS_DERIVATIVE_GAIN),
+                self.get(servo_id, STSRegisters.POS_INTEGRAL_GAIN))
+
+    def set_pid(self, servo_id: int, p: int = None, d: int = None, i: int = None) -> None:
+        """Set position loop gains (EEPROM); gains left as None are kept"""
+        for register, value in ((STSRegisters.POS_PROPORTIONAL_GAIN, p), (STSRegisters.POS_DERIVATIVE_GAIN, d),
+                                (STSRegisters.POS_INTEGRAL_GAIN, i)):
+            if value is not None:
+                self.set(servo_id, register, value)
+
+    def set_angle_limits(self, servo_id: int, minimum: int, maximum: int) -> None:
+        """Hardware angle limits in ticks (EEPROM)"""
+        self.set(servo_id, STSRegisters.MINIMUM_ANGLE, minimum)
+        self.set(servo_id, STSRegisters.MAXIMUM_ANGLE, maximum)
+
+    def set_max_torque(self, servo_id: int, torque: int) -> None:
+        """Power-on torque limit in 0.1 % (EEPROM)"""
+        self.set(servo_id, STSRegisters.MAXIMUM_TORQUE, torque)
+
+    def set_torque_limit(self, servo_id: int, torque: int) -> None:
+        """Current torque limit in 0.1 % (RAM, reset to MAXIMUM_TORQUE on power-up)"""
+        self.set(servo_id, STSRegisters.TORQUE_LIMIT, torque)
+
+    def mode(self, servo_id: int) -> Optional[STSMode]:
+        value = self.get(servo_id, STSRegisters.OPERATION_MODE)
+        return STSMode(value) if value in STSMode._value2member_map_ else None
+
+    def set_mode(self, servo_id: int, mode: STSMode) -> None:
+        """Operation mode: position, velocity (wheel) or step (EEPROM)"""
+        self.set(servo_id, STSRegisters.OPERATION_MODE, int(mode))
@@ -0,0 +1,123 @@
+"""
+Frame-similarity cache for model responses.
+
+When the arm did not move, the next iteration sends the model a nearly identical image and
+the same prompt. ResponseCache keys responses on (prompt, context) and a perceptual frame
+signature (a 64-bit difference hash plus a 16x16 grayscale thumbnail). A lookup hits when
+an entry younger than the TTL has a signature within the similarity thresholds, so the
+previous response is reused and the call is skipped. The context lets the caller add
+state the image may not show, e.g. the commanded servo positions.
+
+    cache = ResponseCache(ttl=30)
+    response = cache.get(prompt, frame, context)
+    if response is None:
+        response = call_model(...)
+        cache.put(prompt, frame, response, context, tokens=usage.total_tokens, seconds=latency)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Hashable, Optional, Tuple
+
+import cv2
+import numpy as np
+
+THUMBNAIL_SIZE = 16
+
+
+def frame_signature(frame: np.ndarray) -> Tuple[int, np.ndarray]:
+    """Difference hash (64 bits) and a small grayscale thumbnail of a BGR or grayscale frame"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    dhash = int.from_bytes(np.packbits(bits).tobytes(), "big")
+    thumbnail = cv2.resize(gray, (THUMBNAIL_SIZE, THUMBNAIL_SIZE), interpolation=cv2.INTER_AREA).astype(np.int16)
+    return dhash, thumbnail
+
+
+@dataclass
+class CacheEntry:
+    dhash: int
+    thumbnail: np.ndarray
+    response: Any
+    created: float
+    tokens: int = 0      # Tokens the original call cost
+    seconds: float = 0.0  # Latency of the original call
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    expired: int = 0
+    avoided_tokens: int = 0
+    avoided_seconds: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 32, ttl: float = 30.0, max_hamming: int = 4, max_mean_diff: float = 4.0,
+                 clock=time.monotonic):
+        """
+        Args:
+            max_entries: LRU bound on cached responses
+            ttl: Seconds a response stays reusable
+            max_hamming: Maximum differing difference-hash bits for frames to count as the same scene
+            max_mean_diff: Maximum mean absolute thumbnail difference (0-255 gray levels)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_hamming = max_hamming
+        self.max_mean_diff = max_mean_diff
+        self.stats = CacheStats()
+        self._clock = clock
+        self._entries = OrderedDict()  # (prompt, context, dhash) -> CacheEntry
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _similar(self, entry: CacheEntry, dhash: int, thumbnail: np.ndarray) -> bool:
+        if bin(entry.dhash ^ dhash).count("1") > self.max_hamming:
+            return False
+        return float(np.mean(np.abs(entry.thumbnail - thumbnail))) <= self.max_mean_diff
+
+    def get(self, prompt: str, frame: np.ndarray, context: Hashable = None, signature=None) -> Optional[Any]:
+        """Cached response for a similar frame with the same prompt and context, or None"""
+        dhash, thumbnail = signature or frame_signature(frame)
+        now = self._clock()
+        with self._lock:
+            for key in list(self._entries):
+                entry = self._entries[key]
+                if now - entry.created > self.ttl:
+                    del self._entries[key]
+                    self.stats.expired += 1
+                    continue
+                if key[:2] == (prompt, context) and self._similar(entry, dhash, thumbnail):
+                    self._entries.move_to_end(key)
+                    self.stats.hits += 1
+                    self.stats.avoided_tokens += entry.tokens
+                    self.stats.avoided_seconds += entry.seconds
+                    return entry.response
+            self.stats.misses += 1
+        return None
+
+    def put(self, prompt: str, frame: np.ndarray, response: Any, context: Hashable = None, tokens: int = 0,
+            seconds: float = 0.0, signature=None) -> None:
+        dhash, thumbnail = signature or frame_signature(frame)
+        key = (prompt, context, dhash)
+        with self._lock:
+            self._entries[key] = CacheEntry(dhash, thumbnail, response, self._clock(), tokens, seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
@@ -1,9 +1,16 @@
 import time
 from Driver import STSServoDriver
-import serial
+from bus import BusWorker, BusDriver
+from discovery import discover
 from enum import IntEnum
 from servo import Servo, ServoLimits
 from servos import Servos
+from trajectory import TrajectoryExecutor
+from kinematics import ArmKinematics
+from registers import RegisterMap
+from calibration import CalibrationProfile, calibrate, load_profile, profile_path, save_profile
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
 
 class ServoId(IntEnum):
     GRIPPER = 1
@@ -14,7 +21,10 @@ class ServoId(IntEnum):
     BASE = 6          # Base rotation
 
 class Robot:
-    # Robot-specific servo configuration
+    # Kinematic chain order used by ArmKinematics
+    ARM_JOINTS = (ServoId.BASE, ServoId.SHOULDER, ServoId.ELBOW, ServoId.WRIST_BEND, ServoId.WRIST_ROTATE)
+
+    # Robot-specific servo configuration, used until a calibration profile exists (see calibrate())
     SERVO_LIMITS = {
         ServoId.GRIPPER: ServoLimits(1400, 2000, 2000),  # Default to open
         ServoId.WRIST_ROTATE: ServoLimits(1500, 4000, 1500),
@@ -24,42 +34,80 @@ class Robot:
         ServoId.BASE: ServoLimits(600, 3300, 1950)
     }
 
-    def __init__(self):
-        self.driver = None
-        for port in range(1, 10):
+    def __init__(self, driver: STSServoDriver = None, profile: str = "default"):
+        """
+        Args:
+            driver: Driver (or BusDriver of an existing bus worker) to use; the servo bus is discovered when None
+            profile: Name of the calibration profile (~/.easybot/profiles/<name>.json) with this
+                robot's joint limits; SERVO_LIMITS are used when it does not exist, None skips loading
+        """
+        self.profile_path = profile_path(profile) if profile else None
+        self.servo_limits = dict(self.SERVO_LIMITS)
+        loaded = load_profile(self.profile_path) if self.profile_path else None
+        if loaded is not None:
+            self.servo_limits.update(loaded.limits)
+        if driver is None:
+            # Probes all serial ports in parallel; warm starts reuse the cached port/baud rate
             try:
-                self.driver = STSServoDriver(f"COM{port}")
-                break
-            except serial.SerialException:
-                continue
-        if not self.driver:
-            raise Exception("No working COM port found")
+                self.bus_info = discover(required_ids=[ServoId.GRIPPER])
+            except RuntimeError as e:
+                raise Exception(f"No working servo port found: {e}")
+            driver = self.bus_info.open()
+
+        # All bus traffic (GUI, deformable loop, agent) goes through one prioritized I/O thread,
+        # shared with other users of the bus when an existing BusDriver is passed in (see fleet.py)
+        self.bus = driver.bus if isinstance(driver, BusDriver) else BusWorker(driver)
+        self.driver = BusDriver(self.bus)
         
         if not self.driver.ping(ServoId.GRIPPER):
             raise Exception("Gripper servo not responding")
             
         # Initialize servos with their limits and store them as instance variables
-        self.gripper = Servo(ServoId.GRIPPER, self.driver, self.SERVO_LIMITS[ServoId.GRIPPER], "Gripper")
-        self.wrist_rotate = Servo(ServoId.WRIST_ROTATE, self.driver, self.SERVO_LIMITS[ServoId.WRIST_ROTATE], "Wrist Rotation")
-        self.wrist_bend = Servo(ServoId.WRIST_BEND, self.driver, self.SERVO_LIMITS[ServoId.WRIST_BEND], "Wrist Bend")
-        self.elbow = Servo(ServoId.ELBOW, self.driver, self.SERVO_LIMITS[ServoId.ELBOW], "Elbow")
-        self.shoulder = Servo(ServoId.SHOULDER, self.driver, self.SERVO_LIMITS[ServoId.SHOULDER], "Shoulder")
-        self.base = Servo(ServoId.BASE, self.driver, self.SERVO_LIMITS[ServoId.BASE], "Base")
+        self.gripper = Servo(ServoId.GRIPPER, self.driver, self.servo_limits[ServoId.GRIPPER], "Gripper")
+        self.wrist_rotate = Servo(ServoId.WRIST_ROTATE, self.driver, self.servo_limits[ServoId.WRIST_ROTATE], "Wrist Rotation")
+        self.wrist_bend = Servo(ServoId.WRIST_BEND, self.driver, self.servo_limits[ServoId.WRIST_BEND], "Wrist Bend")
+        self.elbow = Servo(ServoId.ELBOW, self.driver, self.servo_limits[ServoId.ELBOW], "Elbow")
+        self.shoulder = Servo(ServoId.SHOULDER, self.driver, self.servo_limits[ServoId.SHOULDER], "Shoulder")
+        self.base = Servo(ServoId.BASE, self.driver, self.servo_limits[ServoId.BASE], "Base")
         
         # Keep servos collection for group operations
         self.servos = Servos([
             self.gripper, self.wrist_rotate, self.wrist_bend,
             self.elbow, self.shoulder, self.base
         ])
+        self.trajectory = TrajectoryExecutor(self)
+        # Configuration registers (PID, limits, torque limit, mode), read on first use
+        self.registers = RegisterMap(self.driver, [servo.id for servo in self.servos])
+        self._update_kinematics()
         self.reset_all_servos()
 
+    def _update_kinematics(self):
+        self.kinematics = ArmKinematics([(self.servo_limits[joint].min_pos, self.servo_limits[joint].max_pos)
+                                         for joint in self.ARM_JOINTS])
+
+    def calibrate(self, servo_ids: List[int] = None, save: bool = True) -> CalibrationProfile:
+        """Sweep the joints to find their end stops, apply the new limits and store them in the profile"""
+        profile = calibrate(self, servo_ids)
+        self.servo_limits.update(profile.limits)
+        self._update_kinematics()
+        if save and self.profile_path:
+            existing = load_profile(self.profile_path)
+            if existing is not None:
+                # Keep joints that were not recalibrated this time
+                existing.limits.update(profile.limits)
+                existing.stops.update(profile.stops)
+                profile.limits, profile.stops = existing.limits, existing.stops
+            save_profile(profile, self.profile_path)
+            print(f"Calibration saved to {self.profile_path}")
+        return profile
+
     def grab(self):
         """Close the gripper"""
-        self.gripper.set_position(1400)
+        self.gripper.set_position(self.gripper.limits.min_pos)
 
     def release(self):
         """Open the gripper"""
-        self.gripper.set_position(2000)
+        self.gripper.set_position(self.gripper.limits.max_pos)
 
     def rotate_wrist_to(self, position: int):
         """Rotate the wrist"""
@@ -69,11 +117,82 @@ class Robot:
         """Rotate the elbow"""
         self.elbow.set_position(position)
 
-    def extend(self, ticks: int):
-        """Coordinated movement to extend/retract the arm"""
-        self.shoulder.move_relative(int(-ticks * 0.5))
-        self.elbow.move_relative(ticks)
-        self.wrist_bend.move_relative(int(-ticks * 0.5))
+    @staticmethod
+    def extend_offsets(ticks: int) -> Dict[int, int]:
+        """Joint offsets that extend (negative ticks) or retract (positive ticks) the arm"""
+        return {
+            ServoId.SHOULDER: int(-ticks * 0.5),
+            ServoId.ELBOW: ticks,
+            ServoId.WRIST_BEND: int(-ticks * 0.5),
+        }
+
+    def extend(self, ticks: int, duration: float = None, staged: bool = False):
+        """Coordinated movement to extend/retract the arm
+
+        With a duration, the joints follow a synchronised minimum-jerk trajectory instead of a single jump.
+        With staged, the move is only preloaded (relative to the pending targets, so it can be queued
+        while the arm is still moving) and starts on the next trigger().
+        """
+        offsets = self.extend_offsets(ticks)
+        if staged:
+            self.servos.stage_relative(offsets)
+            return
+        if duration is None:
+            self.servos.move_relative(offsets)
+            return
+        current = self._read_joints(list(offsets), max_age=0)
+        self.move_joints({servo_id: current[servo_id] + offset for servo_id, offset in offsets.items()}, duration)
+
+    def _read_joints(self, servo_ids: List[int], max_age: float = None) -> Dict[int, int]:
+        """Current positions of the given joints; raises RuntimeError if any of them did not reply"""
+        current = self.servos.read_positions(servo_ids, max_age)
+        missing = set(servo_ids) - set(current)
+        if missing:
+            raise RuntimeError(f"No position reply from servos {sorted(missing)}")
+        return current
+
+    def move_joints(self, targets: Dict[int, int], duration: float, profile: str = "minimum_jerk"):
+        """Move several joints to targets along a time-parameterized trajectory (blocks for duration)"""
+        self.trajectory.execute([targets], [duration], profile)
+
+    def stage_joints(self, targets: Dict[int, int]):
+        """Preload joint targets on the servos; they all start together on trigger()"""
+        self.servos.stage_positions(targets)
+
+    def trigger(self) -> Dict[int, int]:
+        """Start every staged move with one broadcast ACTION"""
+        return self.servos.trigger()
+
+    def move_to_pose(self, xyz: Sequence[float], orientation: Tuple[float, float] = None, duration: float = None):
+        """Move the gripper tip to a Cartesian position (meters, base frame)
+
+        Args:
+            xyz: Target position of the gripper tip
+            orientation: Optional (pitch, roll) in radians; pitch is measured from vertical
+            duration: Follow a smooth trajectory of this length instead of jumping to the target
+
+        Raises:
+            ValueError: If the pose cannot be reached within the joint limits
+            RuntimeError: If a joint does not reply
+        """
+        current = self._read_joints(list(self.ARM_JOINTS), max_age=0)
+        initial = self.kinematics.ticks_to_radians([current[joint] for joint in self.ARM_JOINTS])
+        pitch, roll = orientation if orientation is not None else (None, None)
+        angles, reached = self.kinematics.inverse(np.asarray(xyz)[None, :], pitch=pitch, roll=roll, initial=initial)
+        if not reached[0]:
+            raise ValueError(f"Pose {tuple(xyz)} is out of reach")
+        targets = dict(zip(self.ARM_JOINTS, self.kinematics.radians_to_ticks(angles[0]).tolist()))
+        if duration is None:
+            self.servos.set_positions(targets)
+        else:
+            self.move_joints(targets, duration)
+
+    @property
+    def pose(self):
+        """Current gripper tip position (x, y, z) in meters and (pitch, roll) in radians"""
+        current = self._read_joints(list(self.ARM_JOINTS))
+        xyz, pitch, roll = self.kinematics.forward_ticks([current[joint] for joint in self.ARM_JOINTS])
+        return tuple(xyz[0]), (float(pitch[0]), float(roll[0]))
 
     def set_servo_position(self, servo_id: ServoId, position: int):
         """Set position of a specific servo"""
@@ -1,6 +1,7 @@
 from dataclasses import dataclass
-from Driver import STSServoDriver
+from Driver import STSServoDriver, ServoStatus
 from enum import IntEnum
+from typing import Optional
 
 @dataclass
 class ServoLimits:
@@ -9,25 +10,66 @@ class ServoLimits:
     default_pos: int
 
 class Servo:
-    def __init__(self, servo_id: int, driver: STSServoDriver, limits: ServoLimits, name: str = None):
+    def __init__(self, servo_id: int, driver: STSServoDriver, limits: ServoLimits, name: str = None,
+                 max_age: float = 0.05):
         self.id = servo_id
         self.driver = driver
         self.limits = limits
         self.name = name if name is not None else f"Servo {servo_id}"
+        self.max_age = max_age  # How old (in seconds) the cached status may be before it is re-read
+        self.status: Optional[ServoStatus] = None
+        self.missed_replies = 0  # Refreshes the servo did not answer
+        self._target_position: Optional[int] = None
+        self.target_revision = 0  # Counts recorded targets, so a staged move can tell it was overridden
+
+    def is_stale(self, max_age: float = None) -> bool:
+        """Check if the cached status is missing or older than max_age"""
+        max_age = self.max_age if max_age is None else max_age
+        return self.status is None or self.status.age > max_age
+
+    def update_status(self, status: Optional[ServoStatus]) -> None:
+        """Store a status snapshot read by a group refresh (None: no reply, the old snapshot is dropped)"""
+        if status is None:
+            self.missed_replies += 1
+        self.status = status
+
+    def refresh(self) -> Optional[ServoStatus]:
+        """Re-read the whole feedback block (0x38-0x46) with one block read"""
+        self.update_status(self.driver.read_status(self.id))
+        return self.status
+
+    def snapshot(self, max_age: float = None) -> Optional[ServoStatus]:
+        """Get the cached status, refreshing it first if it is stale"""
+        if self.is_stale(max_age):
+            self.refresh()
+        return self.status
 
     @property
     def current_position(self) -> int:
-        return self.driver.get_current_position(self.id)
+        status = self.snapshot()
+        return status.position if status else None
 
     @property
     def target_position(self) -> int:
         """Get the target position the servo is moving to"""
-        return self.driver.get_target_position(self.id)
+        if self._target_position is None:
+            self._target_position = self.driver.get_target_position(self.id)
+        return self._target_position
+
+    def clamp(self, position: int) -> int:
+        """Clamp a position to the servo limits"""
+        return max(self.limits.min_pos, min(position, self.limits.max_pos))
+
+    def record_target(self, position: int) -> None:
+        """Remember a target that was written to the servo (e.g. by a group sync write)"""
+        self._target_position = position
+        self.target_revision += 1
 
     def set_position(self, position: int) -> None:
         """Set servo position while respecting limits"""
-        clamped_position = max(self.limits.min_pos, min(position, self.limits.max_pos))
-        self.driver.set_target_position(self.id, clamped_position)
+        position = self.clamp(position)
+        self.driver.set_target_position(self.id, position)
+        self.record_target(position)
 
     def move_relative(self, offset: int) -> None:
         """Move servo relative to current position"""
@@ -54,4 +96,5 @@ class Servo:
     @property
     def current_torque(self) -> int:
         """Get the current torque/current of the servo"""
-        return self.driver.get_current_torque(self.id) 
\ No newline at end of file
+        status = self.snapshot()
+        return status.current if status else None
\ No newline at end of file
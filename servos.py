@@ -1,12 +1,19 @@
-from typing import List, Dict
+from typing import Callable, List, Dict, Set
 from servo import Servo
+from bus import BusWorker, Priority
 from tabulate import tabulate
 import os
 
 class Servos:
     def __init__(self, servos: List[Servo]):
-        self.servos = servos
+        self.servos = list(servos)
+        self._by_id = {servo.id: servo for servo in servos}
+        if len(self._by_id) != len(servos):
+            raise ValueError("Servo IDs must be unique within a Servos collection")
         self._last_table_lines = 0  # Track number of lines in last printed table
+        self._staged: Dict[int, int] = {}  # servo_id -> target preloaded with REG WRITE, applied on trigger()
+        self._unsettled: Set[int] = set()  # Servos whose registered write is unknown; trigger() refuses to run
+        self._staged_revision: Dict[int, int] = {}  # servo_id -> Servo.target_revision when it was staged
         
     def __getitem__(self, index: int) -> Servo:
         """Get a servo by its position in the array (0-based indexing)"""
@@ -21,8 +28,20 @@ class Servos:
     def __iter__(self):
         return iter(self.servos)
         
-    def print_status(self) -> None:
-        """Print a formatted table with the status of all servos"""
+    def add(self, servo: Servo) -> None:
+        """Add a servo to the collection"""
+        if servo.id in self._by_id:
+            raise ValueError(f"Servo ID {servo.id} already exists")
+        self.servos.append(servo)
+        self._by_id[servo.id] = servo
+
+    def print_status(self, refresh: bool = True, footer: str = None) -> None:
+        """Print a formatted table with the status of all servos
+
+        Args:
+            refresh: Re-read stale servo status first; pass False to render only the cached snapshot
+            footer: Optional text printed (and cleared on the next redraw) below the table
+        """
         # Clear previous output if it exists
         if self._last_table_lines > 0:
             # Move cursor up and clear lines
@@ -31,33 +50,210 @@ class Servos:
         headers = ["ID", "Name", "Position", "Target", "Min", "Max", "Default", "Range %", "Torque"]
         data = []
         
+        if refresh:
+            self.refresh()
         for servo in self.servos:
+            status = servo.status
+            total_range = servo.limits.max_pos - servo.limits.min_pos
             data.append([
                 servo.id,
                 servo.name,
-                servo.current_position,
+                status.position if status else None,
                 servo.target_position,
                 servo.limits.min_pos,
                 servo.limits.max_pos,
                 servo.limits.default_pos,
-                f"{servo.get_movement_range():.1f}%",
-                servo.current_torque
+                f"{(status.position - servo.limits.min_pos) / total_range * 100:.1f}%" if status else "-",
+                status.current if status else None
             ])
             
         table = tabulate(data, headers=headers, tablefmt="grid")
+        if footer:
+            table += "\n" + footer
         print(table)
         
         # Update line count (add 1 for the print statement itself)
         self._last_table_lines = len(table.split('\n'))
         
+    def _group_by_driver(self, servos: List[Servo]) -> Dict[object, List[Servo]]:
+        groups = {}
+        for servo in servos:
+            groups.setdefault(servo.driver, []).append(servo)
+        return groups
+
+    def _fan_out(self, servos: List[Servo], function: Callable[[object, List[Servo]], object],
+                 priority: Priority = Priority.TELEMETRY) -> Dict[object, object]:
+        """Run function(driver, group) for each bus; buses behind a BusWorker run in parallel"""
+        groups = self._group_by_driver(servos)
+        if len(groups) == 1:
+            (driver, group), = groups.items()
+            return {driver: function(driver, group)}
+        pending = {}
+        results = {}
+        for driver, group in groups.items():
+            bus = getattr(driver, "bus", None)
+            if isinstance(bus, BusWorker):
+                pending[driver] = bus.submit(function, driver, group, priority=priority)
+            else:
+                results[driver] = function(driver, group)
+        for driver, future in pending.items():
+            results[driver] = future.result()
+        return results
+
+    def _select(self, servo_ids: List[int] = None) -> List[Servo]:
+        return self.servos if servo_ids is None else [self.get_servo_by_id(servo_id) for servo_id in servo_ids]
+
+    def set_max_age(self, max_age: float) -> None:
+        """Set how old (in seconds) cached servo status may get before it is re-read"""
+        for servo in self.servos:
+            servo.max_age = max_age
+
+    def refresh(self, servo_ids: List[int] = None, max_age: float = None) -> None:
+        """Refresh the cached status of all stale servos with one sync read per bus"""
+        stale = [servo for servo in self._select(servo_ids) if servo.is_stale(max_age)]
+        if stale:
+            self._fan_out(stale, self._refresh_group)
+
+    @staticmethod
+    def _refresh_group(driver, group: List[Servo]) -> None:
+        statuses = driver.sync_read_status([servo.id for servo in group])
+        for servo in group:
+            servo.update_status(statuses.get(servo.id))
+
+    def set_positions(self, positions: Dict[int, int]) -> None:
+        """Move several servos at once (clamped to their limits) with one sync write per bus
+
+        Servos with a staged move get the new target staged as well, so the next trigger()
+        does not take them back to the stale staged target.
+        """
+        armed = set(self._staged) | self._unsettled
+
+        def write(driver, group):
+            targets = {servo.id: servo.clamp(positions[servo.id]) for servo in group}
+            driver.sync_set_target_positions(targets)
+            for servo in group:
+                servo.record_target(targets[servo.id])
+            return self._disarm_group(driver, [servo for servo in group if servo.id in armed])
+
+        if positions:
+            servos = [self.get_servo_by_id(servo_id) for servo_id in positions]
+            self._settle(servos, self._fan_out(servos, write, Priority.MOTION))
+
+    @staticmethod
+    def _disarm_group(driver, group: List[Servo]) -> List[int]:
+        """REG WRITE each servo's current target over its staged write, so an ACTION leaves it in place
+
+        Returns the servos whose registered write is still unknown (no reply, or no known target).
+        """
+        targets = {servo.id: servo.target_position for servo in group}
+        acknowledged = driver.stage_target_positions({servo_id: target for servo_id, target in targets.items()
+                                                      if target is not None})
+        return [servo_id for servo_id, target in targets.items() if target is None or not acknowledged[servo_id]]
+
+    def _settle(self, servos: List[Servo], results: Dict[object, List[int]]) -> None:
+        """Forget the staged targets of disarmed servos and track the ones left in an unknown state"""
+        for servo in servos:
+            self._staged.pop(servo.id, None)
+            self._staged_revision.pop(servo.id, None)
+            self._unsettled.discard(servo.id)
+        for unsettled in results.values():
+            self._unsettled.update(unsettled)
+
+    def stage_positions(self, positions: Dict[int, int]) -> None:
+        """Preload targets (clamped to their limits) with REG WRITE without moving yet
+
+        The servos keep following their current targets until trigger() starts all staged
+        moves with one broadcast ACTION per bus. Staging is all-or-nothing: if a servo does not
+        acknowledge, every servo of the call is re-staged at its current target (dropping any
+        earlier staged move) and RuntimeError is raised.
+        """
+        def stage(driver, group):
+            targets = {servo.id: servo.clamp(positions[servo.id]) for servo in group}
+            acknowledged = driver.stage_target_positions(targets)
+            return targets, [servo_id for servo_id, ok in acknowledged.items() if not ok]
+
+        if not positions:
+            return
+        servos = [self.get_servo_by_id(servo_id) for servo_id in positions]
+        results = self._fan_out(servos, stage, Priority.MOTION)
+        missing = sorted(servo_id for _, failed in results.values() for servo_id in failed)
+        if missing:
+            # Servos that did not answer may have received the write all the same, so disarm them too
+            self._settle(servos, self._fan_out(servos, self._disarm_group, Priority.MOTION))
+            raise RuntimeError(f"No REG WRITE reply from servos {missing}; staged moves of {sorted(positions)} "
+                               f"were discarded")
+        for targets, _ in results.values():
+            self._staged.update(targets)
+        self._staged_revision.update({servo.id: servo.target_revision for servo in servos})
+        self._unsettled.difference_update(positions)
+
+    def _overridden(self) -> List[Servo]:
+        """Staged servos commanded directly since (Servo.set_position, trajectory streams, ...)"""
+        servos = [self.get_servo_by_id(servo_id) for servo_id in self._staged]
+        return [servo for servo in servos if servo.target_revision != self._staged_revision[servo.id]]
+
+    def stage_relative(self, offsets: Dict[int, int]) -> None:
+        """Stage moves relative to the last staged (or else commanded) target of each servo
+
+        Unlike move_relative this does not read the current positions, so the next waypoint
+        can be queued while the previous move is still running.
+        """
+        self.stage_positions({servo_id: self.staged_target(servo_id) + offset for servo_id, offset in offsets.items()})
+
+    def staged_target(self, servo_id: int) -> int:
+        """The target a servo will have after the next trigger()"""
+        servo = self.get_servo_by_id(servo_id)
+        if servo_id in self._staged and servo.target_revision == self._staged_revision[servo_id]:
+            return self._staged[servo_id]
+        return servo.target_position
+
+    def trigger(self) -> Dict[int, int]:
+        """Start all staged moves at once with one broadcast ACTION per bus; returns the targets started
+
+        Servos commanded directly after staging keep their newer target: their staged write is
+        replaced with it before the ACTION goes out, and they are left out of the result.
+
+        Raises:
+            RuntimeError: If a servo may still hold a write from a failed staging (stage it again first)
+        """
+        overridden = self._overridden()
+        if overridden:
+            self._settle(overridden, self._fan_out(overridden, self._disarm_group, Priority.MOTION))
+        if self._unsettled:
+            raise RuntimeError(f"Servos {sorted(self._unsettled)} may hold a stale staged move; "
+                               f"stage or set their positions again before trigger()")
+        staged, self._staged = self._staged, {}
+        self._staged_revision = {}
+
+        def start(driver, group):
+            driver.action()
+            for servo in group:
+                servo.record_target(staged[servo.id])
+
+        if staged:
+            self._fan_out([self.get_servo_by_id(servo_id) for servo_id in staged], start, Priority.MOTION)
+        return staged
+
+    def read_positions(self, servo_ids: List[int] = None, max_age: float = None) -> Dict[int, int]:
+        """Get current positions from the status cache, refreshing stale servos first"""
+        self.refresh(servo_ids, max_age)
+        return {servo.id: servo.status.position for servo in self._select(servo_ids) if servo.status is not None}
+
+    def move_relative(self, offsets: Dict[int, int]) -> None:
+        """Move several servos relative to their current positions in one coordinated step"""
+        current = self.read_positions(list(offsets))
+        missing = set(offsets) - set(current)
+        if missing:
+            raise RuntimeError(f"No position reply from servos {sorted(missing)}")
+        self.set_positions({servo_id: current[servo_id] + offset for servo_id, offset in offsets.items()})
+
     def reset_all(self) -> None:
         """Reset all servos to their default positions"""
-        for servo in self.servos:
-            servo.reset_to_default()
+        self.set_positions({servo.id: servo.limits.default_pos for servo in self.servos})
             
     def get_positions_dict(self) -> Dict[int, int]:
         """Get a dictionary of servo IDs to current positions"""
-        return {servo.id: servo.current_position for servo in self.servos}
+        return self.read_positions()
 
     def get_servo_by_id(self, servo_id: int) -> Servo:
         """Get a servo by its logical ID (not array position).
@@ -69,8 +265,8 @@ class Servos:
         Raises:
             ValueError: If no servo with the given ID exists
         """
-        for servo in self.servos:
-            if servo.id == servo_id:
-                return servo
-        raise ValueError(f"No servo found with ID {servo_id}")
+        try:
+            return self._by_id[servo_id]
+        except KeyError:
+            raise ValueError(f"No servo found with ID {servo_id}") from None
         
\ No newline at end of file
@@ -0,0 +1,438 @@
+"""
+Simulated STS3215 servo bus for hardware-free testing and load benchmarks.
+
+SimulatedServo implements the STSRegisters memory map and models position, speed,
+acceleration, load/current and temperature dynamics. SimulatedBus answers instruction
+packets (PING, READ, WRITE, REG WRITE, ACTION, SYNC READ, SYNC WRITE, RESET) with
+configurable latency, packet loss and reply corruption. The bus can be reached through:
+
+- SimulatedSerial: an injectable serial-like object
+      driver = STSServoDriver(None, serial_instance=SimulatedSerial(make_arm_bus()))
+- PtyServoBus: a pseudo terminal, so any code that opens a port path can talk to it
+      python simulator.py            # prints the /dev/pts/N path to connect to
+
+Dynamics are integrated lazily against the bus clock (time.monotonic by default), so
+simulated motion and serial timing run in real time; with any other (manual) clock,
+replies are delivered immediately and the dynamics advance only when the clock does.
+"""
+
+import os
+import random
+import struct
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+from Driver import PacketCodec, STSRegisters, Instruction, BROADCAST_ID
+
+TICKS_PER_REV = 4096
+MAX_SPEED = 3400          # ticks/s at full running speed
+MAX_ACCELERATION = 25000  # ticks/s^2 when TARGET_ACCELERATION is 0
+ACCELERATION_UNIT = 100   # ticks/s^2 per TARGET_ACCELERATION step
+CURRENT_UNIT = 0.0065     # Amps per CURRENT_CURRENT step
+
+# STATUS (0x41) / reply error bits
+ERROR_VOLTAGE = 0x01
+ERROR_TEMPERATURE = 0x04
+ERROR_CURRENT = 0x08
+ERROR_OVERLOAD = 0x20
+
+_U16 = struct.Struct('<H')
+EEPROM_END = STSRegisters.TORQUE_SWITCH  # Registers below 0x28 live in EEPROM
+
+
+def _sign_magnitude(value: int, sign_bit: int) -> int:
+    return (abs(value) & ((1 << sign_bit) - 1)) | ((1 << sign_bit) if value < 0 else 0)
+
+
+class SimulatedServo:
+    """One STS servo: register file plus a simple motor/thermal model"""
+
+    def __init__(self, servo_id: int, position: float = 2048, hard_min: float = 0, hard_max: float = TICKS_PER_REV - 1,
+                 ambient_temperature: float = 25.0, supply_voltage: float = 12.0):
+        self.registers = bytearray(0x50)
+        self.position = float(position)      # Physical encoder position in ticks
+        self.velocity = 0.0                  # ticks/s
+        self.hard_min = hard_min             # Mechanical end stops (or an object in the gripper)
+        self.hard_max = hard_max
+        self.external_load = 0.0             # Extra load (0.1 % units) applied by the environment
+        self.ambient_temperature = ambient_temperature
+        self.temperature = ambient_temperature
+        self.supply_voltage = supply_voltage
+        self.load = 0.0
+        self.eeprom_writes = 0
+        self._registered = None              # Pending REG WRITE (register, values)
+        self._reset_registers(servo_id)
+
+    def _reset_registers(self, servo_id: int):
+        r = self.registers
+        r[:] = bytes(len(r))
+        r[STSRegisters.FIRMWARE_MAJOR] = 3
+        r[STSRegisters.FIRMWARE_MINOR] = 10
+        r[STSRegisters.SERVO_MAJOR] = 9
+        r[STSRegisters.SERVO_MINOR] = 3
+        r[STSRegisters.ID] = servo_id
+        r[STSRegisters.RESPONSE_STATUS_LEVEL] = 1
+        self._write_u16(STSRegisters.MINIMUM_ANGLE, 0)
+        self._write_u16(STSRegisters.MAXIMUM_ANGLE, TICKS_PER_REV - 1)
+        r[STSRegisters.MAXIMUM_TEMPERATURE] = 70
+        r[STSRegisters.MAXIMUM_VOLTAGE] = 140
+        r[STSRegisters.MINIMUM_VOLTAGE] = 40
+        self._write_u16(STSRegisters.MAXIMUM_TORQUE, 1000)
+        r[STSRegisters.POS_PROPORTIONAL_GAIN] = 32
+        r[STSRegisters.POS_INTEGRAL_GAIN] = 0
+        r[STSRegisters.POS_DERIVATIVE_GAIN] = 32
+        self._write_u16(STSRegisters.CURRENT_PROTECTION_TH, 500)
+        r[STSRegisters.ANGULAR_RESOLUTION] = 1
+        r[STSRegisters.TORQUE_PROTECTION_TH] = 20
+        r[STSRegisters.OVERLOAD_TORQUE] = 80
+        r[STSRegisters.TORQUE_SWITCH] = 1
+        self._write_u16(STSRegisters.TARGET_POSITION, int(self.position))
+        self._write_u16(STSRegisters.TORQUE_LIMIT, 1000)
+        r[STSRegisters.WRITE_LOCK] = 1
+        self._publish()
+
+    @property
+    def id(self) -> int:
+        return self.registers[STSRegisters.ID]
+
+    def _read_u16(self, register: int) -> int:
+        return _U16.unpack_from(self.registers, register)[0]
+
+    def _write_u16(self, register: int, value: int):
+        _U16.pack_into(self.registers, register, int(value) & 0xFFFF)
+
+    @property
+    def position_offset(self) -> int:
+        """POSITION_CORRECTION as a signed value (bit 11 is the sign)"""
+        value = self._read_u16(STSRegisters.POSITION_CORRECTION)
+        return -(value & 0x7FF) if value & 0x800 else value & 0x7FF
+
+    @property
+    def reported_position(self) -> int:
+        return int(round(self.position - self.position_offset)) % TICKS_PER_REV
+
+    @property
+    def torque_enabled(self) -> bool:
+        return self.registers[STSRegisters.TORQUE_SWITCH] == 1
+
+    @property
+    def current(self) -> float:
+        """Motor current in CURRENT_CURRENT units"""
+        return 5 + abs(self.load) * 0.4 if self.torque_enabled else 0.0
+
+    @property
+    def error_bits(self) -> int:
+        bits = 0
+        voltage = self.registers[STSRegisters.CURRENT_VOLTAGE]
+        if not self.registers[STSRegisters.MINIMUM_VOLTAGE] <= voltage <= self.registers[STSRegisters.MAXIMUM_VOLTAGE]:
+            bits |= ERROR_VOLTAGE
+        if self.temperature > self.registers[STSRegisters.MAXIMUM_TEMPERATURE]:
+            bits |= ERROR_TEMPERATURE
+        if self.current > self._read_u16(STSRegisters.CURRENT_PROTECTION_TH):
+            bits |= ERROR_CURRENT
+        if abs(self.load) >= self.registers[STSRegisters.OVERLOAD_TORQUE] * 10:
+            bits |= ERROR_OVERLOAD
+        return bits
+
+    def step(self, dt: float):
+        """Advance the motor and thermal model by dt seconds"""
+        if dt <= 0:
+            return
+        target = self._read_u16(STSRegisters.TARGET_POSITION) + self.position_offset
+        speed_limit = self._read_u16(STSRegisters.RUNNING_SPEED) or MAX_SPEED
+        speed_limit = min(speed_limit, MAX_SPEED)
+        acceleration = self.registers[STSRegisters.TARGET_ACCELERATION] * ACCELERATION_UNIT or MAX_ACCELERATION
+        torque_limit = min(self._read_u16(STSRegisters.TORQUE_LIMIT), self._read_u16(STSRegisters.MAXIMUM_TORQUE))
+        previous_velocity = self.velocity
+
+        if self.torque_enabled:
+            error = target - self.position
+            # Fastest velocity that still allows stopping at the target
+            desired = max(-speed_limit, min(speed_limit, (2 * acceleration * abs(error)) ** 0.5))
+            desired = desired if error >= 0 else -desired
+            change = max(-acceleration * dt, min(acceleration * dt, desired - self.velocity))
+            self.velocity += change
+            if abs(error) < 1 and abs(self.velocity) < acceleration * dt:
+                self.velocity = 0.0
+                self.position = float(target)
+        else:
+            # Back-driven by the environment, with friction
+            self.velocity = self.external_load * 2.0
+            error = 0
+
+        self.position += self.velocity * dt
+        blocked = False
+        if self.position < self.hard_min or self.position > self.hard_max:
+            self.position = max(self.hard_min, min(self.position, self.hard_max))
+            self.velocity = 0.0
+            blocked = True
+
+        if not self.torque_enabled:
+            self.load = 0.0
+        elif blocked:
+            # Stalled against an end stop: effort grows with the position error
+            self.load = max(-torque_limit, min(torque_limit, 100 + 5 * abs(target - self.position))) * (1 if error > 0 else -1)
+        else:
+            inertia = (self.velocity - previous_velocity) / dt * 0.01
+            friction = 30 if self.velocity > 0 else -30 if self.velocity < 0 else 0
+            self.load = max(-torque_limit, min(torque_limit, inertia + friction + self.external_load))
+
+        amps = self.current * CURRENT_UNIT
+        self.temperature += dt * (0.07 * amps * amps - (self.temperature - self.ambient_temperature) / 120.0)
+        self._publish()
+
+    def _publish(self):
+        """Write the model state into the feedback registers (0x38-0x46)"""
+        r = self.registers
+        self._write_u16(STSRegisters.CURRENT_POSITION, self.reported_position)
+        self._write_u16(STSRegisters.CURRENT_SPEED, _sign_magnitude(int(self.velocity), 15))
+        self._write_u16(STSRegisters.CURRENT_DRIVE_VOLTAGE, _sign_magnitude(int(self.load), 10))
+        amps = self.current * CURRENT_UNIT
+        r[STSRegisters.CURRENT_VOLTAGE] = max(0, min(255, int(round((self.supply_voltage - 0.5 * amps) * 10))))
+        r[STSRegisters.CURRENT_TEMPERATURE] = max(0, min(255, int(round(self.temperature))))
+        r[STSRegisters.MOVING_STATUS] = 1 if self.velocity else 0
+        self._write_u16(STSRegisters.CURRENT_CURRENT, int(self.current))
+        r[STSRegisters.STATUS] = self.error_bits
+
+    def read(self, register: int, length: int) -> bytes:
+        return bytes(self.registers[register:register + length])
+
+    def write(self, register: int, values: bytes):
+        if register == STSRegisters.TORQUE_SWITCH and values and values[0] == 128:
+            # Midpoint calibration: the current position becomes 2048 and torque is released
+            offset = int(round(self.position)) - 2048
+            self._write_u16(STSRegisters.POSITION_CORRECTION, (abs(offset) & 0x7FF) | (0x800 if offset < 0 else 0))
+            self.registers[STSRegisters.TORQUE_SWITCH] = 0
+            self._publish()
+            return
+        end = min(register + len(values), STSRegisters.CURRENT_POSITION)
+        if register >= end:
+            return  # Feedback registers are read-only
+        if register < EEPROM_END and self.registers[STSRegisters.WRITE_LOCK] == 0:
+            self.eeprom_writes += 1
+        self.registers[register:end] = values[:end - register]
+        if register <= STSRegisters.TORQUE_SWITCH < end and self.registers[STSRegisters.TORQUE_SWITCH] == 1:
+            # Enabling torque holds the current position
+            if not (register <= STSRegisters.TARGET_POSITION < end):
+                self._write_u16(STSRegisters.TARGET_POSITION, self.reported_position)
+        self._publish()
+
+    def register_write(self, register: int, values: bytes):
+        self._registered = (register, bytes(values))
+
+    def action(self):
+        if self._registered is not None:
+            self.write(*self._registered)
+            self._registered = None
+
+    def reset(self):
+        self._reset_registers(self.id)
+
+
+class SimulatedBus:
+    """A set of simulated servos sharing one half-duplex bus"""
+
+    def __init__(self, servos: Iterable[SimulatedServo] = (), latency: float = 0.0001, loss: float = 0.0,
+                 corruption: float = 0.0, baudrate: int = 1000000, seed: Optional[int] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.servos: Dict[int, SimulatedServo] = {servo.id: servo for servo in servos}
+        self.latency = latency          # Seconds between the end of a request and the start of a reply
+        self.loss = loss                # Probability that a request is not heard at all
+        self.corruption = corruption    # Probability that a reply has a flipped bit
+        self.baudrate = baudrate
+        self.clock = clock
+        self.random = random.Random(seed)
+        self.lock = threading.RLock()
+        self.packets = 0
+        self._last_update = clock()
+
+    def add(self, servo: SimulatedServo):
+        self.servos[servo.id] = servo
+
+    def transfer_time(self, byte_count: int) -> float:
+        return byte_count * 10 / self.baudrate
+
+    def update(self):
+        """Integrate every servo up to the current bus clock"""
+        with self.lock:
+            now = self.clock()
+            dt = now - self._last_update
+            self._last_update = now
+            # Sub-step long gaps so the dynamics stay stable
+            steps = max(1, int(dt / 0.002))
+            for _ in range(steps):
+                for servo in self.servos.values():
+                    servo.step(dt / steps)
+
+    def _reply(self, codec: PacketCodec, servo: SimulatedServo, params: bytes = b'') -> bytes:
+        reply = bytearray(codec.encode(servo.id, servo.error_bits, params))
+        if self.corruption and self.random.random() < self.corruption:
+            reply[self.random.randrange(2, len(reply))] ^= 1 << self.random.randrange(8)
+        return bytes(reply)
+
+    def handle(self, servo_id: int, instruction: int, params: bytes) -> bytes:
+        """Execute one instruction packet and return the bytes the servos send back"""
+        with self.lock:
+            self.packets += 1
+            if self.loss and self.random.random() < self.loss:
+                return b''
+            self.update()
+            codec = PacketCodec()
+            if instruction == Instruction.SYNCWRITE:
+                register, length = params[0], params[1]
+                for offset in range(2, len(params) - length, length + 1):
+                    servo = self.servos.get(params[offset])
+                    if servo is not None:
+                        servo.write(register, params[offset + 1:offset + 1 + length])
+                return b''
+            if instruction == Instruction.SYNCREAD:
+                register, length = params[0], params[1]
+                return b''.join(self._reply(codec, self.servos[i], self.servos[i].read(register, length))
+                                for i in params[2:] if i in self.servos)
+            targets = list(self.servos.values()) if servo_id == BROADCAST_ID else \
+                [self.servos[servo_id]] if servo_id in self.servos else []
+            for servo in targets:
+                if instruction == Instruction.WRITE:
+                    servo.write(params[0], params[1:])
+                elif instruction == Instruction.REGWRITE:
+                    servo.register_write(params[0], params[1:])
+                elif instruction == Instruction.ACTION:
+                    servo.action()
+                elif instruction == Instruction.RESET:
+                    servo.reset()
+            if servo_id == BROADCAST_ID or not targets:
+                return b''
+            servo = targets[0]
+            if instruction == Instruction.READ:
+                return self._reply(codec, servo, servo.read(params[0], params[1]))
+            return self._reply(codec, servo)
+
+
+class SimulatedSerial:
+    """Serial-like object connected to a SimulatedBus (write/read/in_waiting/timeout like pyserial)"""
+
+    def __init__(self, bus: SimulatedBus, timeout: float = 1.0):
+        self.bus = bus
+        self.timeout = timeout
+        self.is_open = True
+        self._request = PacketCodec()
+        self._rx = bytearray()
+        self._scheduled = []  # (ready_time, bytes) replies still "on the wire"
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._request.feed(data)
+        now = self.bus.clock()
+        while True:
+            packet = self._request.decode()
+            if packet is None:
+                break
+            servo_id, instruction, params = packet
+            reply = self.bus.handle(servo_id, instruction, params)
+            if reply:
+                ready = now + self.bus.transfer_time(len(data)) + self.bus.latency + self.bus.transfer_time(len(reply))
+                self._scheduled.append((ready, reply))
+        return len(data)
+
+    @property
+    def realtime(self) -> bool:
+        return self.bus.clock is time.monotonic
+
+    def _release(self):
+        now = self.bus.clock()
+        while self._scheduled and (self._scheduled[0][0] <= now or not self.realtime):
+            self._rx += self._scheduled.pop(0)[1]
+
+    @property
+    def in_waiting(self) -> int:
+        self._release()
+        return len(self._rx)
+
+    def read(self, size: int = 1) -> bytes:
+        deadline = None if self.timeout is None else self.bus.clock() + self.timeout
+        while True:
+            self._release()
+            now = self.bus.clock()
+            if len(self._rx) >= size or (deadline is not None and now >= deadline) or not self.realtime:
+                break
+            wake = self._scheduled[0][0] if self._scheduled else deadline
+            if wake is None:
+                wake = now + 0.001
+            if deadline is not None:
+                wake = min(wake, deadline)
+            time.sleep(max(wake - now, 0))
+        data = bytes(self._rx[:size])
+        del self._rx[:size]
+        return data
+
+    def reset_input_buffer(self):
+        self._rx.clear()
+        self._scheduled.clear()
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.is_open = False
+
+
+class PtyServoBus:
+    """Expose a SimulatedBus on a pseudo terminal (POSIX only)"""
+
+    def __init__(self, bus: SimulatedBus):
+        import tty
+        self.bus = bus
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="pty-servo-bus", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        import select
+        codec = PacketCodec()
+        while not self._stop.is_set():
+            readable, _, _ = select.select([self.master], [], [], 0.05)
+            if not readable:
+                continue
+            try:
+                codec.feed(os.read(self.master, 4096))
+            except OSError:
+                break
+            while True:
+                packet = codec.decode()
+                if packet is None:
+                    break
+                reply = self.bus.handle(*packet)
+                if reply:
+                    time.sleep(self.bus.latency)
+                    os.write(self.master, reply)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        os.close(self.master)
+        os.close(self.slave)
+
+
+def make_arm_bus(limits: Dict[int, "ServoLimits"] = None, stop_margin: int = 60, **bus_options) -> SimulatedBus:
+    """A bus with the six SO-ARM100 servos at their default positions, end stops just outside the limits"""
+    if limits is None:
+        from robot import Robot
+        limits = Robot.SERVO_LIMITS
+    servos = [SimulatedServo(int(servo_id), position=limit.default_pos,
+                             hard_min=limit.min_pos - stop_margin, hard_max=limit.max_pos + stop_margin)
+              for servo_id, limit in limits.items()]
+    return SimulatedBus(servos, **bus_options)
+
+
+if __name__ == "__main__":
+    pty_bus = PtyServoBus(make_arm_bus())
+    print(f"Simulated SO-ARM100 bus on {pty_bus.port} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pty_bus.close()
@@ -0,0 +1,199 @@
+"""
+Safety supervisor: watches every servo and cuts torque on a violation.
+
+SafetySupervisor reads the feedback block of all servos with one SYNC READ per cycle (at
+200 Hz by default) and checks temperature, current, voltage, the STATUS register and the
+error byte of each reply against per-joint envelopes. On a violation it cuts torque on all
+servos with a single SYNC WRITE of TORQUE_SWITCH = 0, queued at EMERGENCY priority so it
+goes out ahead of any queued motion or telemetry traffic on the bus worker.
+
+The detection-to-cutoff latency (from the moment the violating sample was decoded until
+the torque-off packet has been written) and the cycle times are recorded, so the worst-case
+reaction time under load can be checked:
+
+    supervisor = SafetySupervisor(robot).start()
+    ...
+    print(supervisor.stats())
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from Driver import ServoError, ServoStatus, STSRegisters
+from bus import Priority
+from timing import StageTimings
+
+DEFAULT_ERROR_MASK = ServoError.VOLTAGE | ServoError.TEMPERATURE | ServoError.CURRENT | ServoError.OVERLOAD
+
+
+def _flag_names(bits: int) -> str:
+    return "|".join(flag.name for flag in ServoError if bits & flag)
+
+
+@dataclass
+class SafetyEnvelope:
+    max_temperature: int = 60   # deg C
+    max_current: int = 350      # CURRENT_CURRENT units (6.5 mA)
+    min_voltage: int = 45       # 0.1 V
+    max_voltage: int = 135      # 0.1 V
+    error_mask: int = DEFAULT_ERROR_MASK  # STATUS / error byte bits that count as a violation
+    max_missed: int = 3         # Consecutive cycles without a reply before the servo counts as lost
+
+
+@dataclass
+class Violation:
+    servo_id: int
+    reason: str
+    value: int
+    detected_at: float = field(default_factory=time.perf_counter)
+
+
+class SafetySupervisor:
+    def __init__(self, robot, rate_hz: float = 200.0, envelopes: Dict[int, SafetyEnvelope] = None,
+                 on_violation: Optional[Callable[[List[Violation]], None]] = None, poll_timeout: float = 0.005):
+        """
+        Args:
+            robot: Robot whose servos are watched (bus traffic goes through robot.bus)
+            rate_hz: Check rate
+            envelopes: Per-servo envelopes; servos without one use SafetyEnvelope()
+            on_violation: Called on the supervisor thread after torque has been cut
+            poll_timeout: Read timeout of each poll, so a silent servo costs milliseconds, not the
+                port's default timeout (a reply at 1 Mbps arrives well within 1 ms)
+        """
+        self.robot = robot
+        self.rate_hz = rate_hz
+        self.poll_timeout = poll_timeout
+        self.servo_ids = [servo.id for servo in robot.servos]
+        self.envelopes = {servo_id: SafetyEnvelope() for servo_id in self.servo_ids}
+        self.envelopes.update(envelopes or {})
+        self.on_violation = on_violation
+        self.timings = StageTimings()  # "cycle" (read + check) and "cutoff" (detection to torque off)
+        self.violations: List[Violation] = []
+        self.tripped = threading.Event()
+        self.cycles = 0
+        self.overruns = 0
+        self._missed = {servo_id: 0 for servo_id in self.servo_ids}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self) -> "SafetySupervisor":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="safety-supervisor", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def reset(self) -> None:
+        """Re-arm after a trip (torque stays off until re-enabled explicitly)"""
+        self.tripped.clear()
+        self._missed = {servo_id: 0 for servo_id in self.servo_ids}
+
+    def check(self, servo_id: int, status: Optional[ServoStatus]) -> List[Violation]:
+        """Envelope violations of one servo's status (None: no reply this cycle)"""
+        envelope = self.envelopes[servo_id]
+        if status is None:
+            self._missed[servo_id] += 1
+            if self._missed[servo_id] >= envelope.max_missed:
+                return [Violation(servo_id, "no reply", self._missed[servo_id])]
+            return []
+        self._missed[servo_id] = 0
+        violations = []
+        if status.temperature > envelope.max_temperature:
+            violations.append(Violation(servo_id, "temperature", status.temperature))
+        if status.current > envelope.max_current:
+            violations.append(Violation(servo_id, "current", status.current))
+        if not envelope.min_voltage <= status.voltage <= envelope.max_voltage:
+            violations.append(Violation(servo_id, "voltage", status.voltage))
+        if status.status & envelope.error_mask:
+            violations.append(Violation(servo_id, f"status {_flag_names(status.status & envelope.error_mask)}",
+                                        status.status))
+        if status.error & envelope.error_mask:
+            violations.append(Violation(servo_id, f"error {_flag_names(status.error & envelope.error_mask)}",
+                                        status.error))
+        return violations
+
+    def cutoff(self, detected_at: float = None) -> float:
+        """Disable torque on all servos with one sync write ahead of all queued traffic
+
+        Returns:
+            Seconds from detected_at (default: now) until the packet was written
+        """
+        detected_at = time.perf_counter() if detected_at is None else detected_at
+        driver = self.robot.bus.driver
+        self.robot.bus.submit(driver.sync_write, STSRegisters.TORQUE_SWITCH,
+                              {servo_id: b"\x00" for servo_id in self.servo_ids},
+                              priority=Priority.EMERGENCY).result()
+        latency = time.perf_counter() - detected_at
+        self.timings.record("cutoff", latency)
+        return latency
+
+    def step(self) -> List[Violation]:
+        """One supervision cycle: read all servos, check them, cut torque on the first violation"""
+        driver = self.robot.bus.driver
+        # Polled at MOTION priority: ahead of telemetry, but EMERGENCY stays reserved for the cutoff
+        statuses = self.robot.bus.call(driver.sync_read_status, self.servo_ids, self.poll_timeout,
+                                       priority=Priority.MOTION)
+        violations = []
+        for servo_id in self.servo_ids:
+            violations.extend(self.check(servo_id, statuses.get(servo_id)))
+        if violations and not self.tripped.is_set():
+            self.tripped.set()
+            latency = self.cutoff(violations[0].detected_at)
+            self.violations.extend(violations)
+            print(f"Safety cutoff after {latency * 1000:.2f} ms: " +
+                  ", ".join(f"servo {v.servo_id} {v.reason} ({v.value})" for v in violations))
+            if self.on_violation is not None:
+                self.on_violation(violations)
+        return violations
+
+    def _run(self):
+        period = 1.0 / self.rate_hz
+        next_deadline = time.perf_counter()
+        while not self._stop.is_set():
+            cycle_start = time.perf_counter()
+            try:
+                self.step()
+            except Exception as e:
+                print(f"Error in safety supervisor: {e}")
+            now = time.perf_counter()
+            self.timings.record("cycle", now - cycle_start)
+            self.cycles += 1
+            next_deadline += period
+            if next_deadline < now:
+                self.overruns += 1
+                next_deadline = now
+            else:
+                self._stop.wait(next_deadline - now)
+
+    def stats(self) -> Dict[str, dict]:
+        """Cycle and detection-to-cutoff latency summaries (ms), plus worst-case reaction bounds
+
+        A violation is seen at most one period plus one cycle after it occurs, and torque is
+        off one cutoff latency later (reaction_bound_ms, from the slowest observed cycle and
+        cutoff). A servo that stops answering is a violation after max_missed such cycles
+        (lost_servo_bound_ms).
+        """
+        summary = self.timings.summary()
+        result = {"cycles": self.cycles, "overruns": self.overruns, "tripped": self.tripped.is_set(), **summary}
+        if "cycle" in summary:
+            worst_cycle = summary["cycle"]["max_ms"]
+            worst_cutoff = summary["cutoff"]["max_ms"] if "cutoff" in summary else 0.0
+            cycle_bound = 1000.0 / self.rate_hz + worst_cycle
+            result["reaction_bound_ms"] = cycle_bound + worst_cutoff
+            max_missed = max(envelope.max_missed for envelope in self.envelopes.values())
+            result["lost_servo_bound_ms"] = max_missed * cycle_bound + worst_cutoff
+        return result
@@ -0,0 +1,300 @@
+"""
+Telemetry recorder for servo state.
+
+TelemetryRecorder samples the feedback block (STSRegisters 0x38-0x45: position, speed,
+load, voltage, temperature, status, moving, current) of all servos with one SYNC READ per
+cycle, plus the commanded target, at a fixed rate on a background thread. Samples go into
+preallocated NumPy ring buffers (no per-sample allocation that grows or needs the garbage
+collector) and are appended to disk in chunks, so hours of 100 Hz+ recording use constant
+memory.
+
+On-disk format: a directory with meta.json and one raw little-endian file per column
+(time.bin with float64 seconds since the start, and <column>.bin with one value per servo
+per sample). TelemetryLog memory-maps the columns for offline analysis and replay:
+
+    recorder = TelemetryRecorder(robot, rate_hz=100, path="runs/session1").start()
+    ...
+    recorder.stop()
+    log = TelemetryLog("runs/session1")
+    loads = log.column("load")           # (samples, servos) memmap
+    for t, sample in log.replay(): ...
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from Driver import STATUS_BLOCK_LENGTH, STATUS_BLOCK_START
+from bus import Priority
+
+FORMAT_VERSION = 1
+
+# Raw layout of the 0x38-0x46 feedback block ('<HHHBBxBB2xH' in Driver.ServoStatus)
+BLOCK_DTYPE = np.dtype([
+    ("position", "<u2"), ("speed", "<u2"), ("load", "<u2"), ("voltage", "u1"), ("temperature", "u1"),
+    ("reserved0", "u1"), ("status", "u1"), ("moving", "u1"), ("reserved1", "<u2"), ("current", "<u2"),
+])
+
+# Column name -> on-disk dtype; every column holds one value per servo per sample
+COLUMNS = {
+    "position": "<i2",
+    "target": "<i2",
+    "speed": "<i2",
+    "load": "<i2",
+    "current": "<i2",
+    "voltage": "u1",
+    "temperature": "u1",
+    "status": "u1",
+    "moving": "u1",
+    "valid": "u1",  # 0 when the servo did not reply; its other values repeat the previous sample
+}
+
+
+def _sign_magnitude(values: np.ndarray, sign_bit: int) -> np.ndarray:
+    magnitude = (values & ((1 << sign_bit) - 1)).astype(np.int16)
+    return np.where(values & (1 << sign_bit), -magnitude, magnitude)
+
+
+class TelemetryRing:
+    """Preallocated ring buffers holding the most recent samples"""
+
+    def __init__(self, servo_ids: Sequence[int], capacity: int):
+        self.servo_ids = list(servo_ids)
+        self.capacity = capacity
+        self.time = np.zeros(capacity, dtype="<f8")
+        self.columns = {name: np.zeros((capacity, len(self.servo_ids)), dtype=dtype) for name, dtype in COLUMNS.items()}
+        self.count = 0  # Samples written since the start
+        self._raw = np.zeros(len(self.servo_ids), dtype=BLOCK_DTYPE)
+        self._index = {servo_id: i for i, servo_id in enumerate(self.servo_ids)}
+
+    def append(self, t: float, blocks: Dict[int, bytes], targets: np.ndarray) -> None:
+        """Store one sample from the raw feedback blocks of the servos that replied"""
+        row = self.count % self.capacity
+        valid = self.columns["valid"][row]
+        valid[:] = 0
+        for servo_id, data in blocks.items():
+            i = self._index.get(servo_id)
+            if i is not None and len(data) == BLOCK_DTYPE.itemsize:
+                self._raw[i] = np.frombuffer(data, dtype=BLOCK_DTYPE)[0]
+                valid[i] = 1
+        raw = self._raw  # Servos without a reply keep their previous values
+        self.time[row] = t
+        self.columns["position"][row] = raw["position"]
+        self.columns["target"][row] = targets
+        self.columns["speed"][row] = _sign_magnitude(raw["speed"], 15)
+        self.columns["load"][row] = _sign_magnitude(raw["load"], 10)
+        self.columns["current"][row] = raw["current"]
+        for name in ("voltage", "temperature", "status", "moving"):
+            self.columns[name][row] = raw[name]
+        self.count += 1
+
+    def rows(self, start: int, stop: int) -> List[Tuple[int, int]]:
+        """Ring index ranges covering samples start..stop (sample numbers, stop exclusive)"""
+        start = max(start, stop - self.capacity)
+        ranges = []
+        while start < stop:
+            begin = start % self.capacity
+            end = min(self.capacity, begin + stop - start)
+            ranges.append((begin, end))
+            start += end - begin
+        return ranges
+
+    def latest(self, samples: int) -> Dict[str, np.ndarray]:
+        """Copy of the most recent samples in time order, including "time" """
+        ranges = self.rows(self.count - min(samples, self.count), self.count)
+        result = {"time": np.concatenate([self.time[a:b] for a, b in ranges]) if ranges else self.time[:0].copy()}
+        for name, column in self.columns.items():
+            result[name] = np.concatenate([column[a:b] for a, b in ranges]) if ranges else column[:0].copy()
+        return result
+
+
+class TelemetryWriter:
+    """Appends ring buffer contents to a column directory"""
+
+    def __init__(self, path: str, servo_ids: Sequence[int], rate_hz: float):
+        if os.path.exists(os.path.join(path, "meta.json")):
+            raise FileExistsError(f"Telemetry log already exists in {path}")
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        meta = {
+            "version": FORMAT_VERSION,
+            "servo_ids": list(servo_ids),
+            "rate_hz": rate_hz,
+            "start_time": time.time(),
+            "columns": {"time": "<f8", **COLUMNS},
+        }
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=2)
+        self._files = {name: open(os.path.join(path, f"{name}.bin"), "ab") for name in meta["columns"]}
+
+    def write(self, ring: TelemetryRing, start: int, stop: int) -> None:
+        for begin, end in ring.rows(start, stop):
+            self._files["time"].write(ring.time[begin:end].tobytes())
+            for name, column in ring.columns.items():
+                self._files[name].write(column[begin:end].tobytes())
+        for f in self._files.values():
+            f.flush()
+
+    def close(self) -> None:
+        for f in self._files.values():
+            f.close()
+
+
+class TelemetryRecorder:
+    def __init__(self, robot, rate_hz: float = 100.0, buffer_seconds: float = 60.0, path: str = None,
+                 flush_interval: float = 1.0):
+        """
+        Args:
+            robot: Robot whose servos are sampled (bus traffic goes through robot.bus at TELEMETRY priority)
+            rate_hz: Sampling rate
+            buffer_seconds: Length of the in-memory ring buffer
+            path: Directory to record to; only the ring buffer is kept when None
+            flush_interval: Seconds between appends to disk
+        """
+        self.robot = robot
+        self.rate_hz = rate_hz
+        self.servo_ids = [servo.id for servo in robot.servos]
+        self.ring = TelemetryRing(self.servo_ids, max(2, int(buffer_seconds * rate_hz)))
+        self.path = path
+        self.flush_interval = flush_interval
+        self.overruns = 0
+        self.dropped = 0  # Samples overwritten in the ring before they were flushed
+        self.errors = 0
+        self._flushed = 0
+        self._writer = None
+        self._start = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._targets = np.zeros(len(self.servo_ids), dtype="<i2")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self) -> "TelemetryRecorder":
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        if self.path is not None and self._writer is None:
+            self._writer = TelemetryWriter(self.path, self.servo_ids, self.rate_hz)
+        self._start = time.perf_counter()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def sample(self) -> None:
+        """Read all servos once and append the sample to the ring buffer"""
+        driver = self.robot.bus.driver
+        blocks = self.robot.bus.call(driver.sync_read, self.servo_ids, STATUS_BLOCK_START, STATUS_BLOCK_LENGTH,
+                                     priority=Priority.TELEMETRY)
+        for i, servo in enumerate(self.robot.servos):
+            target = servo.target_position
+            self._targets[i] = target if target is not None else 0
+        self.ring.append(time.perf_counter() - self._start, blocks, self._targets)
+
+    def flush(self) -> None:
+        """Append the samples recorded since the last flush to disk"""
+        count = self.ring.count
+        if count - self._flushed > self.ring.capacity:
+            self.dropped += count - self._flushed - self.ring.capacity
+        if self._writer is not None and count > self._flushed:
+            self._writer.write(self.ring, self._flushed, count)
+        self._flushed = count
+
+    def latest(self, seconds: float) -> Dict[str, np.ndarray]:
+        """Most recent samples from the ring buffer (copies)"""
+        return self.ring.latest(int(seconds * self.rate_hz))
+
+    def _run(self):
+        period = 1.0 / self.rate_hz
+        next_deadline = time.perf_counter()
+        next_flush = next_deadline + self.flush_interval
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                self.errors += 1
+                print(f"Error sampling telemetry: {e}")
+            now = time.perf_counter()
+            if now >= next_flush:
+                self.flush()
+                next_flush = now + self.flush_interval
+            next_deadline += period
+            if next_deadline < now:
+                self.overruns += 1
+                next_deadline = now
+            else:
+                self._stop.wait(next_deadline - now)
+
+
+class TelemetryLog:
+    """Memory-mapped reader for a recorded telemetry directory"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.servo_ids = self.meta["servo_ids"]
+        self.rate_hz = self.meta["rate_hz"]
+        self.start_time = self.meta["start_time"]
+        servo_count = len(self.servo_ids)
+        # A sample counts once all of its columns are complete (the recorder may have stopped mid-write)
+        sizes = {}
+        for name, dtype in self.meta["columns"].items():
+            row_bytes = np.dtype(dtype).itemsize * (1 if name == "time" else servo_count)
+            sizes[name] = os.path.getsize(os.path.join(path, f"{name}.bin")) // row_bytes
+        self.samples = min(sizes.values())
+        self._columns = {}
+        for name, dtype in self.meta["columns"].items():
+            shape = (self.samples,) if name == "time" else (self.samples, servo_count)
+            self._columns[name] = np.memmap(os.path.join(path, f"{name}.bin"), dtype=dtype, mode="r", shape=shape) \
+                if self.samples else np.zeros(shape, dtype=dtype)
+
+    def __len__(self):
+        return self.samples
+
+    @property
+    def time(self) -> np.ndarray:
+        """Seconds since the start of the recording"""
+        return self._columns["time"]
+
+    @property
+    def column_names(self) -> List[str]:
+        return [name for name in self._columns if name != "time"]
+
+    def column(self, name: str, servo_id: int = None) -> np.ndarray:
+        """(samples, servos) values of a column, or (samples,) for one servo"""
+        column = self._columns[name]
+        return column if servo_id is None else column[:, self.servo_ids.index(servo_id)]
+
+    def between(self, start: float, end: float) -> slice:
+        """Sample slice covering start <= time < end (seconds since the start)"""
+        return slice(int(np.searchsorted(self.time, start)), int(np.searchsorted(self.time, end)))
+
+    def replay(self, speed: float = None, start: float = 0.0) -> Iterator[Tuple[float, Dict[str, np.ndarray]]]:
+        """Yield (time, {column: values per servo}) per sample, paced in real time times speed if given"""
+        first = int(np.searchsorted(self.time, start))
+        began = time.perf_counter()
+        for index in range(first, self.samples):
+            t = float(self.time[index])
+            if speed:
+                delay = (t - start) / speed - (time.perf_counter() - began)
+                if delay > 0:
+                    time.sleep(delay)
+            yield t, {name: np.asarray(self._columns[name][index]) for name in self.column_names}
@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Driver import STSServoDriver  # noqa: E402
+from robot import Robot  # noqa: E402
+from simulator import SimulatedSerial, make_arm_bus  # noqa: E402
+
+
+@pytest.fixture
+def sim_bus():
+    return make_arm_bus()
+
+
+@pytest.fixture
+def robot(sim_bus):
+    """Robot on a simulated SO-ARM100 bus, with the built-in limits"""
+    driver = STSServoDriver("sim", serial_instance=SimulatedSerial(sim_bus, timeout=0.05))
+    driver.log_errors = False
+    robot = Robot(driver, profile=None)
+    yield robot
+    robot.bus.stop()
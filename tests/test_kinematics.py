@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+
+from kinematics import ArmKinematics
+from robot import Robot
+
+
+@pytest.fixture(scope="module")
+def kinematics():
+    limits = Robot.SERVO_LIMITS
+    return ArmKinematics([(limits[joint].min_pos, limits[joint].max_pos) for joint in Robot.ARM_JOINTS])
+
+
+@pytest.mark.parametrize("with_pitch, success_rate", [(False, 0.95), (True, 0.99)])
+def test_inverse_solves_forward_poses(kinematics, with_pitch, success_rate):
+    angles = np.random.default_rng(1).uniform(kinematics.lower, kinematics.upper, (2000, 5))
+    xyz, pitch, _ = kinematics.forward(angles)
+    solution, reached = kinematics.inverse(xyz, pitch=pitch if with_pitch else None)
+    assert reached.mean() >= success_rate
+    solved_xyz, solved_pitch, _ = kinematics.forward(solution[reached])
+    assert np.all(np.linalg.norm(solved_xyz - xyz[reached], axis=1) < 1e-3)
+    if with_pitch:
+        assert np.all(np.abs(solved_pitch - pitch[reached]) < 1e-2)
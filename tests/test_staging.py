@@ -0,0 +1,15 @@
+def test_direct_moves_override_staged_targets(robot):
+    robot.stage_joints({1: 1500, 4: 2500})
+    robot.release()                       # Servo.set_position on the gripper
+    robot.move_joints({4: 1800}, 0.3)     # Trajectory stream on the elbow
+    assert robot.trigger() == {}
+    assert robot.driver.get_target_position(1) == robot.gripper.limits.max_pos
+    assert robot.driver.get_target_position(4) == 1800
+
+
+def test_trigger_starts_staged_targets_that_are_still_current(robot):
+    robot.stage_joints({1: 1500, 4: 2500})
+    robot.release()
+    assert robot.trigger() == {4: 2500}
+    assert robot.driver.get_target_position(4) == 2500
+    assert robot.driver.get_target_position(1) == robot.gripper.limits.max_pos
@@ -0,0 +1,68 @@
+"""
+Wall-clock timing of named stages (capture, encode, inference, actuation, ...).
+
+    timings = StageTimings()
+    with timings.measure("encode"):
+        ...
+    print(timings.summary())
+"""
+
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from threading import Lock
+from typing import Dict, Sequence
+
+
+def percentile(values: Sequence[float], fraction: float) -> float:
+    """Nearest-rank percentile of values (fraction between 0 and 1)"""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+class StageTimings:
+    def __init__(self, window: int = 500):
+        self._lock = Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._totals = defaultdict(float)
+        self._counts = defaultdict(int)
+        self._max = defaultdict(float)
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._samples[stage].append(seconds)
+            self._totals[stage] += seconds
+            self._counts[stage] += 1
+            self._max[stage] = max(self._max[stage], seconds)
+
+    @contextmanager
+    def measure(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def last(self, stage: str) -> float:
+        with self._lock:
+            samples = self._samples.get(stage)
+            return samples[-1] if samples else None
+
+    def summary(self) -> Dict[str, dict]:
+        """Count, total seconds, recent mean/p50/p95 and all-time max in milliseconds per stage"""
+        with self._lock:
+            stages = {stage: list(samples) for stage, samples in self._samples.items()}
+            totals, counts, maxima = dict(self._totals), dict(self._counts), dict(self._max)
+        return {
+            stage: {
+                "count": counts[stage],
+                "total_s": totals[stage],
+                "mean_ms": sum(samples) / len(samples) * 1000,
+                "p50_ms": percentile(samples, 0.5) * 1000,
+                "p95_ms": percentile(samples, 0.95) * 1000,
+                "max_ms": maxima[stage] * 1000,
+            }
+            for stage, samples in stages.items() if samples
+        }
@@ -0,0 +1,146 @@
+"""
+Time-parameterized multi-joint trajectories.
+
+Joint-space waypoints are turned into trapezoidal or minimum-jerk profiles (vectorized
+with NumPy over all samples and joints at once) and streamed to every joint at a fixed
+rate. Each setpoint is a single SYNC WRITE of the 0x29-0x2F block
+(TARGET_ACCELERATION, TARGET_POSITION, RUNNING_TIME, RUNNING_SPEED), with the running
+speed set so each servo reaches its setpoint within one period; all joints therefore
+move together and the command latency is one packet per period.
+"""
+
+import struct
+import time
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from Driver import STSRegisters
+
+SETPOINT_PAYLOAD = struct.Struct('<BHHH')  # acceleration, position, running time, running speed
+MIN_STREAM_SPEED = 200                     # ticks/s, so slow segments still settle on their setpoint
+MAX_SPEED = 3400                           # ticks/s, top speed of the STS3215 (as in simulator.MAX_SPEED)
+SPEED_MARGIN = 1.5                         # Command a bit faster than the profile so joints do not lag
+
+
+def trapezoidal_profile(tau: np.ndarray, accel_fraction: float = 0.25) -> np.ndarray:
+    """Normalized progress (0..1) of a trapezoidal velocity profile at normalized times tau (0..1)"""
+    tau = np.clip(tau, 0.0, 1.0)
+    a = accel_fraction
+    peak = 1.0 / (1.0 - a)  # Peak normalized velocity so that the area under the profile is 1
+    accelerating = 0.5 * peak / a * tau ** 2
+    cruising = peak * (tau - 0.5 * a)
+    decelerating = 1.0 - 0.5 * peak / a * (1.0 - tau) ** 2
+    return np.where(tau < a, accelerating, np.where(tau > 1.0 - a, decelerating, cruising))
+
+
+def minimum_jerk_profile(tau: np.ndarray) -> np.ndarray:
+    """Normalized progress (0..1) of a minimum-jerk profile at normalized times tau (0..1)"""
+    tau = np.clip(tau, 0.0, 1.0)
+    return tau ** 3 * (10 - 15 * tau + 6 * tau ** 2)
+
+
+PROFILES = {
+    "trapezoidal": trapezoidal_profile,
+    "minimum_jerk": minimum_jerk_profile,
+}
+
+
+def peak_velocity_factor(profile: str) -> float:
+    """Peak velocity of a profile relative to the average velocity (distance / duration)"""
+    tau = np.linspace(0.0, 1.0, 1001)
+    return float(np.max(np.diff(PROFILES[profile](tau))) * (len(tau) - 1))
+
+
+def feasible_durations(waypoints: np.ndarray, durations: Sequence[float], profile: str = "minimum_jerk",
+                       max_speed: float = MAX_SPEED) -> np.ndarray:
+    """Segment durations stretched where the profile's peak velocity would exceed max_speed (ticks/s)"""
+    distances = np.max(np.abs(np.diff(np.asarray(waypoints, dtype=float), axis=0)), axis=1)
+    return np.maximum(np.asarray(durations, dtype=float), distances * peak_velocity_factor(profile) / max_speed)
+
+
+def plan(waypoints: np.ndarray, durations: Sequence[float], rate_hz: float, profile: str = "minimum_jerk"):
+    """Sample a piecewise trajectory through waypoints (shape: waypoints x joints)
+
+    Returns:
+        (times, positions): sample times in seconds and positions with shape samples x joints
+    """
+    waypoints = np.asarray(waypoints, dtype=float)
+    durations = np.asarray(durations, dtype=float)
+    if len(durations) != len(waypoints) - 1:
+        raise ValueError("Need one duration per segment (len(waypoints) - 1)")
+    if np.any(durations <= 0):
+        raise ValueError("Segment durations must be positive")
+    shape = PROFILES[profile]
+    period = 1.0 / rate_hz
+    times, positions = [np.zeros(1)], [waypoints[:1]]
+    offset = 0.0
+    for start, end, duration in zip(waypoints[:-1], waypoints[1:], durations):
+        steps = max(1, int(np.ceil(duration / period)))
+        t = np.arange(1, steps + 1) * (duration / steps)
+        progress = shape(t / duration)[:, None]
+        positions.append(start + progress * (end - start))
+        times.append(offset + t)
+        offset += duration
+    return np.concatenate(times), np.vstack(positions)
+
+
+class TrajectoryExecutor:
+    def __init__(self, robot, rate_hz: float = 50.0, acceleration: int = 0):
+        self.robot = robot
+        self.rate_hz = rate_hz
+        self.acceleration = acceleration  # TARGET_ACCELERATION register value, 0 = servo maximum
+        self.overruns = 0
+        self.max_lateness = 0.0
+
+    def _setpoints(self, servo_ids: List[int], positions: np.ndarray, speeds: np.ndarray) -> Dict[int, bytes]:
+        return {servo_id: SETPOINT_PAYLOAD.pack(self.acceleration, int(position), 0, int(speed))
+                for servo_id, position, speed in zip(servo_ids, positions, speeds)}
+
+    def execute(self, waypoints: List[Dict[int, int]], durations: Sequence[float], profile: str = "minimum_jerk") -> None:
+        """Move through joint-space waypoints ({servo_id: position}, all with the same servos)
+
+        The first segment starts from the current positions, so waypoints[0] is the first target.
+        Positions are clamped to each servo's limits, and segments too short for the servos' top
+        speed are stretched to the fastest feasible duration.
+        """
+        servo_ids = list(waypoints[0])
+        servos = [self.robot.servos.get_servo_by_id(servo_id) for servo_id in servo_ids]
+        current = self.robot.servos.read_positions(servo_ids, max_age=0)
+        if len(current) != len(servo_ids):
+            raise RuntimeError(f"No position reply from servos {sorted(set(servo_ids) - set(current))}")
+        points = np.array([[current[servo_id] for servo_id in servo_ids]] +
+                          [[waypoint[servo_id] for servo_id in servo_ids] for waypoint in waypoints], dtype=float)
+        points = np.clip(points, [servo.limits.min_pos for servo in servos], [servo.limits.max_pos for servo in servos])
+
+        if np.any(np.asarray(durations, dtype=float) <= 0):
+            raise ValueError("Segment durations must be positive")
+        times, positions = plan(points, feasible_durations(points, durations, profile), self.rate_hz, profile)
+        positions = np.rint(positions)
+        speeds = np.abs(np.diff(positions, axis=0)) * self.rate_hz * SPEED_MARGIN
+        speeds = np.clip(speeds, MIN_STREAM_SPEED, MAX_SPEED)
+        # The stream leaves its last RUNNING_SPEED on the servos; plain moves only write position and
+        # running time, so put the previous speed limit back (0, no limit, for servos that did not reply)
+        driver = self.robot.driver
+        previous = driver.sync_read(servo_ids, STSRegisters.RUNNING_SPEED, 2)
+        try:
+            # Each setpoint is sent one period ahead, when the previous sample is due
+            self.stream(servo_ids, times[:-1], positions[1:], speeds)
+        finally:
+            driver.sync_write(STSRegisters.RUNNING_SPEED,
+                              {servo_id: previous.get(servo_id, b"\x00\x00") for servo_id in servo_ids})
+        for servo, position in zip(servos, positions[-1]):
+            servo.record_target(int(position))
+
+    def stream(self, servo_ids: List[int], times: np.ndarray, positions: np.ndarray, speeds: np.ndarray) -> None:
+        """Send one sync write per sample at its scheduled time"""
+        driver = self.robot.driver
+        start = time.perf_counter()
+        for t, sample, speed in zip(times, positions, speeds):
+            delay = start + t - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            elif -delay > 0.5 / self.rate_hz:
+                self.overruns += 1
+                self.max_lateness = max(self.max_lateness, -delay)
+            driver.sync_write(STSRegisters.TARGET_ACCELERATION, self._setpoints(servo_ids, sample, speed))
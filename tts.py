@@ -1,27 +1,105 @@
 from gtts import gTTS
+import hashlib
+import io
 import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".easybot", "tts_cache")
+
+
+class AudioCache:
+    """On-disk LRU cache of synthesized speech, keyed by (text, lang)"""
+
+    def __init__(self, folder_path=DEFAULT_CACHE_DIR, max_bytes=50 * 1024 * 1024):
+        self.folder_path = folder_path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(folder_path, exist_ok=True)
+
+    def _path(self, text, lang):
+        key = hashlib.sha1(f"{lang}\0{text}".encode("utf-8")).hexdigest()
+        return os.path.join(self.folder_path, f"{key}.mp3")
+
+    def get(self, text, lang):
+        path = self._path(text, lang)
+        try:
+            with open(path, "rb") as f:
+                audio = f.read()
+        except OSError:
+            self.misses += 1
+            return None
+        os.utime(path)  # Mark as recently used
+        self.hits += 1
+        return audio
+
+    def put(self, text, lang, audio):
+        path = self._path(text, lang)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(audio)
+        os.replace(temp_path, path)  # Atomic, so concurrent readers never see a partial file
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.folder_path):
+                if name.endswith(".mp3"):
+                    stat = os.stat(os.path.join(self.folder_path, name))
+                    entries.append((stat.st_mtime, stat.st_size, name))
+            total = sum(size for _, size, _ in entries)
+            for _, size, name in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.folder_path, name))
+                except OSError:
+                    pass
+                total -= size
+
+
 class AudioGenerator:
-    def __init__(self):
-        pass
+    def __init__(self, cache: AudioCache = None, max_workers=4, use_cache=True):
+        """
+        Args:
+            cache: Cache for synthesized chunks; an AudioCache in ~/.easybot/tts_cache when None
+            max_workers: Chunks synthesized concurrently
+            use_cache: Set to False to disable the on-disk cache
+        """
+        self.cache = (cache or AudioCache()) if use_cache else None
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tts-fetch")
+        self._queue = queue.Queue()
+        self._speaker = None
+        self._speaker_lock = threading.Lock()
 
     def GenerateAudioAtomic(self, text, lang="en"):
-        tts = gTTS(text=text, lang=lang)
-        tts.save("audio.mp3")
-        with open("audio.mp3", "rb") as f:
-            audio = f.read()
-        os.remove("audio.mp3")
+        if self.cache is not None:
+            audio = self.cache.get(text, lang)
+            if audio is not None:
+                return audio
+        buffer = io.BytesIO()
+        gTTS(text=text, lang=lang).write_to_fp(buffer)
+        audio = buffer.getvalue()
+        if self.cache is not None:
+            self.cache.put(text, lang, audio)
         return audio
 
-    def generate_audio(self, text, lang="en"):
+    def iter_audio(self, text, lang="en"):
+        """Yield the audio of each chunk in order as soon as it is ready; all chunks are fetched concurrently"""
         splits = self.split_sentences(text, 1000)
-        audio = b''
-        total_splits = len(splits)
-        for i, split in enumerate(splits, 1):
-            audio += self.GenerateAudioAtomic(" " + split + " ", lang=lang)
-            print(f"Progress: {i}/{total_splits} splits processed")  # Progress info
-        return audio
+        futures = [self._pool.submit(self.GenerateAudioAtomic, " " + split + " ", lang) for split in splits]
+        for i, future in enumerate(futures, 1):
+            yield future.result()
+            print(f"Progress: {i}/{len(futures)} splits processed")  # Progress info
+
+    def generate_audio(self, text, lang="en"):
+        return b''.join(self.iter_audio(text, lang))
 
     def split_sentences(self, text, maxLength):
         import re
@@ -39,11 +117,11 @@ class AudioGenerator:
 
     def generate_and_save_audio(self, text, lang="en", filename=None, folder_path=None):
         audio = self.generate_audio(text, lang)
-        
+
         if filename is None:
             current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"audio-{current_time}.mp3"
-        
+
         if folder_path:
             os.makedirs(folder_path, exist_ok=True)
             full_path = os.path.join(folder_path, filename)
@@ -56,21 +134,47 @@ class AudioGenerator:
         print(f"Audio saved to: {full_path}")
         return full_path
 
-
-    def say(self, text, lang="en"):
+    def _play(self, text, lang):
         import pygame
-        audio_path = self.generate_and_save_audio(text, lang=lang)
-        pygame.mixer.init()
-        pygame.mixer.music.load(audio_path)
-        pygame.mixer.music.play()
-        while pygame.mixer.music.get_busy():
-            pygame.time.Clock().tick(10)
-        pygame.mixer.quit()
-        os.remove(audio_path)
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+        # Playback of the first chunk starts while the remaining chunks are still being fetched
+        for audio in self.iter_audio(text, lang):
+            pygame.mixer.music.load(io.BytesIO(audio), "mp3")
+            pygame.mixer.music.play()
+            while pygame.mixer.music.get_busy():
+                time.sleep(0.05)
+
+    def _speak_loop(self):
+        while True:
+            text, lang, done = self._queue.get()
+            try:
+                self._play(text, lang)
+            except Exception as e:
+                print(f"Error speaking: {e}")
+            finally:
+                done.set()
+                self._queue.task_done()
+
+    def say(self, text, lang="en", block=False):
+        """Queue text for speech on the background speaker thread; returns immediately unless block is set"""
+        with self._speaker_lock:
+            if self._speaker is None:
+                self._speaker = threading.Thread(target=self._speak_loop, name="tts-speaker", daemon=True)
+                self._speaker.start()
+        done = threading.Event()
+        self._queue.put((text, lang, done))
+        if block:
+            done.wait()
+        return done
+
+    def wait(self):
+        """Block until everything queued has been spoken"""
+        self._queue.join()
 
 if __name__ == "__main__":
     audio_generator = AudioGenerator()
 
     text =" ... Hallo ich bin ein [englisch] bot!"
 
-    audio_generator.say(text, lang="de")
\ No newline at end of file
+    audio_generator.say(text, lang="de", block=True)
\ No newline at end of file